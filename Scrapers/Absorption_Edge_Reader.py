@@ -87,18 +87,20 @@ def simple_json_writer(data_dict, filename):
 
 # -------- Functional Scraping/JSON Loop --------
 # Caution - do not run this without justification (i.e. updating the current JSON file)
-# It requests a lot of information from servers!
+# It requests a lot of information from servers! See Reference_Table_Rebuilder.py for a cached, incremental rebuild
+# The loop only runs when this file is executed directly, so the functions above can be imported without scraping
 
-complete_uw_edge_repository = {} # Establish the empty dict to write to JSON file
-for element in atomic_symbols: # Iterate from "Na" to "U"
-    print("Beginning x-ray edge retrieval for: {element}".format(element=element))
-    # Call each of the above functions
-    ascii_retrieval = get_uw_ascii_table(element)
-    clean_table = clean_ascii_table(ascii_retrieval)
-    create_element_dict = create_edge_data_dict(clean_table)
-    # Map singular output of create_element_dict to complete dictionary
-    complete_uw_edge_repository[element] = create_element_dict[element]
-    print("Completed x-ray edge retrival for: {element}".format(element=element))
-# Write the file
-simple_json_writer(complete_uw_edge_repository,
-                   "../src/PXRD_Beam_Footprint_Calculator/MAC_Calculator_Directory/MAC_JSONs/X-ray_Absorption_Edges.json")
+if __name__ == "__main__":
+    complete_uw_edge_repository = {} # Establish the empty dict to write to JSON file
+    for element in atomic_symbols: # Iterate from "Na" to "U"
+        print("Beginning x-ray edge retrieval for: {element}".format(element=element))
+        # Call each of the above functions
+        ascii_retrieval = get_uw_ascii_table(element)
+        clean_table = clean_ascii_table(ascii_retrieval)
+        create_element_dict = create_edge_data_dict(clean_table)
+        # Map singular output of create_element_dict to complete dictionary
+        complete_uw_edge_repository[element] = create_element_dict[element]
+        print("Completed x-ray edge retrival for: {element}".format(element=element))
+    # Write the file
+    simple_json_writer(complete_uw_edge_repository,
+                       "../src/PXRD_Beam_Footprint_Calculator/MAC_Calculator_Directory/MAC_JSONs/X-ray_Absorption_Edges.json")
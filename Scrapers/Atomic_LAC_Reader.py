@@ -118,12 +118,14 @@ def simple_json_writer(data_dict, filename):
 
 # For loop that will rip Z's 1 - 92 and output to JSON file
 # Do NOT run this unless you absolutely need to update values - it's a lot of server requests!
-# Just reference the .json file in the project
+# Just reference the .json file in the project, or see Reference_Table_Rebuilder.py for a cached, incremental rebuild
+# The loop only runs when this file is executed directly, so the functions above can be imported without scraping
 
-master_z_mac_dict = {}
-for z in range(1, 93):
-    working_table = get_ascii_table(z)
-    energy_mac_dict = html_lac_reader(working_table, z, "r")
-    master_z_mac_dict[z] = energy_mac_dict
-simple_json_writer(master_z_mac_dict,
-                   "../src/PXRD_Beam_Footprint_Calculator/MAC_Calculator_Directory/MAC_JSONs/Atomic_MACs.json")
\ No newline at end of file
+if __name__ == "__main__":
+    master_z_mac_dict = {}
+    for z in range(1, 93):
+        working_table = get_ascii_table(z)
+        energy_mac_dict = html_lac_reader(working_table, z, "r")
+        master_z_mac_dict[z] = energy_mac_dict
+    simple_json_writer(master_z_mac_dict,
+                       "../src/PXRD_Beam_Footprint_Calculator/MAC_Calculator_Directory/MAC_JSONs/Atomic_MACs.json")
\ No newline at end of file
@@ -0,0 +1,159 @@
+# Dedicated parsers for the NIST and UW ASCII tables, used by Reference_Table_Rebuilder.py
+# The original scrapers build a full BeautifulSoup tree for each page, then split every line with a regex and index
+# each row from its end. These functions pull the <pre> block out with plain string searches, make one pass over its
+# lines to collect edge labels and number tokens, and convert all of the numbers with a single NumPy call.
+#   - NIST rows keep the full set of coefficient columns on the ElemTab pages (mu/rho and mu_en/rho), and edge rows are
+#     kept as explicit duplicate energies with their edge label, instead of the below-edge value being silently overwritten.
+#   - nist_MAC_dict and uw_edge_list reproduce exactly what html_lac_reader and create_edge_data_dict return.
+# Benchmark against the original BeautifulSoup parsers on the pages in Scrapers/fixtures (the default) or on the pages
+# saved by Reference_Table_Rebuilder.py with:
+#   python -m Scrapers.Fast_Table_Parsers
+#   python -m Scrapers.Fast_Table_Parsers --cache-dir Scrapers/raw_html_cache
+
+# -------- Imports --------
+# Necessary for command line arguments, timing, entity decoding and regular expressions
+import argparse
+import html
+import os
+import re
+import time
+# Necessary for the single-pass numeric conversion
+import numpy as np
+
+# -------- Global Variables --------
+
+# Matches "<pre ...>" and "</pre>" in any case
+pre_open_pattern = re.compile(r"<pre\b[^>]*>", re.IGNORECASE)
+pre_close_pattern = re.compile(r"</pre\s*>", re.IGNORECASE)
+# Matches any tag left inside a <pre> block (e.g. <b> or <a>)
+tag_pattern = re.compile(r"<[^>]+>")
+# First letters of absorption edge labels (K, L1, M5, etc.) which may start a NIST row
+edge_initials = "KLMNOP"
+
+# Pages recorded in the cache layout, used by default for the benchmark
+fixture_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# -------- <pre> Extraction --------
+
+# Function to return the text of every <pre> block with tags stripped and entities (e.g. &mu;) decoded
+def extract_pre_blocks(html_text):
+    blocks = []
+    position = 0
+    while True:
+        opening = pre_open_pattern.search(html_text, position)
+        if opening is None:
+            return blocks
+        closing = pre_close_pattern.search(html_text, opening.end())
+        end = closing.start() if closing else len(html_text)
+        blocks.append(html.unescape(tag_pattern.sub("", html_text[opening.end():end])))
+        if closing is None:
+            return blocks
+        position = closing.end()
+
+# Function to return the first <pre> block, as soup.find("pre").get_text() does
+def first_pre_block(html_text):
+    blocks = extract_pre_blocks(html_text)
+    if not blocks:
+        raise ValueError("No <pre> table found in page.")
+    return blocks[0]
+
+# -------- NIST Parsing --------
+
+# Function to parse a NIST ASCII table (energy, mu/rho and mu_en/rho) in one pass
+# Returns {"energy keV": array, "edge": array of labels ("" for ordinary rows), "mu/rho" and "mu_en/rho": arrays in cm^2/g}
+# Rows are kept in page order, so an absorption edge appears as two rows with the same energy: the unlabeled row below
+# the edge followed by the labeled row above it
+def parse_NIST_table(table_text):
+    labels = []
+    tokens = []
+    for line in table_text.splitlines():
+        parts = line.split()
+        if len(parts) < 2:
+            continue
+        label = ""
+        if parts[0].isdigit() and parts[1][0] in edge_initials: # Some pages prefix the first edge with Z (e.g. "26 K")
+            parts = parts[1:]
+        if parts[0][0] in edge_initials:
+            label, parts = parts[0], parts[1:]
+        if not parts or not (parts[0][0].isdigit() or parts[0][0] == "."): # Header and unit lines
+            continue
+        if len(parts) != 3:
+            raise ValueError("NIST table row is not energy, mu/rho and mu_en/rho: '{}'.".format(line.strip()))
+        labels.append(label)
+        tokens.extend(parts)
+    if not labels:
+        raise ValueError("No numeric rows found in NIST table.")
+    values = np.array(tokens, dtype=float).reshape(len(labels), 3)
+    return {"energy keV": values[:, 0] * 1000, # MeV to keV, as html_lac_reader does
+            "edge": np.array(labels),
+            "mu/rho": values[:, 1],
+            "mu_en/rho": values[:, 2]}
+
+# Function to collapse a parsed table to the {"energy keV": MAC} form stored in Atomic_MACs.json
+# As in html_lac_reader, the later (above-edge) value is kept where an energy is repeated
+def nist_MAC_dict(parsed_table):
+    return {str(energy): MAC for energy, MAC in zip(parsed_table["energy keV"].tolist(), parsed_table["mu/rho"].tolist())}
+
+# Function to parse a whole NIST page straight to the Atomic_MACs.json form
+def parse_NIST_page(html_text):
+    return nist_MAC_dict(parse_NIST_table(first_pre_block(html_text)))
+
+# -------- UW Parsing --------
+
+# Function to parse a whole UW page straight to the X-ray_Absorption_Edges.json form ([[edge, "keV", "A"], ...])
+# Uses the same token positions as clean_ascii_table and create_edge_data_dict: edge triples begin at the tenth token
+def uw_edge_list(html_text):
+    tokens = first_pre_block(html_text).split()
+    return [tokens[i: i + 3] for i in range(9, len(tokens), 3)]
+
+# -------- Benchmark --------
+
+# Function to time the original BeautifulSoup parsers against these on saved pages and confirm identical results
+# Returns {"NIST": (pages, original seconds, fast seconds, identical), "UW": (...)}
+def benchmark_parsers(cache_directory, repeats=5):
+    # Imported here so the fast parsers never require BeautifulSoup themselves
+    from bs4 import BeautifulSoup
+    from Scrapers.Atomic_LAC_Reader import html_lac_reader
+    from Scrapers.Absorption_Edge_Reader import clean_ascii_table, create_edge_data_dict
+    pages = {"NIST": [], "UW": []}
+    for name in sorted(os.listdir(cache_directory)):
+        if name.endswith(".html") and name.split("_")[0] in pages:
+            with open(os.path.join(cache_directory, name), "r", encoding="utf-8") as html_file:
+                pages[name.split("_")[0]].append((name[:-5], html_file.read()))
+
+    def original_NIST(key, page):
+        table = html_lac_reader(BeautifulSoup(page, "html.parser").find("pre").get_text(), key, "r")
+        return {str(energy): MAC for energy, MAC in table.items()}
+
+    def original_UW(key, page):
+        cleaned = clean_ascii_table(BeautifulSoup(page, "html.parser").find("pre").get_text())
+        return create_edge_data_dict(cleaned)[cleaned[2]]
+
+    results = {}
+    for source, original, fast in (("NIST", original_NIST, lambda key, page: parse_NIST_page(page)),
+                                   ("UW", original_UW, lambda key, page: uw_edge_list(page))):
+        if not pages[source]:
+            continue
+        identical = all(original(key, page) == fast(key, page) for key, page in pages[source])
+        timings = []
+        for parser in (original, fast):
+            start = time.perf_counter()
+            for _ in range(repeats):
+                for key, page in pages[source]:
+                    parser(key, page)
+            timings.append((time.perf_counter() - start) / repeats)
+        results[source] = (len(pages[source]), timings[0], timings[1], identical)
+    return results
+
+
+# -------- Begin User-Facing Code --------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the fast NIST/UW parsers against the BeautifulSoup versions.")
+    parser.add_argument("--cache-dir", default=fixture_directory,
+                        help="Directory of saved NIST_*/UW_* pages (default: the recorded pages in Scrapers/fixtures)")
+    parser.add_argument("--repeats", type=int, default=5)
+    arguments = parser.parse_args()
+    for source, (n_pages, original_seconds, fast_seconds, identical) in benchmark_parsers(arguments.cache_dir, arguments.repeats).items():
+        print("{source}: {n} pages, BeautifulSoup {o:.1f} ms, fast {f:.1f} ms ({x:.0f}x), identical output: {same}".format(
+            source=source, n=n_pages, o=original_seconds * 1000, f=fast_seconds * 1000, x=original_seconds / fast_seconds, same=identical))
@@ -0,0 +1,269 @@
+# A python script to rebuild every reference table used by MAC_Calculator.py in one pass
+# Mass attenuation coefficients come from NIST Standard Reference Database 126 (as in Atomic_LAC_Reader.py)
+# https://www.nist.gov/pml/x-ray-mass-attenuation-coefficients
+# Absorption edges come from Ethan Merritt at UW (as in Absorption_Edge_Reader.py)
+# http://skuld.bmsc.washington.edu/scatter/AS_periodic.html
+#
+# Compared to running the two scrapers above, this tool:
+#   - fetches pages from a small thread pool sharing one pooled requests.Session with retries and backoff
+#   - keeps the raw HTML of every page in an on-disk cache and revalidates it with ETag/Last-Modified headers,
+#     so unchanged pages are not downloaded (or re-parsed) again
+#   - only updates the elements whose pages changed, keeping the rest of the existing JSONs as they are
+#   - writes Atomic_MACs.json, X-ray_Absorption_Edges.json, the compact Reference_Tables.npz and Anode_MAC_Table.json together
+# Run from the repository root. --offline rebuilds from the cache alone, and --nist-base-url/--uw-base-url point the
+# tool at a local stand-in server (e.g. "python -m http.server" over saved pages):
+#   python -m Scrapers.Reference_Table_Rebuilder --workers 8
+#   python -m Scrapers.Reference_Table_Rebuilder --offline
+# Scrapers/fixtures holds a small set of pages in the cache layout, and test_Reference_Table_Rebuilder.py rebuilds from
+# them with no network access:
+#   python -m unittest Scrapers.test_Reference_Table_Rebuilder
+
+# -------- Imports --------
+# Necessary for command line arguments, hashing, file handling and timestamps
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+# Necessary for pooled, retrying HTTP requests
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+# Necessary for the compact binary tables
+import numpy as np
+
+# Element list from the original edge scraper (its scraping loop only runs when it is executed directly)
+from Scrapers.Absorption_Edge_Reader import atomic_symbols
+# Fast parsers which return exactly what the original scrapers' parsers do
+from Scrapers.Fast_Table_Parsers import parse_NIST_page, uw_edge_list
+# Symbol to proton number map, so one element can be selected by either
+from src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.Formula_Parser import symbol_to_Z
+# Anode table builder, so Anode_MAC_Table.json always matches the rebuilt Atomic_MACs.json
+from src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.Anode_MAC_Table_Builder import build_anode_MAC_table
+
+# -------- Global Variables --------
+
+# Default sources; override with --nist-base-url and --uw-base-url to use a local stand-in server
+NIST_base_url = "https://physics.nist.gov/PhysRefData/XrayMassCoef/ElemTab/"
+UW_base_url = "http://skuld.bmsc.washington.edu/scatter/data/"
+
+# Output locations
+Scrapers_directory = os.path.dirname(os.path.abspath(__file__))
+MAC_JSON_directory = os.path.join(os.path.dirname(Scrapers_directory), "src", "PXRD_Beam_Footprint_Calculator",
+                                  "MAC_Calculator_Directory", "MAC_JSONs")
+default_cache_directory = os.path.join(Scrapers_directory, "raw_html_cache")
+
+# -------- Raw HTML Cache --------
+
+class RawPageCache:
+    def __init__(self, directory=default_cache_directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def __repr__(self):
+        return "A raw HTML cache of {n} pages in {directory}.".format(n=len(self.keys()), directory=self.directory)
+
+    def keys(self):
+        return sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith(".html"))
+
+    def _paths(self, key):
+        return os.path.join(self.directory, key + ".html"), os.path.join(self.directory, key + ".json")
+
+    # Function to return (html text, metadata dictionary) or (None, {}) if the page has never been fetched
+    def load(self, key):
+        html_path, meta_path = self._paths(key)
+        if not os.path.exists(html_path):
+            return None, {}
+        with open(html_path, "r", encoding="utf-8") as html_file:
+            text = html_file.read()
+        metadata = {}
+        if os.path.exists(meta_path):
+            with open(meta_path, "r") as meta_file:
+                metadata = json.load(meta_file)
+        return text, metadata
+
+    # Function to store a page and its validators (written to temporary files first so a crash never leaves half a page)
+    def store(self, key, text, metadata):
+        html_path, meta_path = self._paths(key)
+        for path, content in ((html_path, text), (meta_path, json.dumps(metadata))):
+            with open(path + ".tmp", "w", encoding="utf-8") as out_file:
+                out_file.write(content)
+            os.replace(path + ".tmp", path)
+
+# -------- Fetching Functions --------
+
+# Function to build one session shared by every worker thread, with a connection pool and retries with backoff
+def make_session(pool_size=8, retries=4, backoff_factor=0.5):
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=[429, 500, 502, 503, 504],
+                  allowed_methods=["GET"])
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = "PXRD_Beam_Footprint_Calculator reference table rebuilder"
+    return session
+
+# Function to return (html text, changed bool) for one page, revalidating any cached copy
+def fetch_page(session, cache, key, url, offline=False, timeout=30):
+    cached_text, metadata = cache.load(key)
+    if offline:
+        if cached_text is None:
+            raise FileNotFoundError("No cached copy of {} ({}) for an offline rebuild.".format(key, url))
+        return cached_text, False
+    headers = {}
+    if cached_text is not None and metadata.get("url") == url: # Only revalidate pages fetched from the same source
+        if metadata.get("etag"):
+            headers["If-None-Match"] = metadata["etag"]
+        if metadata.get("last_modified"):
+            headers["If-Modified-Since"] = metadata["last_modified"]
+    response = session.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304: # Not modified: the cached copy is current
+        return cached_text, False
+    response.raise_for_status() # Raise an exception for HTTP errors
+    text = response.text
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    changed = digest != metadata.get("sha256")
+    # Validators are only kept when the server sent them; without one the page is simply fetched in full next time
+    cache.store(key, text, {"url": url, "etag": response.headers.get("ETag"), "sha256": digest,
+                            "last_modified": response.headers.get("Last-Modified"), "fetched": time.time()})
+    return text, changed
+
+# Function to fetch every {key: url} page concurrently
+# Returns ({key: (html text, changed)}, {key: error message}) so one failed page does not stop the rebuild
+def fetch_pages(pages, cache, session=None, workers=8, offline=False):
+    session = session if session is not None else make_session(workers)
+    results, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {key: pool.submit(fetch_page, session, cache, key, url, offline) for key, url in pages.items()}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                errors[key] = str(e)
+    return results, errors
+
+# -------- Output Functions --------
+
+# Function to load an existing JSON table, or an empty dictionary if there is none yet
+def load_existing(filename):
+    try:
+        with open(filename, "r") as jsonfile:
+            return json.load(jsonfile)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+# Function to write a JSON table through a temporary file so readers never see a partial file
+def atomic_json_writer(data_dict, filename):
+    with open(filename + ".tmp", "w") as f:
+        json.dump(data_dict, f) # Same compact form as simple_json_writer
+    os.replace(filename + ".tmp", filename)
+    print(f"Dictionary successfully written to {filename}")
+
+# Function to write both tables as flat NumPy arrays, which load far faster than the JSONs
+# MACs: one row per (Z, energy) sorted by Z then energy, with mac_offsets[Z - 1]:mac_offsets[Z] slicing each element
+# Edges: one row per edge with the element's index into edge_symbols
+def write_reference_arrays(MAC_dict, edge_dict, filename):
+    Z_values, energies, MACs, offsets = [], [], [], [0]
+    for z_num in range(1, 93):
+        element = MAC_dict.get(str(z_num), {})
+        for energy, MAC in element.items():
+            Z_values.append(z_num)
+            energies.append(float(energy))
+            MACs.append(MAC)
+        offsets.append(len(Z_values))
+    symbols = list(edge_dict.keys())
+    edge_index, edge_labels, edge_keV, edge_angstrom = [], [], [], []
+    for i, symbol in enumerate(symbols):
+        for label, keV, angstrom in edge_dict[symbol]:
+            edge_index.append(i)
+            edge_labels.append(label)
+            edge_keV.append(float(keV))
+            edge_angstrom.append(float(angstrom))
+    with open(filename + ".tmp", "wb") as out_file:
+        np.savez_compressed(out_file, mac_Z=np.array(Z_values, dtype=np.int16), mac_energy_keV=np.array(energies),
+                            mac_value=np.array(MACs), mac_offsets=np.array(offsets, dtype=np.int64),
+                            edge_symbols=np.array(symbols), edge_element=np.array(edge_index, dtype=np.int16),
+                            edge_label=np.array(edge_labels), edge_keV=np.array(edge_keV), edge_angstrom=np.array(edge_angstrom))
+    os.replace(filename + ".tmp", filename)
+    print(f"Compact arrays successfully written to {filename}")
+
+# -------- Rebuild --------
+
+# Function to return (Z numbers of the NIST pages, symbols of the UW pages) to refresh
+# elements may mix Z numbers and symbols (e.g. {26, "Cu"}); either form selects the element's page from both sources
+def selected_elements(elements=None):
+    if elements is None:
+        return list(range(1, 93)), list(atomic_symbols)
+    z_selected = set()
+    for item in elements:
+        if isinstance(item, str) and item not in symbol_to_Z:
+            raise ValueError("Unknown element '{}'.".format(item))
+        z_selected.add(item if isinstance(item, int) else symbol_to_Z[item])
+    return ([z for z in range(1, 93) if z in z_selected],
+            [symbol for symbol in atomic_symbols if symbol_to_Z[symbol] in z_selected]) # UW pages cover Na to U only
+
+# Function to rebuild the tables, re-parsing only changed or missing elements
+# Returns a summary dictionary of what was fetched, changed and failed
+def rebuild_reference_tables(nist_base_url=NIST_base_url, uw_base_url=UW_base_url, cache_directory=default_cache_directory,
+                             output_directory=MAC_JSON_directory, workers=8, offline=False, elements=None):
+    cache = RawPageCache(cache_directory)
+    MAC_path = os.path.join(output_directory, "Atomic_MACs.json")
+    edge_path = os.path.join(output_directory, "X-ray_Absorption_Edges.json")
+    MAC_dict = load_existing(MAC_path)
+    edge_dict = load_existing(edge_path)
+    z_numbers, symbols = selected_elements(elements)
+    pages = {"NIST_z{:02d}".format(z): nist_base_url + "z{:02d}.html".format(z) for z in z_numbers}
+    pages.update({"UW_" + symbol: uw_base_url + "{}.html".format(symbol) for symbol in symbols})
+    results, errors = fetch_pages(pages, cache, workers=workers, offline=offline)
+
+    updated = []
+    for z in z_numbers: # Per-element updates: only pages which changed (or are missing from the JSON) are re-parsed
+        key = "NIST_z{:02d}".format(z)
+        if key in results and (results[key][1] or str(z) not in MAC_dict or offline):
+            try:
+                MAC_dict[str(z)] = parse_NIST_page(results[key][0])
+                updated.append(key)
+            except Exception as e:
+                errors[key] = "Could not parse: {}".format(e)
+    for symbol in symbols:
+        key = "UW_" + symbol
+        if key in results and (results[key][1] or symbol not in edge_dict or offline):
+            try:
+                edge_dict[symbol] = uw_edge_list(results[key][0])
+                updated.append(key)
+            except Exception as e:
+                errors[key] = "Could not parse: {}".format(e)
+
+    if updated: # Write every artifact together so they always agree with one another
+        MAC_dict = {str(z): MAC_dict[str(z)] for z in range(1, 93) if str(z) in MAC_dict} # Keep the Z order
+        edge_dict = {symbol: edge_dict[symbol] for symbol in atomic_symbols if symbol in edge_dict}
+        atomic_json_writer(MAC_dict, MAC_path)
+        atomic_json_writer(edge_dict, edge_path)
+        write_reference_arrays(MAC_dict, edge_dict, os.path.join(output_directory, "Reference_Tables.npz"))
+        if all(str(z) in MAC_dict for z in range(1, 93)): # The anode table needs every element
+            atomic_json_writer(build_anode_MAC_table(MAC_dict), os.path.join(output_directory, "Anode_MAC_Table.json"))
+    return {"pages": len(pages), "fetched": len(results), "updated": updated, "errors": errors}
+
+# -------- Functional Scraping/JSON Loop --------
+# Caution - do not run this without justification (i.e. updating the current JSON files)
+# The cache keeps repeat runs light on the servers, but a first run still requests 174 pages!
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the NIST MAC and UW absorption edge tables.")
+    parser.add_argument("--nist-base-url", default=NIST_base_url)
+    parser.add_argument("--uw-base-url", default=UW_base_url)
+    parser.add_argument("--cache-dir", default=default_cache_directory)
+    parser.add_argument("--output-dir", default=MAC_JSON_directory)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--offline", action="store_true", help="Rebuild from the raw HTML cache without any requests")
+    parser.add_argument("--elements", nargs="+", help="Only refresh these Z numbers and/or symbols (e.g. 26 Fe)")
+    arguments = parser.parse_args()
+    elements = None
+    if arguments.elements:
+        elements = {int(item) if item.isdigit() else item for item in arguments.elements}
+    summary = rebuild_reference_tables(arguments.nist_base_url, arguments.uw_base_url, arguments.cache_dir,
+                                       arguments.output_dir, arguments.workers, arguments.offline, elements)
+    print("Fetched {fetched} of {pages} pages; updated {n} elements.".format(n=len(summary["updated"]), **summary))
+    for key, error in summary["errors"].items():
+        print("Error for {key}: {error}".format(key=key, error=error))
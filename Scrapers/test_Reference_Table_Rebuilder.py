@@ -0,0 +1,159 @@
+# Tests for Reference_Table_Rebuilder.py which need no network access
+# The pages in Scrapers/fixtures are laid out like the NIST ElemTab and UW pages the scrapers read. NIST_z04 is built
+# from the NIST table for beryllium saved in Atomic_LAC_Working.txt. NIST_z26 (iron, with its K edge) is built from the
+# committed Atomic_MACs.json entry and the below-edge value from SpekPy's NIST table; its mu_en/rho column is a stand-in
+# (see the comment in the page). The UW pages are built from the committed X-ray_Absorption_Edges.json entries.
+# Run from the repository root with:
+#   python -m unittest Scrapers.test_Reference_Table_Rebuilder
+
+# -------- Imports --------
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from Scrapers.Reference_Table_Rebuilder import (MAC_JSON_directory, RawPageCache, fetch_page, make_session,
+                                                rebuild_reference_tables, selected_elements)
+from Scrapers.Fast_Table_Parsers import parse_NIST_page, parse_NIST_table, first_pre_block
+
+# -------- Global Variables --------
+
+fixture_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+table_names = ["Atomic_MACs.json", "X-ray_Absorption_Edges.json"]
+
+# Function to load a committed reference table
+def load_committed(name):
+    with open(os.path.join(MAC_JSON_directory, name), "r") as jsonfile:
+        return json.load(jsonfile)
+
+# Function to read a fixture page
+def load_fixture(key):
+    with open(os.path.join(fixture_directory, key + ".html"), "r", encoding="utf-8") as html_file:
+        return html_file.read()
+
+# -------- Tests --------
+
+class NISTTableTest(unittest.TestCase):
+    def test_edge_rows_kept(self):
+        table = parse_NIST_table(first_pre_block(load_fixture("NIST_z26")))
+        edge_rows = [i for i, label in enumerate(table["edge"]) if label]
+        self.assertEqual(table["edge"][edge_rows].tolist(), ["K"])
+        below, above = edge_rows[0] - 1, edge_rows[0]
+        self.assertEqual(table["energy keV"][below], table["energy keV"][above]) # The edge energy appears twice
+        self.assertAlmostEqual(table["energy keV"][above], 7.112)
+        self.assertEqual((table["mu/rho"][below], table["mu/rho"][above]), (53.2, 407.6))
+        # Atomic_MACs.json keeps only the above-edge value at a repeated energy
+        self.assertEqual(parse_NIST_page(load_fixture("NIST_z26"))["7.112"], 407.6)
+        self.assertEqual(len(table["edge"]), len(load_committed("Atomic_MACs.json")["26"]) + 1)
+
+    def test_all_coefficient_columns(self):
+        table = parse_NIST_table(first_pre_block(load_fixture("NIST_z04")))
+        self.assertEqual(len(table["mu/rho"]), len(table["mu_en/rho"]))
+        self.assertEqual((table["mu/rho"][0], table["mu_en/rho"][0]), (604.1, 603.5)) # First row of the saved table
+        self.assertFalse(any(table["edge"]))
+
+class ElementSelectionTest(unittest.TestCase):
+    def test_symbol_and_Z_select_both_sources(self):
+        self.assertEqual(selected_elements({"Fe"}), ([26], ["Fe"]))
+        self.assertEqual(selected_elements({26}), ([26], ["Fe"]))
+        self.assertEqual(selected_elements({"Cu", 82}), ([29, 82], ["Cu", "Pb"]))
+
+    def test_elements_without_UW_page(self):
+        self.assertEqual(selected_elements({"Be"}), ([4], []))
+
+    def test_unknown_symbol(self):
+        with self.assertRaises(ValueError):
+            selected_elements({"Xq"})
+
+class OfflineRebuildTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_directory = tempfile.mkdtemp()
+        self.output_directory = tempfile.mkdtemp()
+        for name in os.listdir(fixture_directory):
+            shutil.copy(os.path.join(fixture_directory, name), self.cache_directory)
+        for name in table_names: # Start from the committed tables so only the selected elements are re-parsed
+            shutil.copy(os.path.join(MAC_JSON_directory, name), self.output_directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_directory)
+        shutil.rmtree(self.output_directory)
+
+    def rebuilt(self, name):
+        with open(os.path.join(self.output_directory, name), "r") as jsonfile:
+            return json.load(jsonfile)
+
+    def test_NIST_page(self):
+        summary = rebuild_reference_tables(cache_directory=self.cache_directory, output_directory=self.output_directory,
+                                           offline=True, elements={"Be"})
+        self.assertEqual(summary["updated"], ["NIST_z04"])
+        self.assertEqual(summary["errors"], {})
+        committed, rebuilt = load_committed("Atomic_MACs.json"), self.rebuilt("Atomic_MACs.json")
+        # The saved table runs to 20 MeV, one row past the committed entry; every committed energy must match
+        self.assertEqual({energy: rebuilt["4"][energy] for energy in committed["4"]}, committed["4"])
+        self.assertEqual({z: MACs for z, MACs in rebuilt.items() if z != "4"},
+                         {z: MACs for z, MACs in committed.items() if z != "4"})
+        self.assertTrue(os.path.exists(os.path.join(self.output_directory, "Reference_Tables.npz")))
+        self.assertTrue(os.path.exists(os.path.join(self.output_directory, "Anode_MAC_Table.json")))
+
+    def test_UW_pages(self):
+        summary = rebuild_reference_tables(cache_directory=self.cache_directory, output_directory=self.output_directory,
+                                           offline=True, elements={"Fe", "Cu", "Pb"})
+        self.assertEqual(sorted(summary["updated"]), ["NIST_z26", "UW_Cu", "UW_Fe", "UW_Pb"])
+        # No NIST pages for Cu and Pb are recorded, so an offline rebuild reports them and carries on
+        self.assertEqual(sorted(summary["errors"]), ["NIST_z29", "NIST_z82"])
+        self.assertEqual(self.rebuilt("X-ray_Absorption_Edges.json"), load_committed("X-ray_Absorption_Edges.json"))
+        self.assertEqual(self.rebuilt("Atomic_MACs.json"), load_committed("Atomic_MACs.json"))
+
+    def test_unchanged_without_selected_pages(self):
+        summary = rebuild_reference_tables(cache_directory=self.cache_directory, output_directory=self.output_directory,
+                                           offline=True, elements={"Xe"})
+        self.assertEqual(summary["updated"], [])
+        self.assertFalse(os.path.exists(os.path.join(self.output_directory, "Reference_Tables.npz")))
+
+# Local server which serves the fixture pages without any Last-Modified or ETag header and records request headers
+class FixtureHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        FixtureHandler.requests_seen.append(dict(self.headers))
+        with open(os.path.join(fixture_directory, os.path.basename(self.path)), "rb") as html_file:
+            body = html_file.read()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class ValidatorTest(unittest.TestCase):
+    def setUp(self):
+        FixtureHandler.requests_seen = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = "http://127.0.0.1:{}/NIST_z04.html".format(self.server.server_port)
+        self.cache = RawPageCache(tempfile.mkdtemp())
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.cache.directory)
+
+    def test_no_invented_last_modified(self):
+        session = make_session(1)
+        text, changed = fetch_page(session, self.cache, "NIST_z04", self.url)
+        self.assertTrue(changed)
+        self.assertIsNone(self.cache.load("NIST_z04")[1]["last_modified"])
+        text, changed = fetch_page(session, self.cache, "NIST_z04", self.url)
+        self.assertFalse(changed) # Same content, so the element is not re-parsed
+        self.assertNotIn("If-Modified-Since", FixtureHandler.requests_seen[-1])
+        self.assertNotIn("If-None-Match", FixtureHandler.requests_seen[-1])
+        self.assertEqual(parse_NIST_page(text), parse_NIST_page(load_fixture("NIST_z04")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+# Developed by Mitch S-A
+# Updated on October 19, 2026
+
+# Adaptive sampling of the FDS beam length and ADS aperture curves. FDS_length and phi_solver step through a uniform
+# 1 degree grid, but the beam length changes very quickly at low angle (where spill-over happens) and barely at all at
+# high angle. These functions keep bisecting only the intervals where a straight line between neighbouring points is
+# not accurate to within the tolerance, or where the curve crosses a boundary such as the holder's axial length, so an
+# accurate curve and the exact crossing angles come from a fraction of the evaluations of a dense uniform grid.
+# Angles are passed the same way as FDS_length and phi_solver, and results are returned as NumPy arrays.
+
+# ---------- Necessary imports ----------
+
+# Libraries to allow for array calculations and root solving
+import numpy as np
+from scipy.optimize import brentq
+
+# Import the geometry functions from the parent script
+from src.PXRD_Beam_Footprint_Calculator.Beam_Profile_Calculator import l_short, l_long
+
+# ---------- Vectorized Curve Functions ----------
+
+# Function to return the FDS beam length (mm) for an array of angles
+def FDS_length_array(radius, phi_degrees, theta_degrees):
+    theta_degrees = np.asarray(theta_degrees, dtype=float)
+    return l_short(radius, phi_degrees, theta_degrees) + l_long(radius, phi_degrees, theta_degrees)
+
+# Function to return the ADS divergence angle (degrees) for an array of angles
+# Solves ADS_equation_for_phi in closed form: A cos(phi) - B sin(phi) = C, the same small positive root phi_solver finds
+def ADS_phi_array(length_mm, radius_mm, theta_degrees):
+    theta = np.deg2rad(np.asarray(theta_degrees, dtype=float))
+    A = length_mm
+    B = 2 * radius_mm * np.sin(theta)
+    C = length_mm * np.cos(2 * theta)
+    phi = np.arccos(np.clip(C / np.hypot(A, B), -1, 1)) - np.arctan2(B, A)
+    return np.rad2deg(phi)
+
+# ---------- Adaptive Sampling ----------
+
+# Function to adaptively sample any vectorized curve between two angles
+# Returns (angles, values, crossing angles, number of function evaluations)
+def adaptive_curve(value_function, min_theta_degrees, max_theta_degrees, tolerance=0.01, boundary=None,
+                   min_step=1e-3, max_step=5.0, initial_points=9, max_points=100000):
+    theta = np.linspace(min_theta_degrees, max_theta_degrees, initial_points)
+    values = value_function(theta)
+    evaluations = theta.size
+    active = np.ones(theta.size - 1, dtype=bool) # Intervals which still need to be tested
+    while active.any() and theta.size < max_points:
+        tested = np.flatnonzero(active)
+        width = theta[tested + 1] - theta[tested]
+        midpoints = theta[tested] + width / 2
+        midpoint_values = value_function(midpoints)
+        evaluations += midpoints.size
+        # Error of linear interpolation at the middle of each tested interval
+        interpolation_error = np.abs(midpoint_values - (values[tested] + values[tested + 1]) / 2)
+        refine = ((interpolation_error > tolerance) | (width > max_step)) & (width > min_step)
+        if boundary is not None: # Keep bisecting intervals where the curve crosses the boundary
+            refine |= (np.sign(values[tested] - boundary) != np.sign(values[tested + 1] - boundary)) & (width > min_step)
+        active[tested] = False # Intervals which were accurate enough are finished
+        split = tested[refine]
+        # Insert the midpoints of intervals which needed refinement (already evaluated above); both halves stay active
+        theta = np.insert(theta, split + 1, midpoints[refine])
+        values = np.insert(values, split + 1, midpoint_values[refine])
+        active = np.insert(active, split + 1, True)
+        active[split + np.arange(split.size)] = True
+    crossings = np.array([])
+    if boundary is not None: # Polish each bracketed crossing to machine precision
+        side = np.sign(values - boundary)
+        brackets = np.flatnonzero(side[:-1] * side[1:] < 0)
+        crossings = np.array([brentq(lambda t: float(value_function(np.array([t]))[0]) - boundary, theta[i], theta[i + 1])
+                              for i in brackets])
+        exact_hits = theta[side == 0] # Grid points landing exactly on the boundary
+        crossings = np.sort(np.concatenate([crossings, exact_hits]))
+    return theta, values, crossings, evaluations
+
+# Function to adaptively sample the FDS beam length, optionally locating where it crosses the holder's length
+def adaptive_FDS_length(radius, phi_degrees, min_theta_degrees, max_theta_degrees, tolerance=0.01, boundary=None, **kwargs):
+    # Angles at or below phi/2 have no finite beam length, so start just above
+    min_theta_degrees = max(min_theta_degrees, phi_degrees / 2 + 1e-6)
+    return adaptive_curve(lambda theta: FDS_length_array(radius, phi_degrees, theta), min_theta_degrees, max_theta_degrees,
+                          tolerance, boundary, **kwargs)
+
+# Function to adaptively sample the ADS divergence angle (degrees) over an angular range
+def adaptive_phi_solver(length_mm, radius_mm, min_theta_degrees, max_theta_degrees, tolerance=0.001, boundary=None, **kwargs):
+    return adaptive_curve(lambda theta: ADS_phi_array(length_mm, radius_mm, theta), min_theta_degrees, max_theta_degrees,
+                          tolerance, boundary, **kwargs)
@@ -0,0 +1,185 @@
+# Developed by Mitch S-A
+# Updated on October 19, 2026
+
+# Columnar export of batch and sweep results to Parquet or Arrow, for results too large or too numerous for JSON.
+# Result columns are NumPy arrays and are handed to pyarrow without building a Python object per row:
+#   - numeric columns are wrapped as they are (NaN stays NaN), so no values are copied
+#   - enum columns (shape, mode, anode, ...) are written as Arrow dictionary arrays straight from their integer codes and
+#     the short list of labels, the same dictionary encoding ScenarioTable uses in memory
+#   - 2D columns (e.g. a curve of beam lengths over 2theta per scenario) become fixed-size list columns over the same buffer
+#   - masked arrays (np.ma) keep their masked entries as nulls, e.g. a LAC which could not be calculated
+# ResultStreamWriter writes one record batch at a time (a Parquet row group, or a record batch of an Arrow IPC file or
+# stream) and keeps nothing of the rows once they are written, so outputs can be far larger than memory.
+# export_scenario_results() streams the fit, spill-over onset and attenuation checks of a ScenarioTable through it in
+# chunks, and Manifest_Batch_Checker.py writes its Parquet and Arrow results through it as well.
+# pyarrow is optional and only needed here. Run from the repository root with, e.g.:
+#   python -m src.PXRD_Beam_Footprint_Calculator.Arrow_Result_Export scenarios.parquet --min-2theta 5
+
+# ---------- Necessary imports ----------
+
+# Libraries for the command line, file extensions and timing
+import argparse
+import os
+import time
+# Library to allow for array calculations
+import numpy as np
+# pyarrow is only needed for export
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Import the enum lists and the scenario table with its kernels
+from src.PXRD_Beam_Footprint_Calculator.Beam_Profile_Calculator import holder_shapes, optical_modes
+from src.PXRD_Beam_Footprint_Calculator.Scenario_Arrays import (ScenarioTable, scenario_fits, scenario_onset,
+    scenario_attenuation)
+
+# ---------- Short Reference Dictionaries and Lists ----------
+
+# Output formats by file extension: ".arrow" files use the Arrow IPC file format (random access to every batch) and
+# ".arrows" files the Arrow IPC streaming format
+export_formats = {".parquet": "parquet", ".pq": "parquet", ".arrow": "arrow", ".arrows": "arrows"}
+
+# Scenario table columns stored as enum codes, and the label lists their codes index
+scenario_categories = {"mode": optical_modes, "shape": holder_shapes}
+
+# Default number of scenarios computed and written per record batch
+default_batch_rows = 100000
+
+# ---------- Column Conversion ----------
+
+# Function to stop with a clear message when pyarrow is missing
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Arrow and Parquet export requires pyarrow (pip install pyarrow).")
+
+# Function to turn one NumPy column into an Arrow array
+#   categories: the list of labels an integer code column indexes, to write it as a dictionary array
+#   2D columns become fixed-size lists of their second dimension, and masked entries of a masked array become nulls
+def arrow_column(values, categories=None):
+    _require_pyarrow()
+    if isinstance(values, np.ma.MaskedArray):
+        return pa.array(values.data, mask=np.ma.getmaskarray(values))
+    values = np.asarray(values)
+    if categories is not None:
+        return pa.DictionaryArray.from_arrays(pa.array(values), pa.array(list(categories), type=pa.string()))
+    if values.dtype.kind in "OUS": # Free text (sample IDs, formulas, messages) is written as plain strings
+        return pa.array(values.astype(str) if values.dtype.kind == "S" else values, type=pa.string())
+    if values.ndim == 2:
+        return pa.FixedSizeListArray.from_arrays(pa.array(np.ascontiguousarray(values).ravel()), values.shape[1])
+    return pa.array(values)
+
+# Function to build a record batch from {name: NumPy column}, with {name: labels} for enum code columns
+def result_record_batch(columns, categories=None):
+    categories = categories or {}
+    return pa.RecordBatch.from_arrays([arrow_column(values, categories.get(name)) for name, values in columns.items()],
+                                      names=list(columns))
+
+# Function to return a scenario table's columns with the enum and name codes dictionary-encoded, plus any result columns
+def scenario_record_batch(table, results=None):
+    _require_pyarrow()
+    categories = dict(scenario_categories, optics_name=table.optics_names, sample_name=table.sample_names)
+    columns = table.to_columns(decode=False)
+    columns.update(results or {})
+    return result_record_batch(columns, categories)
+
+# ---------- Streaming Writer ----------
+
+class ResultStreamWriter:
+    def __init__(self, filepath, file_format=None, categories=None):
+        _require_pyarrow()
+        self.filepath = filepath
+        # {column: labels} for enum code columns, fixed when the writer opens so every batch shares one dictionary per
+        # column (an Arrow IPC file allows no other)
+        self.categories = dict(categories or {})
+        self.file_format = file_format or export_file_format(filepath)
+        if self.file_format not in ("parquet", "arrow", "arrows"):
+            raise ValueError("Export format must be 'parquet', 'arrow' or 'arrows', not '{}'.".format(self.file_format))
+        self.writer = None # Opened with the schema of the first batch
+        self.rows = 0
+        self.dictionaries = {} # The dictionary of each dictionary column in the first batch
+
+    def __repr__(self):
+        return "A {} result writer for {} ({} rows written)".format(self.file_format, self.filepath, self.rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # Function to write one record batch (or {name: NumPy column}, encoded with the writer's categories)
+    def write(self, batch, categories=None):
+        if not isinstance(batch, pa.RecordBatch):
+            batch = result_record_batch(batch, dict(self.categories, **(categories or {})))
+        if self.writer is None:
+            self.dictionaries = {name: column.dictionary for name, column in zip(batch.schema.names, batch.columns)
+                                 if pa.types.is_dictionary(column.type)}
+            if self.file_format == "parquet":
+                self.writer = pq.ParquetWriter(self.filepath, batch.schema)
+            elif self.file_format == "arrow":
+                self.writer = pa.ipc.new_file(self.filepath, batch.schema)
+            else:
+                self.writer = pa.ipc.new_stream(self.filepath, batch.schema)
+        elif self.file_format == "arrow": # Only checks the short label lists, never the rows
+            for name, column in zip(batch.schema.names, batch.columns):
+                if name in self.dictionaries and not column.dictionary.equals(self.dictionaries[name]):
+                    raise ValueError("Column '{}' changed its categories; an Arrow IPC file needs the same labels in "
+                                     "every batch.".format(name))
+        self.writer.write_batch(batch)
+        self.rows += batch.num_rows
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+# Function to return the export format of a file from its extension ("parquet" when it is not recognized)
+def export_file_format(filepath):
+    return export_formats.get(os.path.splitext(filepath)[1].lower(), "parquet")
+
+# Function to yield the record batches of a Parquet file, Arrow IPC file or Arrow IPC stream, one at a time
+def read_result_batches(filepath, batch_size=default_batch_rows):
+    _require_pyarrow()
+    file_format = export_file_format(filepath)
+    if file_format == "parquet":
+        yield from pq.ParquetFile(filepath).iter_batches(batch_size=batch_size)
+    elif file_format == "arrow":
+        with pa.ipc.open_file(filepath) as reader:
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+    else:
+        with pa.ipc.open_stream(filepath) as reader:
+            yield from reader
+
+# ---------- Scenario Export ----------
+
+# Function to evaluate a scenario table's checks in chunks of batch_rows scenarios and stream them to a file
+# Written columns are the scenario fields followed by "fits", "onset", "transmitted_fraction", "thick_enough" and
+# "required_depth_mm"; returns the number of rows written
+def export_scenario_results(table, filepath, min_2theta, threshold=None, batch_rows=default_batch_rows, file_format=None):
+    with ResultStreamWriter(filepath, file_format) as writer:
+        for start in range(0, len(table), batch_rows):
+            chunk = ScenarioTable(table.records[start:start + batch_rows], table.optics_names, table.sample_names)
+            intensity_ratio, thick_enough, required_depth = scenario_attenuation(chunk, threshold)
+            writer.write(scenario_record_batch(chunk, {"fits": scenario_fits(chunk, min_2theta), "onset": scenario_onset(chunk),
+                                                       "transmitted_fraction": intensity_ratio, "thick_enough": thick_enough,
+                                                       "required_depth_mm": required_depth}))
+        return writer.rows
+
+
+# ---------- Begin User-Facing Code ----------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the checks of every saved instrument/optics/holder scenario.")
+    parser.add_argument("output", help="Output file (.parquet, .arrow for an Arrow IPC file or .arrows for an Arrow IPC stream)")
+    parser.add_argument("--min-2theta", type=float, default=5, help="Lowest 2theta angle of the scan")
+    parser.add_argument("--manufacturer", help="Only include holders from this manufacturer")
+    parser.add_argument("--batch-rows", type=int, default=default_batch_rows, help="Scenarios per record batch")
+    arguments = parser.parse_args()
+    scenario_table = ScenarioTable.from_preconfigurations(arguments.manufacturer)
+    start_time = time.perf_counter()
+    written = export_scenario_results(scenario_table, arguments.output, arguments.min_2theta, batch_rows=arguments.batch_rows)
+    print("Wrote {:,} scenarios to {} in {:.1f} ms.".format(written, arguments.output, (time.perf_counter() - start_time) * 1000))
@@ -21,12 +21,17 @@ import matplotlib.patches as patches # For adding circle and rectangle shapes to
 
 # Simple list of holder shapes to more easily expand code applicability in the future
 holder_shapes = ["Circle", "Rectangle"]
+# List of optical modes; as with holder_shapes, the list index is the enum code used by Scenario_Arrays.py
+optical_modes = ["FDS", "ADS"]
 
 # Threshold to which incident intensity must be attenuated to pass the z_check
 attenuation_threshold = 0.05 # E.g. 0.05 means the X-ray beam must be attenuated to < 5% of it's original intensity by the sample
 
 # ---------- Class Definitions ----------
 class DiffractionSample:
+    # Slots keep each object small; attributes for the other shape or for z_check = False are simply left unset
+    __slots__ = ("name", "shape", "min_2theta", "diameter", "axi", "equi", "z_check", "MAC", "LAC", "depth")
+
     def __init__(self, name, shape, z_check, diameter= 0, axi = 0, equi = 0, MAC = 0, LAC = 0, depth = 0, min_2theta = 0):
         self.name = name
         self.shape = shape
@@ -41,7 +46,7 @@ class DiffractionSample:
             if MAC != 0: # prevents self.MAC from being instantiated as zero
                 self.MAC = MAC
             else:
-                self.MAC = None # Set to none if user inputs LAC directly, but keeps len(vars()) of object constant
+                self.MAC = None # Set to none if user inputs LAC directly, but keeps the number of set attributes constant
             self.LAC = LAC
         self.depth = depth # Depth must be initialized even if MAC is not to allow users to write custom sample holders for future use
 
@@ -60,9 +65,20 @@ class DiffractionSample:
         return string_1 + string_2 + string_3
 
     def print_all_information(self):
-        print(vars(self))
+        print(slot_values(self))
+
+    # Build a sample from one row of a Scenario_Arrays.py scenario table (shape is stored as its holder_shapes index)
+    @classmethod
+    def from_record(cls, record, name="Custom"):
+        MAC = float(record["MAC"])
+        return cls(name, holder_shapes[int(record["shape"])], bool(record["z_check"]), diameter=float(record["diameter"]),
+                   axi=float(record["axi"]), equi=float(record["equi"]), MAC=0 if np.isnan(MAC) else MAC,
+                   LAC=float(record["LAC"]), depth=float(record["depth"]), min_2theta=float(record["min_2theta"]))
 
 class Optics:
+    # Slots keep each object small and fix the attribute order used by JSON_writable: [name, mode, mask, slit or length]
+    __slots__ = ("name", "mode", "mask", "i_slit", "i_length")
+
     def __init__(self, mode, mask, name="Temp", i_slit=0, i_length=0):
         self.name = name # Passed if the user wants to save the configuration to a JSON under unique name
         self.mode = mode # Either "FDS" or "ADS"
@@ -87,15 +103,24 @@ class Optics:
         return string_1 + string_2 + string_3
 
     def print_all_information(self):
-        print(vars(self))
+        print(slot_values(self))
 
     # A function to output all the information of the configuration in a way which is JSON serializable
     def JSON_writable(self):
         components = [] # Establish an empty list to hold all information
-        for value in vars(self).values(): # For every value in the key, value pair generated by vars()
+        for value in slot_values(self).values(): # For every attribute which is set, in __slots__ order
             components.append(value)
         return components
 
+    # Build a configuration from one row of a Scenario_Arrays.py scenario table (mode is stored as its optical_modes index)
+    @classmethod
+    def from_record(cls, record, name="Temp"):
+        return cls(optical_modes[int(record["mode"])], float(record["mask"]), name, float(record["i_slit"]), float(record["i_length"]))
+
+# Function to return the attributes set on a slotted object as a dictionary, in the same form vars() would give
+def slot_values(obj):
+    return {slot: getattr(obj, slot) for slot in obj.__slots__ if hasattr(obj, slot)}
+
 # ---------- Simplifying Functions ----------
 
 # Function to get a y or n input from a user input
@@ -228,6 +253,25 @@ def load_preconfiguration(filepath):
     except Exception as e:
         print("Error loading preconfiguration file: {}".format(e))
 
+# Function to build a DiffractionSample from one saved holder of manufacturers_and_sample_holders.json, which is either
+# [name, "Circle", diameter, depth, min_2theta] or [name, "Rectangle", axi, equi, depth, min_2theta]
+def saved_holder_sample(holder, z_check=False, LAC=0):
+    if holder[1] == "Circle":
+        return DiffractionSample(holder[0], "Circle", z_check, diameter=float(holder[2]), LAC=LAC, depth=float(holder[3]),
+                                 min_2theta=float(holder[4]))
+    return DiffractionSample(holder[0], "Rectangle", z_check, axi=float(holder[2]), equi=float(holder[3]), LAC=LAC,
+                             depth=float(holder[4]), min_2theta=float(holder[5]))
+
+# Function to load every saved holder of a manufacturers_and_sample_holders.json (or only one manufacturer's) as
+# DiffractionSample objects. The manufacturer matches without regard to case and may be the start of the saved name,
+# so "Malvern" or "malvern panalytical" both pick "Malvern Panalytical"
+def load_saved_sample_holders(filepath, manufacturer=None):
+    samples = []
+    for holder_manufacturer, holders in (load_preconfiguration(filepath) or {}).items():
+        if manufacturer is None or holder_manufacturer.casefold().startswith(manufacturer.casefold()):
+            samples.extend(saved_holder_sample(holder) for holder in holders)
+    return samples
+
 # Function to update a JSON with user-desired information
 def update_JSON(filepath, key_to_update, new_value):
     data = load_preconfiguration(filepath) # Call JSON reading function to populate a Python dictionary with current JSON
@@ -250,6 +294,18 @@ def update_JSON(filepath, key_to_update, new_value):
     except Exception as e:
         print("Error updating JSON file (file): {error}".format(file=filepath, error=e))
 
+# Function to bring an already built compatibility_index.json up to date after update_JSON (see Compatibility_Index.py)
+# Only the instrument/holder/optics combinations touching the new entries are recalculated
+def refresh_compatibility_index(Beam_Profile_directory):
+    if not os.path.exists(os.path.join(Beam_Profile_directory, "Beam_Calc_JSONs", "compatibility_index.json")):
+        return # The facility index has not been built on this machine
+    repository_directory = os.path.dirname(os.path.dirname(Beam_Profile_directory)) # Contains the src package
+    bash_command = [sys.executable, "-m", "src.PXRD_Beam_Footprint_Calculator.Compatibility_Index", "--if-exists"]
+    try:
+        subprocess.run(bash_command, cwd=repository_directory, check=True)
+    except subprocess.CalledProcessError as e:
+        print("Unable to refresh the compatibility index: {e}".format(e=e))
+
 # ---------- Gonio and Beam Calculation Functions ----------
 
 # Function to calculate incident divergence slit angle from millimeter width
@@ -262,14 +318,14 @@ def DS_phi_from_mm(millimeter):
     return phi
 
 # Function to take LAC in cm^-1 and thickness in mm and return the percent attenuation and thick enough bool
-def beer_lambert(LAC, thickness):
-    thick_enough = False
+# For arrays of LACs, thicknesses and thresholds, see Beer_Lambert_Arrays.py
+def beer_lambert(LAC, thickness, threshold=None):
+    if threshold is None:
+        threshold = attenuation_threshold
     product = (-1) * (LAC * (thickness / 10)) # Convert thickness in mm to cm to get dimensionless exponent
     intensity_ratio = np.exp(product)
-    if intensity_ratio < attenuation_threshold: # If incident x-rays are attenuated to (E.g. < 5%) of their original intensity
-        thick_enough = True
-    else:
-        thick_enough = False
+    # True if incident x-rays are attenuated to (E.g. < 5%) of their original intensity
+    thick_enough = bool(intensity_ratio < threshold)
     return intensity_ratio, thick_enough
 
 # Function to take LAC in cm^-1 and thickness in mm and return the percent attenuation (above without the bool)
@@ -333,6 +389,25 @@ def circ_beam_overlap_checker(beam_width, beam_height, sample_radius):
     return distance_to_corner <= sample_radius # Returns True or False
 
 
+# Function to generate the {theta: value} data set for either optical mode
+def beam_curve_for_optics(radius, optics, min_theta_degrees, max_theta_degrees, step_size_deg=1):
+    if optics.mode == "FDS": # Generate dictionary of {theta: irradiated length}
+        return FDS_length(radius, optics.i_slit, min_theta_degrees, max_theta_degrees, step_size_deg)
+    elif optics.mode == "ADS": # Generate dictionary of {theta: aperature size}
+        return phi_solver(optics.i_length, radius, min_theta_degrees, max_theta_degrees, step_size_deg)
+
+# Function to determine if the largest beam fits inside the sample for any optics and sample combination
+def beam_fit_checker(optics, sample, graphable_data_set):
+    if optics.mode == "FDS": # The largest beam is found at the lowest angle of the data set
+        beam_length = list(graphable_data_set.values())[0]
+    else: # In ADS mode, the beam length is fixed by the user
+        beam_length = optics.i_length
+    if sample.shape == "Circle":
+        return circ_beam_overlap_checker(beam_length, optics.mask, (sample.diameter/2))
+    else:
+        return rect_beam_overlap_checker(beam_length, optics.mask, sample.axi, sample.equi)
+
+
 # ---------- Begin User-Facing Code ----------
 
 if __name__ == "__main__": # All code must go inside in this block to ensure proper resolving between packages
@@ -545,6 +620,8 @@ penetration depth of your beam.""")
         update_JSON(instru_gonio_path, user_instrument, user_gonio_radius)
         print("{instrument} was given a radius of {radius} mm".format(instrument=user_instrument,
                                                                       radius=user_gonio_radius))
+    if save_new_manu_sample or save_new_manu_instr or save_new_radius:
+        refresh_compatibility_index(Beam_Profile_directory)
 
     # Begin portion of code which prompts user for optic components
 
@@ -628,6 +705,7 @@ a 13 mm wide beam.\nEnter here:""", 0.0001, ) # Add lower bound to make sure the
                 print("Unable to save your optic settings: name already taken. Please try again later with a different name.")
             else:
                 update_JSON(optics_path, user_optics.name, user_optics.JSON_writable())
+                refresh_compatibility_index(Beam_Profile_directory)
 
     print("Optics configured.")
 
@@ -653,10 +731,7 @@ of your optical choices with your sample will be written in the caption.""", ["S
         layer_to_pass_threshold = beer_lambert_layer(user_diffraction_sample.LAC, attenuation_threshold)
 
     # Generate data set experiment depending on FDS or ADS mode:
-    if user_optics.mode == "FDS": # Generate dictionary of {theta: irradiated length}
-        graphable_data_set = FDS_length(user_gonio_radius, user_optics.i_slit, user_min_2theta, user_max_2theta)
-    elif user_optics.mode == "ADS": # Generate dictionary of {theta: aperature size}
-        graphable_data_set = phi_solver(user_optics.i_length, user_gonio_radius, user_min_2theta, user_max_2theta)
+    graphable_data_set = beam_curve_for_optics(user_gonio_radius, user_optics, user_min_2theta, user_max_2theta)
 
     # Begin portion of the code which generates a visual figure
 
@@ -872,16 +947,13 @@ of your optical choices with your sample will be written in the caption.""", ["S
     # Logic to determine if the beam fits inside the sample and set the proper string to remark on graphs 1 and 2
     if user_optics.mode == "FDS" and user_diffraction_sample.shape == "Circle":
         x_y_string = "The graph on the left displays how the beam length will vary over your two-theta range. To the right, two rectangles represent the smallest and largest beam sizes superimposed on your circular sample."
-        user_x_y_bool = circ_beam_overlap_checker(list(graphable_data_set.values())[0], user_optics.mask, (user_diffraction_sample.diameter/2))
     elif user_optics.mode == "FDS" and user_diffraction_sample.shape == "Rectangle":
         x_y_string = "The graph on the left displays how the beam length will vary over your two-theta range. To the right, two rectangles represent the smallest and largest beam sizes superimposed on your rectangular sample."
-        user_x_y_bool = rect_beam_overlap_checker(list(graphable_data_set.values())[0], user_optics.mask, user_diffraction_sample.axi, user_diffraction_sample.equi)
     elif user_optics.mode == "ADS" and user_diffraction_sample.shape == "Circle":
         x_y_string = "The graph on the left displays how the divergence slit aperture width will vary over your two-theta range. To the right, a rectangle represents the X-ray beam's profile superimposed on your circular sample."
-        user_x_y_bool = circ_beam_overlap_checker(user_optics.i_length, user_optics.mask, (user_diffraction_sample.diameter/2))
     elif user_optics.mode == "ADS" and user_diffraction_sample.shape == "Rectangle":
         x_y_string = "The graph on the left displays how the divergence slit aperture width will vary over your two-theta range. To the right, a rectangle represents the X-ray beam's profile superimposed on your rectangular sample."
-        user_x_y_bool = rect_beam_overlap_checker(user_optics.i_length, user_optics.mask, user_diffraction_sample.axi, user_diffraction_sample.equi)
+    user_x_y_bool = beam_fit_checker(user_optics, user_diffraction_sample, graphable_data_set)
     if user_x_y_bool:
         x_y_modifier_string = " Your beam is completely within the bounds of your sample." # Text to add if beam fits on sample
     if not user_x_y_bool:
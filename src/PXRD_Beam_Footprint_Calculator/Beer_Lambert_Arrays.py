@@ -0,0 +1,71 @@
+# Developed by Mitch S-A
+# Updated on October 19, 2026
+
+# Array versions of beer_lambert, beer_lambert_atten and beer_lambert_layer from Beam_Profile_Calculator.py.
+# Every function accepts scalars or NumPy arrays of LAC (cm^-1), thickness (mm) and threshold, broadcast against
+# each other, so thousands of samples can be checked in one call. Layer stacks (e.g. a sample sitting on a glass or
+# silicon zero-background plate) are described with a trailing "layer" axis, top layer first.
+
+# ---------- Necessary imports ----------
+
+# Library to allow for array calculations
+import numpy as np
+
+# Import the default threshold from the parent script
+from src.PXRD_Beam_Footprint_Calculator.Beam_Profile_Calculator import attenuation_threshold
+
+# ---------- Short Reference Dictionaries and Lists ----------
+
+# Common holder/substrate materials as {"name": [formula, density in g/cm^3]}, used to estimate holder artifacts
+substrate_materials = {"Glass": ["SiO2", 2.2], "Quartz": ["SiO2", 2.65], "Silicon": ["Si", 2.33],
+                       "Aluminum": ["Al", 2.70], "PMMA": ["C5H8O2", 1.18]}
+
+# ---------- Single-Layer Functions ----------
+
+# Function to return transmitted fraction, pass mask and required thickness (mm) for arrays of LAC/thickness/threshold
+def beer_lambert_arrays(LAC, thickness, threshold=None):
+    if threshold is None:
+        threshold = attenuation_threshold
+    LAC, thickness, threshold = np.broadcast_arrays(np.asarray(LAC, dtype=float), np.asarray(thickness, dtype=float),
+                                                    np.asarray(threshold, dtype=float))
+    intensity_ratio = np.exp(-LAC * (thickness / 10)) # Convert thickness in mm to cm to get dimensionless exponent
+    thick_enough = intensity_ratio < threshold # Pass mask without any Python-level branching
+    with np.errstate(divide="ignore"): # A LAC of zero never reaches the threshold (infinite thickness)
+        required_thickness = -np.log(threshold) / LAC * 10 # cm to mm
+    return intensity_ratio, thick_enough, required_thickness
+
+# ---------- Multilayer Functions ----------
+
+# Function to return the fraction of incident intensity absorbed in each layer of a stack and the fraction transmitted
+# LACs and thicknesses broadcast together, with the last axis running over the layers from the top down
+def beer_lambert_stack(LACs, thicknesses):
+    LACs, thicknesses = np.broadcast_arrays(np.asarray(LACs, dtype=float), np.asarray(thicknesses, dtype=float))
+    optical_depth = np.cumsum(LACs * (thicknesses / 10), axis=-1) # Dimensionless depth at the bottom of each layer
+    intensity_below = np.exp(-optical_depth) # Intensity leaving the bottom of each layer
+    intensity_above = np.concatenate([np.ones_like(intensity_below[..., :1]), intensity_below[..., :-1]], axis=-1)
+    absorbed_per_layer = intensity_above - intensity_below
+    return absorbed_per_layer, intensity_below[..., -1]
+
+# Function to estimate the share of the beam interacting with the holder/substrate beneath the sample
+# Returns (fraction of incident intensity absorbed by the substrate, substrate share of all absorbed intensity)
+def holder_artifact_estimate(sample_LAC, sample_thickness, substrate_LAC, substrate_thickness=np.inf):
+    sample_LAC, sample_thickness, substrate_LAC, substrate_thickness = np.broadcast_arrays(
+        *(np.asarray(value, dtype=float) for value in (sample_LAC, sample_thickness, substrate_LAC, substrate_thickness)))
+    absorbed, transmitted = beer_lambert_stack(np.stack([sample_LAC, substrate_LAC], axis=-1),
+                                               np.stack([sample_thickness, substrate_thickness], axis=-1))
+    substrate_absorbed = absorbed[..., 1]
+    total_absorbed = absorbed.sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"): # Nothing absorbed means no holder share
+        substrate_share = np.where(total_absorbed > 0, substrate_absorbed / total_absorbed, 0.0)
+    return substrate_absorbed, substrate_share
+
+# Function to calculate the LAC of a named substrate material from substrate_materials at an incident energy
+def substrate_LAC(material, incident_energy):
+    # Imported here so this module does not require the MAC calculator's formula parser unless it is needed
+    from src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.MAC_Calculator import calculate_formula_MAC, load_MAC_JSON
+    formula, density = substrate_materials[material]
+    valid_MAC, material_MAC = calculate_formula_MAC(formula, incident_energy, load_MAC_JSON("Element_Information_Dict.json"),
+                                                    load_MAC_JSON("Atomic_MACs.json"))
+    if not valid_MAC:
+        raise ValueError("Could not calculate the MAC of substrate '{}'.".format(material))
+    return material_MAC * density
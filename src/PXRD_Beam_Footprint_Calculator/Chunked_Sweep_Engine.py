@@ -0,0 +1,280 @@
+# Developed by Mitch S-A
+# Updated on October 19, 2026
+
+# Memory-bounded cartesian sweeps over 2theta x slits (or ADS lengths) x masks x radii x holders x thicknesses x LACs.
+# A full sweep is never held in memory: every point has a flat index into the product of the axes, and the sweep is cut
+# into runs of consecutive indices small enough to fit a memory ceiling. A chunk keeps only the flat index of each point
+# (the index along an axis is worked out from it when a reducer needs one), and the chunk size comes from the memory
+# per point measured with tracemalloc on a small probe chunk, reducers included. Each chunk is evaluated with the parent
+# script's functions (l_short + l_long as in FDS_length, the closed-form phi_solver of Adaptive_Theta_Grid.py and
+# beer_lambert_atten) and handed to streaming reducers, which keep only their running result:
+#   - ExtremeReducer: the smallest or largest value of an output (optionally only where a mask is True) and the point
+#     at which it occurs; ExtremeReducer("length", "max", where="fits") is the longest (brightest) beam that still fits
+#   - HistogramReducer: counts of an output over fixed bin edges
+#   - CountReducer: how many points pass a check, in total or per value of one axis
+# Memory use depends on the ceiling and not on the number of points, so 10^9-point sweeps run in constant memory.
+# float32 mode stores the axes and outputs in single precision at about 7 significant figures; the flat index and the
+# boolean outputs do not shrink, so a point takes a little over half the memory and chunks are nearly twice as long.
+# Run from the repository root with, e.g.:
+#   python -m src.PXRD_Beam_Footprint_Calculator.Chunked_Sweep_Engine --memory-mb 64 --float32
+
+# ---------- Necessary imports ----------
+
+# Libraries for the command line, timing and measuring memory per point
+import argparse
+import copy
+import time
+import tracemalloc
+# Library to allow for array calculations
+import numpy as np
+
+# Import the classes, reference lists, geometry and attenuation functions from the parent script and its helpers
+from src.PXRD_Beam_Footprint_Calculator.Beam_Profile_Calculator import (DiffractionSample, holder_shapes,
+    attenuation_threshold, l_short, l_long, beer_lambert_atten)
+from src.PXRD_Beam_Footprint_Calculator.Adaptive_Theta_Grid import ADS_phi_array
+
+# ---------- Short Reference Dictionaries and Lists ----------
+
+# Enum codes, as in Scenario_Arrays.py
+CIRCLE, RECTANGLE = holder_shapes.index("Circle"), holder_shapes.index("Rectangle")
+
+# Default memory ceiling for one chunk, in MB
+default_memory_mb = 256
+
+# Points evaluated (with the reducers) to measure the memory taken per point
+probe_points = 16384
+
+# ---------- Sweep Definition ----------
+
+class FootprintSweep:
+    def __init__(self, theta, radius, mask, holders, slit=None, length=None, thickness=None, LAC=None, threshold=None,
+                 dtype=np.float64):
+        if (slit is None) == (length is None):
+            raise ValueError("Give either FDS divergence slits or ADS irradiated lengths.")
+        self.dtype = np.dtype(dtype)
+        self.mode = "FDS" if slit is not None else "ADS"
+        holders = [holders] if isinstance(holders, DiffractionSample) else list(holders)
+        # Axes in nesting order, 2theta innermost so each chunk runs along whole scans
+        self.axes = {"radius": radius, "slit" if self.mode == "FDS" else "length": slit if slit is not None else length,
+                     "mask": mask, "holder": np.arange(len(holders))}
+        if thickness is not None:
+            self.axes["thickness"] = thickness
+        if LAC is not None:
+            self.axes["LAC"] = LAC
+        self.axes["theta"] = theta
+        self.axes = {name: np.atleast_1d(np.asarray(values, dtype=self.dtype if name != "holder" else np.intp))
+                     for name, values in self.axes.items()}
+        self.shape = tuple(len(values) for values in self.axes.values())
+        # Flat index step between neighbouring values of each axis, so an axis index is flat index // stride % size
+        self.strides = {name: int(np.prod(self.shape[i + 1:], dtype=np.int64)) for i, name in enumerate(self.axes)}
+        # Holder fields, indexed by the holder axis (unused fields are NaN, as in ScenarioTable)
+        self.holder_names = [holder.name for holder in holders]
+        self.holder_shape = np.array([holder_shapes.index(holder.shape) for holder in holders], dtype=np.int8)
+        self.holder_fields = {field: np.array([float(getattr(holder, field, np.nan) or np.nan) for holder in holders], dtype=self.dtype)
+                              for field in ("diameter", "axi", "equi", "depth")}
+        self.threshold = self.dtype.type(attenuation_threshold if threshold is None else threshold)
+        self.outputs = ["length" if self.mode == "FDS" else "phi", "fits"]
+        if LAC is not None:
+            self.outputs += ["transmitted", "thick enough", "passes"]
+
+    def __repr__(self):
+        return "A {mode} sweep of {n:,} points over {axes} ({dtype})".format(
+            mode=self.mode, n=len(self), axes=" x ".join("{} {}".format(size, name) for name, size in zip(self.axes, self.shape)),
+            dtype=self.dtype.name)
+
+    def __len__(self):
+        return int(np.prod(self.shape, dtype=np.int64))
+
+    # Function to return the peak bytes allocated per point while a probe chunk is evaluated and reduced
+    # Copies of the reducers are used, so the probe never counts towards a result
+    def point_bytes(self, reducers=()):
+        n_points = min(len(self), probe_points)
+        probe_reducers = copy.deepcopy(list(reducers))
+        tracing = tracemalloc.is_tracing() # Leave any tracing the caller started running
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        chunk = self.evaluate(0, n_points)
+        for reducer in probe_reducers:
+            reducer.update(chunk)
+        peak = tracemalloc.get_traced_memory()[1]
+        del chunk
+        if not tracing:
+            tracemalloc.stop()
+        return (peak - baseline) / n_points
+
+    # Function to return the number of points per chunk which keeps a chunk (and the reducers' work on it) under memory_mb
+    def chunk_points(self, memory_mb=default_memory_mb, reducers=()):
+        return max(1, int(memory_mb * 1024 ** 2 // self.point_bytes(reducers)))
+
+    # Function to evaluate the points with flat indices from start to stop
+    # Returns a SweepChunk of {"index", "<axis>" for every axis, and every output} as 1D arrays
+    def evaluate(self, start, stop):
+        chunk = SweepChunk(self, np.arange(start, stop, dtype=np.int64))
+        for name in self.axes:
+            chunk[name] = self.axes[name][chunk.axis_index(name)]
+        holder = chunk["holder"]
+        radius, mask, theta = chunk["radius"], chunk["mask"], chunk["theta"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if self.mode == "FDS": # FDS_length at every point; angles at or below slit/2 have no finite length
+                slit = chunk["slit"]
+                beam_length = l_short(radius, slit, theta) + l_long(radius, slit, theta)
+                beam_length[theta <= slit / 2] = np.inf
+                chunk["length"] = beam_length
+            else: # The ADS beam has a fixed length; the slit opening follows phi_solver
+                beam_length = chunk["length"]
+                chunk["phi"] = ADS_phi_array(beam_length, radius, theta).astype(self.dtype, copy=False)
+            # Same rules as circ_beam_overlap_checker and rect_beam_overlap_checker
+            circle_fit = np.hypot(beam_length / 2, mask / 2) <= self.holder_fields["diameter"][holder] / 2
+            rectangle_fit = (beam_length <= self.holder_fields["axi"][holder]) & (mask <= self.holder_fields["equi"][holder])
+        chunk["fits"] = np.where(self.holder_shape[holder] == CIRCLE, circle_fit, rectangle_fit)
+        if "LAC" in self.axes:
+            thickness = chunk["thickness"] if "thickness" in self.axes else self.holder_fields["depth"][holder]
+            chunk["transmitted"] = beer_lambert_atten(chunk["LAC"], thickness)
+            chunk["thick enough"] = chunk["transmitted"] < self.threshold
+            chunk["passes"] = chunk["fits"] & chunk["thick enough"]
+        return chunk
+
+    # Generator which yields the sweep one chunk at a time, each (with the given reducers' work on it) under memory_mb
+    def chunks(self, memory_mb=default_memory_mb, reducers=()):
+        step = self.chunk_points(memory_mb, reducers)
+        for start in range(0, len(self), step):
+            yield self.evaluate(start, min(start + step, len(self)))
+
+    # Function to stream every chunk through the reducers and return {name: reducer result} (or a list, given a list)
+    def run(self, reducers, memory_mb=default_memory_mb):
+        named = reducers if isinstance(reducers, dict) else dict(enumerate(reducers))
+        for chunk in self.chunks(memory_mb, list(named.values())):
+            for reducer in named.values():
+                reducer.update(chunk)
+            del chunk # Released before the next chunk is evaluated, so only one is ever held
+        results = {name: reducer.result() for name, reducer in named.items()}
+        return results if isinstance(reducers, dict) else list(results.values())
+
+# One evaluated chunk: {"index", every axis value and every output}, with each point's index along an axis on request
+class SweepChunk(dict):
+    def __init__(self, sweep, flat_index):
+        super().__init__(index=flat_index)
+        self.sweep = sweep
+
+    def __repr__(self):
+        return "A chunk of {:,} sweep points".format(len(self["index"]))
+
+    # Function to return each point's index along one axis (not stored, as it is only needed by some reducers)
+    def axis_index(self, name):
+        return self["index"] // self.sweep.strides[name] % len(self.sweep.axes[name])
+
+# ---------- Streaming Reducers ----------
+
+class ExtremeReducer:
+    def __init__(self, field, mode="min", where=None):
+        if mode not in ("min", "max"):
+            raise ValueError("Extreme mode must be 'min' or 'max', not '{}'.".format(mode))
+        self.field = field # Output or axis to minimize or maximize
+        self.mode = mode
+        self.where = where # Optional boolean output; only points where it is True are considered
+        self.value = None
+        self.point = None # Every axis value and output at the extreme point
+
+    def __repr__(self):
+        return "The {} of {}{}".format(self.mode, self.field, " where " + self.where if self.where else "")
+
+    def update(self, chunk):
+        values = chunk[self.field]
+        if self.where is not None: # Points outside the mask can never win
+            values = np.where(chunk[self.where], values, np.inf if self.mode == "min" else -np.inf)
+        i = int(np.argmin(values) if self.mode == "min" else np.argmax(values))
+        if self.where is not None and not chunk[self.where][i]:
+            return
+        if self.value is None or (values[i] < self.value if self.mode == "min" else values[i] > self.value):
+            self.value = values[i].item()
+            self.point = {name: column[i].item() for name, column in chunk.items()}
+
+    # Returns {"value", "point"} (both None if no point qualified)
+    def result(self):
+        return {"value": self.value, "point": self.point}
+
+class HistogramReducer:
+    def __init__(self, field, bins, where=None):
+        self.field = field
+        self.bins = np.asarray(bins, dtype=float) # Bin edges, fixed before the sweep starts
+        self.where = where
+        self.counts = np.zeros(len(self.bins) - 1, dtype=np.int64)
+
+    def __repr__(self):
+        return "A histogram of {} over {} bins".format(self.field, len(self.counts))
+
+    def update(self, chunk):
+        values = chunk[self.field] if self.where is None else chunk[self.field][chunk[self.where]]
+        self.counts += np.histogram(values, self.bins)[0]
+
+    # Returns {"bins", "counts"}
+    def result(self):
+        return {"bins": self.bins, "counts": self.counts}
+
+class CountReducer:
+    def __init__(self, field, by=None):
+        self.field = field # Boolean output to count, e.g. "fits" or "passes"
+        self.by = by # Optional axis name, to count per value of that axis
+        self.count = np.zeros(1, dtype=np.int64)
+        self.total = np.zeros(1, dtype=np.int64)
+
+    def __repr__(self):
+        return "The number of points where {} is True{}".format(self.field, " per " + self.by if self.by else "")
+
+    def update(self, chunk):
+        if self.by is None:
+            self.count[0] += int(np.count_nonzero(chunk[self.field]))
+            self.total[0] += len(chunk[self.field])
+            return
+        axis_index = chunk.axis_index(self.by)
+        n_values = len(chunk.sweep.axes[self.by])
+        if len(self.count) != n_values: # One count per axis value, sized on the first chunk
+            self.count = np.zeros(n_values, dtype=np.int64)
+            self.total = np.zeros(n_values, dtype=np.int64)
+        self.count += np.bincount(axis_index[chunk[self.field]], minlength=n_values)
+        self.total += np.bincount(axis_index, minlength=n_values)
+
+    # Returns {"count", "total", "fraction"}, scalars or one value per axis value
+    def result(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fraction = self.count / self.total
+        if self.by is None:
+            return {"count": int(self.count[0]), "total": int(self.total[0]), "fraction": float(fraction[0])}
+        return {"count": self.count, "total": self.total, "fraction": fraction}
+
+
+# ---------- Begin User-Facing Code ----------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a large FDS footprint sweep in constant memory.")
+    parser.add_argument("--memory-mb", type=float, default=default_memory_mb, help="Memory ceiling for one chunk in MB")
+    parser.add_argument("--float32", action="store_true", help="Calculate in single precision")
+    parser.add_argument("--theta-step", type=float, default=0.01, help="2theta step in degrees")
+    arguments = parser.parse_args()
+    # A demonstration sweep: 0.01 degree steps from 5 to 90 degrees over common slits, masks, radii, holders and LACs
+    demo_holders = [DiffractionSample("Circle 20 mm", "Circle", False, diameter=20, depth=0.5),
+                    DiffractionSample("Circle 25 mm", "Circle", False, diameter=25, depth=1.0),
+                    DiffractionSample("Rectangle 20x15 mm", "Rectangle", False, axi=20, equi=15, depth=0.5),
+                    DiffractionSample("Rectangle 15x15 mm", "Rectangle", False, axi=15, equi=15, depth=0.2)]
+    sweep = FootprintSweep(np.arange(5, 90, arguments.theta_step), radius=[150, 185, 217.5, 240, 300],
+                           mask=[5, 10, 15, 20], holders=demo_holders, slit=[1 / 32, 1 / 16, 1 / 8, 1 / 4, 1 / 2, 1],
+                           LAC=np.geomspace(10, 1000, 20), dtype=np.float32 if arguments.float32 else np.float64)
+    print(sweep)
+    demo_reducers = {"longest fit": ExtremeReducer("length", "max", where="passes"),
+                     "fits per slit": CountReducer("fits", by="slit"),
+                     "length histogram": HistogramReducer("length", np.arange(0, 101, 10), where="fits")}
+    start_time = time.perf_counter()
+    results = sweep.run(demo_reducers, arguments.memory_mb)
+    elapsed = time.perf_counter() - start_time
+    best = results["longest fit"]["point"]
+    print("{:,} points in {:.1f} s ({:,} per chunk, {:.0f} bytes per point)".format(
+        len(sweep), elapsed, sweep.chunk_points(arguments.memory_mb, demo_reducers.values()),
+        sweep.point_bytes(demo_reducers.values())))
+    if best is not None:
+        print("Longest beam which fits and is thick enough: {:.2f} mm ({} deg slit, {} mm mask, {} mm radius, {}, LAC {:.1f} cm^-1, {:.2f} deg)".format(
+            best["length"], best["slit"], best["mask"], best["radius"], sweep.holder_names[best["holder"]], best["LAC"], best["theta"]))
+    for slit_value, fraction in zip(sweep.axes["slit"], results["fits per slit"]["fraction"]):
+        print("{:.4f} deg slit: fits at {:.1%} of points".format(slit_value, fraction))
+    print("Lengths of fitting beams (10 mm bins): {}".format(results["length histogram"]["counts"].tolist()))
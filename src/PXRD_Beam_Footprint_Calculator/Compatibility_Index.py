@@ -0,0 +1,202 @@
+# Developed by Mitch S-A
+# Updated on October 19, 2026
+
+# A facility-wide "which optics fit which holder on which instrument" index, stored as compatibility_index.json next to
+# the preconfiguration JSONs. For every saved instrument, every saved holder of the same manufacturer and every saved
+# optics configuration it records:
+#   - "onset": the angle above which an FDS beam always fits in the holder (None for ADS, or if it never fits)
+#   - "min safe 2theta": the larger of the onset and the holder's own minimum angle (None if the beam never fits)
+#   - "spills at holder minimum": whether the beam spills over at the holder's minimum angle
+#   - "never fits": whether the beam is too long or too wide for the holder at every angle
+# Each instrument, holder and optics entry is fingerprinted by its saved values, so after update_JSON adds or changes an
+# entry, refresh() only computes the (instrument, holder, optics) triples touching it and drops triples whose entries
+# were removed. Lookups are nested dictionary reads on the loaded index (microseconds each).
+# Build or refresh the index from the repository root with:
+#   python -m src.PXRD_Beam_Footprint_Calculator.Compatibility_Index
+
+# ---------- Necessary imports ----------
+
+# Libraries to allow code to interface with the file system and the command line
+import os
+import argparse
+import time
+# Libraries to allow for fingerprinting and JSON storage
+import hashlib
+import json
+# Library to allow for array calculations
+import numpy as np
+
+# Import the preconfiguration loader and the spill-over solvers
+from src.PXRD_Beam_Footprint_Calculator.Beam_Profile_Calculator import load_preconfiguration
+from src.PXRD_Beam_Footprint_Calculator.Spill_Over_Solver import allowed_beam_length, FDS_fit_onset
+
+# ---------- Reference File Paths ----------
+
+Beam_Calc_J_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Beam_Calc_JSONs")
+compatibility_index_path = os.path.join(Beam_Calc_J_directory, "compatibility_index.json")
+
+# Bumped whenever the stored fields change, so an older index is rebuilt rather than mixed with new entries
+index_format_version = 1
+
+# ---------- Class Definitions ----------
+
+class CompatibilityIndex:
+    def __init__(self, path=compatibility_index_path, directory=Beam_Calc_J_directory):
+        self.path = path # Where the index is stored
+        self.directory = directory # Where the preconfiguration JSONs are read from
+        self.fingerprints = {"instruments": {}, "holders": {}, "optics": {}}
+        self.entries = {} # {instrument: {holder key: {optics name: entry}}}
+        if os.path.exists(path):
+            with open(path, "r") as jsonfile:
+                stored = json.load(jsonfile)
+            if stored.get("version") == index_format_version:
+                self.fingerprints = stored["fingerprints"]
+                self.entries = stored["entries"]
+
+    def __repr__(self):
+        return "A compatibility index of {n} instrument/holder/optics combinations stored at {path}".format(
+            n=sum(len(optics) for holders in self.entries.values() for optics in holders.values()), path=self.path)
+
+    # Function to return the entry for one triple, or None if it is not indexed
+    # Holders are keyed "Manufacturer: Holder name", as written by holder_key()
+    def lookup(self, instrument, holder, optics):
+        return self.entries.get(instrument, {}).get(holder, {}).get(optics)
+
+    # Function to list the optics which fit a holder on an instrument, as (optics name, min safe 2theta), lowest first
+    def safe_optics(self, instrument, holder):
+        options = [(name, entry["min safe 2theta"]) for name, entry in self.entries.get(instrument, {}).get(holder, {}).items()
+                   if not entry["never fits"]]
+        return sorted(options, key=lambda option: option[1])
+
+    # Function to bring the index up to date with the preconfiguration JSONs, computing only new or changed triples
+    # Returns {"computed": triples calculated, "removed": triples dropped, "total": triples in the index}
+    def refresh(self):
+        instruments, holders, optics = read_preconfigurations(self.directory)
+        current = {"instruments": {name: _fingerprint(values) for name, values in instruments.items()},
+                   "holders": {key: _fingerprint(values) for key, values in holders.items()},
+                   "optics": {name: _fingerprint(values) for name, values in optics.items()}}
+        changed = {group: {name for name, fingerprint in current[group].items()
+                           if self.fingerprints.get(group, {}).get(name) != fingerprint} for group in current}
+        # Drop triples whose instrument, holder or optics no longer exists (or whose holder changed manufacturer)
+        removed = 0
+        for instrument in list(self.entries):
+            for key in list(self.entries[instrument]):
+                for name in list(self.entries[instrument][key]):
+                    if (instrument not in instruments or key not in holders or name not in optics
+                            or holders[key]["manufacturer"] != instruments[instrument]["manufacturer"]):
+                        del self.entries[instrument][key][name]
+                        removed += 1
+                if not self.entries[instrument][key]:
+                    del self.entries[instrument][key]
+            if not self.entries[instrument]:
+                del self.entries[instrument]
+        # Collect the triples which touch a new or changed entry (or were never computed)
+        triples = [(instrument, key, name) for instrument, instrument_values in instruments.items()
+                   for key, holder_values in holders.items() if holder_values["manufacturer"] == instrument_values["manufacturer"]
+                   for name in optics
+                   if instrument in changed["instruments"] or key in changed["holders"] or name in changed["optics"]
+                   or self.lookup(instrument, key, name) is None]
+        for (instrument, key, name), entry in zip(triples, compatibility_entries(triples, instruments, holders, optics)):
+            self.entries.setdefault(instrument, {}).setdefault(key, {})[name] = entry
+        self.fingerprints = current
+        return {"computed": len(triples), "removed": removed,
+                "total": sum(len(optics) for holders in self.entries.values() for optics in holders.values())}
+
+    # Function to write the index atomically, so the booking front end never reads half a file
+    def save(self):
+        with open(self.path + ".tmp", "w") as jsonfile:
+            json.dump({"version": index_format_version, "fingerprints": self.fingerprints, "entries": self.entries}, jsonfile)
+        os.replace(self.path + ".tmp", self.path)
+
+# ---------- Preconfiguration Reading ----------
+
+# Function to return the holder key used in the index
+def holder_key(manufacturer, holder_name):
+    return "{}: {}".format(manufacturer, holder_name)
+
+# Function to read the saved instruments, holders and optics as plain dictionaries
+# Returns ({instrument: {"radius", "manufacturer"}}, {holder key: {"manufacturer", "shape", ...}}, {optics name: {...}})
+def read_preconfigurations(directory=Beam_Calc_J_directory):
+    radii = load_preconfiguration(os.path.join(directory, "instruments_and_radii.json"))
+    models = load_preconfiguration(os.path.join(directory, "manufacturers_and_models.json"))
+    holders_dict = load_preconfiguration(os.path.join(directory, "manufacturers_and_sample_holders.json"))
+    optics_dict = load_preconfiguration(os.path.join(directory, "preconfig_optics.json"))
+    model_manufacturers = {model: manufacturer for manufacturer, manufacturer_models in models.items() for model in manufacturer_models}
+    # Instruments with a radius but no manufacturer cannot be matched to holders and are left out
+    instruments = {name: {"radius": float(radius), "manufacturer": model_manufacturers[name]}
+                   for name, radius in radii.items() if name in model_manufacturers}
+    holders = {}
+    for manufacturer, saved_holders in holders_dict.items():
+        for holder in saved_holders:
+            # ["Name", "Circle", diameter, depth, min_2theta] or ["Name", "Rectangle", axi, equi, depth, min_2theta]
+            if holder[1] == "Circle":
+                values = {"shape": "Circle", "diameter": float(holder[2]), "axi": np.nan, "equi": np.nan, "min_2theta": float(holder[4])}
+            else:
+                values = {"shape": "Rectangle", "diameter": np.nan, "axi": float(holder[2]), "equi": float(holder[3]), "min_2theta": float(holder[5])}
+            values["manufacturer"] = manufacturer
+            holders[holder_key(manufacturer, holder[0])] = values
+    # Saved optics are [[name, mode, mask, i_slit or i_length]] (the "Exempt" entry is empty)
+    optics = {saved[0][0]: {"mode": saved[0][1], "mask": float(saved[0][2]), "setting": float(saved[0][3])}
+              for saved in optics_dict.values() if saved}
+    return instruments, holders, optics
+
+# Function to return a short fingerprint of one entry's saved values
+def _fingerprint(values):
+    return hashlib.sha256(json.dumps(values, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+# ---------- Entry Calculation ----------
+
+# Function to calculate the index entries for a list of (instrument, holder key, optics name) triples in one array pass
+def compatibility_entries(triples, instruments, holders, optics):
+    if not triples:
+        return []
+    radius = np.array([instruments[instrument]["radius"] for instrument, key, name in triples])
+    holder_rows = [holders[key] for instrument, key, name in triples]
+    optics_rows = [optics[name] for instrument, key, name in triples]
+    is_FDS = np.array([row["mode"] == "FDS" for row in optics_rows])
+    setting = np.array([row["setting"] for row in optics_rows]) # Divergence slit (degrees) or irradiated length (mm)
+    holder_minimum = np.array([row["min_2theta"] for row in holder_rows])
+    allowed = allowed_beam_length(np.array([row["shape"] for row in holder_rows]), np.array([row["mask"] for row in optics_rows]),
+                                  *(np.array([row[field] for row in holder_rows]) for field in ("diameter", "axi", "equi")))
+    # FDS beams fit above the onset; ADS beams have a fixed length and either always or never fit
+    onset = np.where(is_FDS, FDS_fit_onset(radius, np.where(is_FDS, setting, 1.0), allowed), np.nan)
+    with np.errstate(invalid="ignore"):
+        never_fits = np.where(is_FDS, np.isnan(onset), ~(setting <= allowed))
+    min_safe = np.where(never_fits, np.nan, np.fmax(onset, holder_minimum))
+    spills_at_minimum = never_fits | (onset > holder_minimum)
+    return [{"onset": None if np.isnan(onset[i]) else round(float(onset[i]), 4),
+             "min safe 2theta": None if np.isnan(min_safe[i]) else round(float(min_safe[i]), 4),
+             "spills at holder minimum": bool(spills_at_minimum[i]), "never fits": bool(never_fits[i])}
+            for i in range(len(triples))]
+
+# Function to refresh and save the index, or do nothing if only_if_exists and no index has been built yet
+# Returns the refresh() summary, or None if nothing was done
+def refresh_compatibility_index(path=compatibility_index_path, directory=Beam_Calc_J_directory, only_if_exists=False):
+    if only_if_exists and not os.path.exists(path):
+        return None
+    index = CompatibilityIndex(path, directory)
+    summary = index.refresh()
+    if summary["computed"] or summary["removed"] or not os.path.exists(path):
+        index.save()
+    return summary
+
+
+# ---------- Begin User-Facing Code ----------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build, refresh or query the instrument/holder/optics compatibility index.")
+    parser.add_argument("--if-exists", action="store_true", help="Only refresh an index which has already been built")
+    parser.add_argument("--lookup", nargs=3, metavar=("INSTRUMENT", "HOLDER", "OPTICS"),
+                        help="Print one entry (holders are written 'Manufacturer: Holder name')")
+    arguments = parser.parse_args()
+    if arguments.lookup:
+        entry = CompatibilityIndex().lookup(*arguments.lookup)
+        print(entry if entry is not None else "Not in the index.")
+    else:
+        start = time.perf_counter()
+        refresh_summary = refresh_compatibility_index(only_if_exists=arguments.if_exists)
+        if refresh_summary is None:
+            print("No compatibility index to refresh.")
+        else:
+            print("Compatibility index: {computed} combinations computed, {removed} removed, {total} in total ({ms:.1f} ms).".format(
+                ms=(time.perf_counter() - start) * 1000, **refresh_summary))
@@ -0,0 +1,132 @@
+# Developed by Mitch S-A
+# Updated on October 19, 2026
+
+# Sample displacement (height error) sensitivity of the beam footprint. l_short and l_long assume the sample surface lies
+# exactly on the goniometer axis, but an overfilled well raises the surface towards the tube and an underfilled one lowers
+# it, which moves and stretches the footprint. A ray meeting the on-axis surface at x0 with angle alpha meets a surface
+# displaced by h (positive = above the axis) at
+#     x(h) = x0 - h * cot(alpha)
+# so the incident-side edge (x0 = -l_short, alpha = theta + phi/2) and the diffracted-side edge (x0 = +l_long,
+# alpha = theta - phi/2) both move linearly with h; a raised surface shortens the footprint and shifts it towards the tube.
+# displacement_sweep() evaluates edge positions, length and fit for a grid of displacements x 2theta in one broadcast, and
+# displacement_tolerance() solves the same linear edge conditions exactly for the band of heights which keep the beam
+# inside the holder at each angle. Positions are measured from the holder centre on the goniometer axis, so the fit test
+# uses where the edges actually land (slightly stricter than beam_fit_checker, which compares the length alone).
+# Run from the repository root with, e.g.:
+#   python -m src.PXRD_Beam_Footprint_Calculator.Displacement_Sensitivity --radius 240 --slit 0.5 --mask 10 --axi 20 --equi 15
+
+# ---------- Necessary imports ----------
+
+# Library for the command line
+import argparse
+# Library to allow for array calculations
+import numpy as np
+
+# Import the classes and geometry functions from the parent script and its helpers
+from src.PXRD_Beam_Footprint_Calculator.Beam_Profile_Calculator import DiffractionSample, Optics, l_short, l_long
+from src.PXRD_Beam_Footprint_Calculator.Adaptive_Theta_Grid import ADS_phi_array
+
+# ---------- Short Reference Dictionaries and Lists ----------
+
+# Default displacement grid in mm (negative = surface below the axis, i.e. an underfilled well)
+default_displacements = np.linspace(-0.5, 0.5, 101)
+
+# ---------- Footprint Geometry ----------
+
+# Function to return (divergence angle in degrees, on-axis incident edge, on-axis diffracted edge) for each angle
+def _nominal_edges(radius, optics, theta_values):
+    if optics.mode == "FDS":
+        phi = np.full(theta_values.shape, float(optics.i_slit))
+    else: # The slit opening which gives the set length with the surface on the axis
+        phi = ADS_phi_array(optics.i_length, radius, theta_values)
+    return phi, -l_short(radius, phi, theta_values), l_long(radius, phi, theta_values)
+
+# Function to return the half-length of the holder available along the beam at the beam mask's edges (NaN if the mask
+# alone is too wide), so the fit test is simply -limit <= edge <= limit
+def axial_limit(sample, mask):
+    if sample.shape == "Circle":
+        return np.sqrt((sample.diameter / 2) ** 2 - (mask / 2) ** 2) if mask < sample.diameter else np.nan
+    return sample.axi / 2 if mask <= sample.equi else np.nan
+
+# Function to evaluate footprint edges, centre, length and fit for every (displacement, angle) pair
+# Returns {"displacement", "theta", "incident edge", "diffracted edge", "centre", "length", "fits"}, 2D arrays of shape
+# (displacements, angles) where applicable
+def displacement_sweep(radius, optics, sample, theta_values, displacements=default_displacements):
+    theta_values = np.asarray(theta_values, dtype=float)
+    displacements = np.asarray(displacements, dtype=float)
+    phi, incident_0, diffracted_0 = _nominal_edges(radius, optics, theta_values)
+    half_phi = np.deg2rad(phi) / 2
+    theta = np.deg2rad(theta_values)
+    h = displacements[:, None]
+    incident_edge = incident_0 - h / np.tan(theta + half_phi)
+    diffracted_edge = diffracted_0 - h / np.tan(theta - half_phi)
+    limit = axial_limit(sample, optics.mask)
+    with np.errstate(invalid="ignore"):
+        fits = (incident_edge >= -limit) & (diffracted_edge <= limit)
+    return {"displacement": displacements, "theta": theta_values, "incident edge": incident_edge,
+            "diffracted edge": diffracted_edge, "centre": (incident_edge + diffracted_edge) / 2,
+            "length": diffracted_edge - incident_edge, "fits": fits}
+
+# ---------- Tolerance Band ----------
+
+# Function to return the band of displacements which keep the beam inside the holder at each angle
+# Returns {"theta", "lowest", "highest", "tolerance"}: the band is lowest <= h <= highest (NaN where no height fits), and
+# tolerance is the largest error in either direction from the on-axis position that still fits (NaN if h = 0 does not)
+def displacement_tolerance(radius, optics, sample, theta_values):
+    theta_values = np.asarray(theta_values, dtype=float)
+    phi, incident_0, diffracted_0 = _nominal_edges(radius, optics, theta_values)
+    half_phi = np.deg2rad(phi) / 2
+    theta = np.deg2rad(theta_values)
+    limit = axial_limit(sample, optics.mask)
+    # Each edge condition x0 - h * c (>= or <=) bound is linear in h; solve for the allowed side of the boundary
+    lowest = np.full(theta_values.shape, -np.inf)
+    highest = np.full(theta_values.shape, np.inf)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for x0, c, sign in ((incident_0, 1 / np.tan(theta + half_phi), 1), (diffracted_0, 1 / np.tan(theta - half_phi), -1)):
+            # sign = 1: x0 - h c >= -limit, sign = -1: x0 - h c <= limit; both are sign * (x0 - h c) + limit >= 0
+            boundary = (x0 + sign * limit) / c
+            upper_bound = sign * c > 0 # Allowed heights lie below the boundary
+            highest = np.where(upper_bound, np.minimum(highest, boundary), highest)
+            lowest = np.where(~upper_bound, np.maximum(lowest, boundary), lowest)
+        possible = (lowest <= highest) & np.isfinite(limit)
+        lowest, highest = np.where(possible, lowest, np.nan), np.where(possible, highest, np.nan)
+        tolerance = np.where((lowest <= 0) & (highest >= 0), np.minimum(-lowest, highest), np.nan)
+    return {"theta": theta_values, "lowest": lowest, "highest": highest, "tolerance": tolerance}
+
+
+# ---------- Begin User-Facing Code ----------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Height error tolerance of the beam footprint across a 2theta range.")
+    parser.add_argument("--radius", type=float, required=True, help="Goniometer radius in mm")
+    beam_group = parser.add_mutually_exclusive_group(required=True)
+    beam_group.add_argument("--slit", type=float, help="FDS divergence slit in degrees")
+    beam_group.add_argument("--length", type=float, help="ADS irradiated length in mm")
+    parser.add_argument("--mask", type=float, required=True, help="Beam mask in mm")
+    holder_group = parser.add_mutually_exclusive_group(required=True)
+    holder_group.add_argument("--diameter", type=float, help="Circular well diameter in mm")
+    holder_group.add_argument("--axi", type=float, help="Rectangular well axial length in mm (requires --equi)")
+    parser.add_argument("--equi", type=float, help="Rectangular well equitorial width in mm")
+    parser.add_argument("--min-2theta", type=float, default=5)
+    parser.add_argument("--max-2theta", type=float, default=90)
+    parser.add_argument("--step", type=float, default=5)
+    arguments = parser.parse_args()
+    if arguments.axi is not None and arguments.equi is None:
+        parser.error("--axi requires --equi")
+    if arguments.slit is not None:
+        sweep_optics = Optics("FDS", arguments.mask, i_slit=arguments.slit)
+    else:
+        sweep_optics = Optics("ADS", arguments.mask, i_length=arguments.length)
+    if arguments.diameter is not None:
+        sweep_sample = DiffractionSample("Custom", "Circle", False, diameter=arguments.diameter)
+    else:
+        sweep_sample = DiffractionSample("Custom", "Rectangle", False, axi=arguments.axi, equi=arguments.equi)
+    band = displacement_tolerance(arguments.radius, sweep_optics, sweep_sample,
+                                  np.arange(arguments.min_2theta, arguments.max_2theta + arguments.step / 2, arguments.step))
+    for angle, lowest, highest, tolerance in zip(band["theta"], band["lowest"], band["highest"], band["tolerance"]):
+        if np.isnan(lowest):
+            print("{:5.1f} deg: spills over at every height".format(angle))
+        elif np.isnan(tolerance):
+            print("{:5.1f} deg: spills over on the axis; fits only for heights {:+.3f} to {:+.3f} mm".format(angle, lowest, highest))
+        else:
+            print("{:5.1f} deg: fits for heights {:+.3f} to {:+.3f} mm (tolerance +-{:.3f} mm)".format(angle, lowest, highest, tolerance))
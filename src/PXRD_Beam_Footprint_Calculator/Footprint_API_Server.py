@@ -0,0 +1,329 @@
+# Developed by Mitch S-A
+# Updated on October 19, 2026
+
+# A small asyncio HTTP/JSON service that exposes the MAC and beam footprint calculators to other software
+# (e.g. a LIMS or instrument-booking system) without going through the input() prompts.
+# The calculations go through Footprint_Core.py: the attenuation tables are loaded once into a read-only FootprintContext
+# (with the threshold set by --threshold) and shared by every request.
+# Run locally from the repository root with:
+#   python -m src.PXRD_Beam_Footprint_Calculator.Footprint_API_Server --port 8080
+# Endpoints (all POST bodies and responses are JSON):
+#   GET  /health            - simple liveness check
+#   GET  /preconfigurations - the Beam_Calc_JSONs loaded at startup
+#   POST /mac               - {"formula", "anode" or "energy", optional "density"} -> MAC and LAC
+#   POST /edges             - {"formula", "anode" or "energy"} -> absorption edges and interferences
+#   POST /curve             - {"radius" or "instrument", "optics", "min_2theta", "max_2theta"} -> FDS/ADS curve
+#   POST /fit               - /curve payload plus "holder" and optional "LAC" -> fit and thickness verdicts
+#   POST /batch             - {"kind": "mac"/"edges"/"curve"/"fit", "items": [payloads]} -> computed in a worker pool
+
+# ---------- Necessary imports ----------
+
+# Libraries to allow code to interface with the operating system and the command line
+import os
+import argparse
+# Library to allow code to read and write JSON files
+import json
+# Libraries to allow for asynchronous serving and a pool of worker processes
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+# aiohttp is only needed to run the service, so the calculators remain usable without it
+try:
+    from aiohttp import web
+except ImportError:
+    web = None
+
+# Import the classes and curve functions from the parent script and the re-entrant calculations from the core
+from src.PXRD_Beam_Footprint_Calculator.Beam_Profile_Calculator import (DiffractionSample, Optics, load_preconfiguration,
+    saved_holder_sample, beam_curve_for_optics, beam_fit_checker, attenuation_threshold)
+from src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.MAC_Calculator import chem_form_parser
+from src.PXRD_Beam_Footprint_Calculator.Footprint_Core import (load_footprint_context, incident_energy, formula_MAC,
+    formula_edges, attenuation_summary)
+
+# ---------- Reference File Paths ----------
+
+# Build absolute paths to every JSON the service reads so the service can be started from any directory
+Beam_Profile_directory = os.path.dirname(os.path.abspath(__file__))
+Beam_Calc_J_directory = os.path.join(Beam_Profile_directory, "Beam_Calc_JSONs")
+
+# Tables held by each worker process, populated once by the pool initializer
+_worker_tables = None
+
+# ---------- Reference Table Loading ----------
+
+# Function to load the core context and every preconfiguration into one dictionary (called once at startup)
+def load_reference_tables(threshold=attenuation_threshold):
+    tables = {"context": load_footprint_context(threshold)}
+    tables["manufacturers_models"] = load_preconfiguration(os.path.join(Beam_Calc_J_directory, "manufacturers_and_models.json"))
+    tables["sample_holders"] = load_preconfiguration(os.path.join(Beam_Calc_J_directory, "manufacturers_and_sample_holders.json"))
+    tables["instrument_radii"] = load_preconfiguration(os.path.join(Beam_Calc_J_directory, "instruments_and_radii.json"))
+    tables["optics"] = load_preconfiguration(os.path.join(Beam_Calc_J_directory, "preconfig_optics.json"))
+    return tables
+
+# Pool initializer so each worker process loads the tables a single time
+def _initialize_worker(threshold=attenuation_threshold):
+    global _worker_tables
+    _worker_tables = load_reference_tables(threshold)
+
+# ---------- Payload Interpretation ----------
+
+# Function to get the incident energy in keV from either an "anode" or an "energy" entry
+def resolve_incident_energy(tables, payload):
+    return incident_energy(tables["context"], payload.get("anode"), payload.get("energy"))
+
+# Function to get the goniometer radius in mm from either a "radius" or an "instrument" entry
+def resolve_radius(tables, payload):
+    if "radius" in payload:
+        return float(payload["radius"])
+    if "instrument" in payload:
+        try:
+            return float(tables["instrument_radii"][payload["instrument"]])
+        except KeyError:
+            raise ValueError("Unknown instrument '{}'.".format(payload["instrument"]))
+    raise ValueError("Please provide either a 'radius' (mm) or an 'instrument'.")
+
+# Function to build an Optics object from an explicit description or a saved preconfiguration name
+def resolve_optics(tables, optics_payload):
+    if "preconfiguration" in optics_payload:
+        try:
+            # Same list-of-lists layout used when loading a preconfiguration in Beam_Profile_Calculator.py
+            saved = tables["optics"][optics_payload["preconfiguration"]][0]
+        except (KeyError, IndexError):
+            raise ValueError("Unknown optics preconfiguration '{}'.".format(optics_payload["preconfiguration"]))
+        return Optics(saved[1], saved[2], saved[0], saved[3], saved[3])
+    mode = optics_payload.get("mode")
+    if mode == "FDS":
+        return Optics("FDS", mask=float(optics_payload["mask"]), i_slit=float(optics_payload["i_slit"]))
+    elif mode == "ADS":
+        return Optics("ADS", mask=float(optics_payload["mask"]), i_length=float(optics_payload["i_length"]))
+    raise ValueError("Optics 'mode' must be either 'FDS' or 'ADS'.")
+
+# Function to build a DiffractionSample object from an explicit description or a saved holder
+def resolve_sample(tables, holder_payload, LAC=0):
+    z_check = LAC not in (None, 0)
+    if "manufacturer" in holder_payload and "name" in holder_payload:
+        for holder in tables["sample_holders"].get(holder_payload["manufacturer"], []):
+            if holder[0] == holder_payload["name"]:
+                return saved_holder_sample(holder, z_check, LAC or 0)
+        else:
+            raise ValueError("Unknown sample holder '{}' for '{}'.".format(holder_payload["name"], holder_payload["manufacturer"]))
+    shape = holder_payload.get("shape")
+    if shape == "Circle":
+        return DiffractionSample(holder_payload.get("name", "Custom"), "Circle", z_check, diameter=float(holder_payload["diameter"]),
+                                 LAC=LAC or 0, depth=float(holder_payload.get("depth", 0)), min_2theta=float(holder_payload.get("min_2theta", 0)))
+    elif shape == "Rectangle":
+        return DiffractionSample(holder_payload.get("name", "Custom"), "Rectangle", z_check, axi=float(holder_payload["axi"]),
+                                 equi=float(holder_payload["equi"]), LAC=LAC or 0, depth=float(holder_payload.get("depth", 0)),
+                                 min_2theta=float(holder_payload.get("min_2theta", 0)))
+    raise ValueError("Holder 'shape' must be either 'Circle' or 'Rectangle'.")
+
+# ---------- Calculations Behind Each Endpoint ----------
+
+# Function to calculate the MAC (and LAC if a density is given) of a formula at an incident energy
+def calculate_MAC_payload(tables, payload):
+    if not chem_form_parser(str(payload.get("formula", ""))):
+        raise ValueError("Could not recognize formula '{}'.".format(payload.get("formula")))
+    energy_keV = resolve_incident_energy(tables, payload)
+    valid_MAC, sample_MAC = formula_MAC(tables["context"], str(payload["formula"]), energy_keV)
+    # Keys mirror MAC_Calculator_Output.json so downstream tools can treat both the same way
+    result = {"formula": payload["formula"], "energy keV": energy_keV, "check thickness": valid_MAC,
+              "MAC cm^2/g": sample_MAC, "LAC cm^-1": None}
+    if valid_MAC and payload.get("density") is not None:
+        result["LAC cm^-1"] = sample_MAC * float(payload["density"])
+    return result
+
+# Function to list the absorption edges of a formula and flag those within 1 keV of the incident energy
+def calculate_edges_payload(tables, payload):
+    energy_keV = resolve_incident_energy(tables, payload)
+    sample_edges, interferences = formula_edges(tables["context"], str(payload.get("formula", "")), energy_keV)
+    return {"formula": payload["formula"], "energy keV": energy_keV, "edges": sample_edges, "interferences": interferences}
+
+# Function to calculate the FDS beam length or ADS aperture curve over a two-theta range
+def calculate_curve_payload(tables, payload):
+    radius = resolve_radius(tables, payload)
+    optics = resolve_optics(tables, payload.get("optics", {}))
+    curve = beam_curve_for_optics(radius, optics, float(payload["min_2theta"]), float(payload["max_2theta"]), int(payload.get("step", 1)))
+    return {"radius": radius, "mode": optics.mode, "curve": [[theta, value] for theta, value in curve.items()]}
+
+# Function to check whether the beam fits the holder and, if a LAC is given, whether the sample is thick enough
+def calculate_fit_payload(tables, payload):
+    radius = resolve_radius(tables, payload)
+    optics = resolve_optics(tables, payload.get("optics", {}))
+    sample = resolve_sample(tables, payload.get("holder", {}), payload.get("LAC"))
+    curve = beam_curve_for_optics(radius, optics, float(payload["min_2theta"]), float(payload["max_2theta"]), int(payload.get("step", 1)))
+    result = {"radius": radius, "mode": optics.mode, "beam fits": bool(beam_fit_checker(optics, sample, curve)),
+              "curve": [[theta, value] for theta, value in curve.items()]}
+    if sample.z_check:
+        summary = attenuation_summary(tables["context"], sample.LAC, sample.depth)
+        result["thickness"] = {field: summary[field] for field in ("transmitted fraction", "thick enough", "required depth mm")}
+    return result
+
+# Map each endpoint/batch kind to its calculation
+calculations = {"mac": calculate_MAC_payload, "edges": calculate_edges_payload,
+                "curve": calculate_curve_payload, "fit": calculate_fit_payload}
+
+# Kinds whose single requests are CPU-bound (curves solve over the whole 2theta range) and so run in the worker pool
+pooled_kinds = {"curve", "fit"}
+
+# Worker-side single calculation: errors are raised back to the handler through the future
+def _run_single(kind, payload):
+    return calculations[kind](_worker_tables, payload)
+
+# Worker-side batch function: errors are reported per item instead of failing the whole batch
+def _run_batch(kind, items):
+    results = []
+    for item in items:
+        try:
+            results.append(calculations[kind](_worker_tables, item))
+        except (KeyError, TypeError, ValueError) as e:
+            results.append({"error": str(e)})
+    return results
+
+# ---------- Response Caching ----------
+
+# Function to turn a payload into a canonical string so equivalent requests share a cache entry
+def canonicalize_payload(payload):
+    def canonical(value):
+        if isinstance(value, dict):
+            return {str(key): canonical(value[key]) for key in sorted(value)}
+        if isinstance(value, (list, tuple)):
+            return [canonical(item) for item in value]
+        if isinstance(value, bool) or value is None:
+            return value
+        if isinstance(value, (int, float)):
+            return float("{:.10g}".format(value)) # 10 and 10.0 (or 1e1) become the same key
+        return str(value).strip()
+    return json.dumps(canonical(payload), sort_keys=True, separators=(",", ":"))
+
+class ResponseCache:
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self.entries = OrderedDict() # Least recently used entries sit at the front
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return "A response cache holding {n} of {m} entries ({h} hits, {x} misses).".format(
+            n=len(self.entries), m=self.max_entries, h=self.hits, x=self.misses)
+
+    def get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries: # Evict the least recently used entries
+            self.entries.popitem(last=False)
+
+# ---------- HTTP Application ----------
+
+# Function to build the aiohttp application with the tables, cache and worker pool attached
+def create_app(workers=None, cache_size=4096, threshold=attenuation_threshold):
+    if web is None:
+        raise ImportError("aiohttp is required to run the footprint API service (pip install aiohttp).")
+    app = web.Application(client_max_size=16 * 1024 ** 2)
+    app["tables"] = load_reference_tables(threshold) # Loaded once, shared read-only by every request
+    app["cache"] = ResponseCache(cache_size)
+    app["workers"] = workers
+
+    async def start_pool(app):
+        app["pool"] = ProcessPoolExecutor(max_workers=app["workers"], initializer=_initialize_worker, initargs=(threshold,))
+
+    async def stop_pool(app):
+        app["pool"].shutdown(wait=True)
+
+    app.on_startup.append(start_pool)
+    app.on_cleanup.append(stop_pool)
+
+    async def read_payload(request):
+        try:
+            payload = await request.json()
+        except json.JSONDecodeError:
+            raise web.HTTPBadRequest(text=json.dumps({"error": "Request body must be JSON."}), content_type="application/json")
+        if not isinstance(payload, dict):
+            raise web.HTTPBadRequest(text=json.dumps({"error": "Request body must be a JSON object."}), content_type="application/json")
+        return payload
+
+    # MAC and edge lookups are quick enough to run on the event loop; curves and fits go to the worker pool so one
+    # request's solve never stalls the other clients. Cached responses are returned immediately either way
+    def single_calculation_handler(kind):
+        async def handler(request):
+            payload = await read_payload(request)
+            key = kind + ":" + canonicalize_payload(payload)
+            result = app["cache"].get(key)
+            if result is None:
+                try:
+                    if kind in pooled_kinds:
+                        result = await asyncio.get_running_loop().run_in_executor(app["pool"], _run_single, kind, payload)
+                    else:
+                        result = calculations[kind](app["tables"], payload)
+                except (KeyError, TypeError, ValueError) as e:
+                    return web.json_response({"error": str(e)}, status=400)
+                app["cache"].put(key, result)
+            return web.json_response(result)
+        return handler
+
+    # Batches are CPU-bound, so they are sent to the worker pool to keep the event loop responsive
+    async def batch_handler(request):
+        payload = await read_payload(request)
+        kind = payload.get("kind")
+        items = payload.get("items", [])
+        if kind not in calculations or not isinstance(items, list):
+            return web.json_response({"error": "Batch requires a 'kind' from {} and a list of 'items'.".format(list(calculations))}, status=400)
+        results = [None] * len(items)
+        missing = [] # Indices of items which are not already cached
+        keys = [kind + ":" + canonicalize_payload(item) if isinstance(item, dict) else None for item in items]
+        for i, key in enumerate(keys):
+            cached = app["cache"].get(key) if key is not None else None
+            if cached is None:
+                missing.append(i)
+            else:
+                results[i] = cached
+        if missing:
+            loop = asyncio.get_running_loop()
+            computed = await loop.run_in_executor(app["pool"], _run_batch, kind, [items[i] for i in missing])
+            for i, result in zip(missing, computed):
+                results[i] = result
+                if "error" not in result:
+                    app["cache"].put(keys[i], result)
+        return web.json_response({"kind": kind, "results": results})
+
+    async def health_handler(request):
+        return web.json_response({"status": "ok", "cache entries": len(app["cache"].entries),
+                                  "cache hits": app["cache"].hits, "cache misses": app["cache"].misses})
+
+    async def preconfiguration_handler(request):
+        tables = app["tables"]
+        return web.json_response({"manufacturers_and_models": tables["manufacturers_models"],
+                                  "manufacturers_and_sample_holders": tables["sample_holders"],
+                                  "instruments_and_radii": tables["instrument_radii"],
+                                  "preconfig_optics": tables["optics"]})
+
+    app.router.add_get("/health", health_handler)
+    app.router.add_get("/preconfigurations", preconfiguration_handler)
+    for kind in calculations:
+        app.router.add_post("/" + kind, single_calculation_handler(kind))
+    app.router.add_post("/batch", batch_handler)
+    return app
+
+
+# ---------- Begin User-Facing Code ----------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the PXRD beam footprint and MAC calculators as a local JSON API.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: localhost only)")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for batch requests (default: CPU count)")
+    parser.add_argument("--cache-size", type=int, default=4096, help="Maximum number of cached responses")
+    parser.add_argument("--threshold", type=float, default=attenuation_threshold,
+                        help="Transmitted fraction below which a sample is thick enough")
+    arguments = parser.parse_args()
+    if web is None:
+        print("The footprint API service requires aiohttp. Please install it with 'pip install aiohttp'.")
+    else:
+        web.run_app(create_app(arguments.workers, arguments.cache_size, arguments.threshold), host=arguments.host, port=arguments.port)
@@ -0,0 +1,133 @@
+# Developed by Mitch S-A
+# Updated on October 19, 2026
+
+# A re-entrant core for calling the MAC and footprint calculators from threads, services and batch tools. The interactive
+# scripts keep their module-level settings (attenuation_threshold, CCMC_Tubes) and main-block variables; every function
+# here instead takes its configuration explicitly:
+#   - FootprintContext is an immutable named tuple of the reference tables, the anode energies and the threshold
+#   - the tables inside it are frozen (dictionaries become read-only MappingProxyType views and lists become tuples),
+#     so one context can be shared by any number of threads without copying or locking
+#   - a different threshold (or anode list) is a new context: context._replace(threshold=0.01)
+#   - nothing here reads the current directory, writes files or keeps state between calls
+# The calculations are the same functions the scripts use (calculate_formula_MAC, get_edge_info, beam_curve_for_optics,
+# beam_fit_checker and the Beer-Lambert functions), so results are identical to theirs. The server, the manifest checker
+# and the scenario cache are built on this module. check_thread_safety() compares threaded and serial results:
+#   python -m src.PXRD_Beam_Footprint_Calculator.Footprint_Core --workers 8
+# Sharing a context makes calls from many threads safe, not faster: these calculations are mostly pure Python, and no
+# speedup from threads has been measured (the check prints both timings). Use processes for throughput, as the server does.
+
+# ---------- Necessary imports ----------
+
+# Libraries for the command line and timing
+import argparse
+import time
+# Libraries for the immutable context and for threaded use
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+
+# Import the classes, geometry and attenuation functions from the parent script and the MAC functions from the child script
+from src.PXRD_Beam_Footprint_Calculator.Beam_Profile_Calculator import (DiffractionSample, Optics, attenuation_threshold,
+    beam_curve_for_optics, beam_fit_checker, beer_lambert_atten, beer_lambert_layer)
+from src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.MAC_Calculator import (CCMC_Tubes, chem_form_parser,
+    calculate_formula_MAC, get_edge_info, find_beam_and_sample_interferences, load_MAC_JSON)
+
+# ---------- Class Definitions ----------
+
+# The reference tables are the three MAC_JSONs; anode_energies maps anode names to keV; threshold is the transmitted
+# fraction below which a sample is thick enough
+FootprintContext = namedtuple("FootprintContext", ["element_info", "atomic_MACs", "edges", "anode_energies", "threshold"])
+
+# ---------- Context Creation ----------
+
+# Function to return a read-only copy of a JSON-style table (dictionaries, lists and values)
+def freeze_table(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze_table(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze_table(item) for item in value)
+    return value
+
+# Function to load the reference tables once and return a context to share between threads
+def load_footprint_context(threshold=attenuation_threshold, anode_energies=None):
+    return FootprintContext(element_info=freeze_table(load_MAC_JSON("Element_Information_Dict.json")),
+                            atomic_MACs=freeze_table(load_MAC_JSON("Atomic_MACs.json")),
+                            edges=freeze_table(load_MAC_JSON("X-ray_Absorption_Edges.json")),
+                            anode_energies=MappingProxyType(dict(CCMC_Tubes if anode_energies is None else anode_energies)),
+                            threshold=float(threshold))
+
+# ---------- Core Calculations ----------
+
+# Function to return the incident energy in keV from an anode name or an energy
+def incident_energy(context, anode=None, energy=None):
+    if anode is not None:
+        if anode not in context.anode_energies:
+            raise ValueError("Unknown anode '{}'. Choose from {}.".format(anode, list(context.anode_energies)))
+        return context.anode_energies[anode]
+    if energy is not None:
+        return float(energy)
+    raise ValueError("Please provide either an 'anode' or an 'energy' (keV).")
+
+# Function to return (valid MAC boolean, MAC in cm^2/g or None) for a formula (quiet=True skips the parser's messages)
+def formula_MAC(context, formula, energy_keV, quiet=False):
+    return calculate_formula_MAC(formula, energy_keV, context.element_info, context.atomic_MACs, quiet)
+
+# Function to return ({element: edges}, [[element, edge, keV]] within 1 keV of the incident energy) for a formula
+def formula_edges(context, formula, energy_keV):
+    stoich = chem_form_parser(formula)
+    if not stoich:
+        raise ValueError("Could not recognize formula '{}'.".format(formula))
+    sample_edges = get_edge_info(stoich, context.edges)
+    return sample_edges, find_beam_and_sample_interferences(sample_edges, energy_keV)
+
+# Function to summarize the attenuation of a sample of a LAC (cm^-1) through a depth (mm)
+def attenuation_summary(context, LAC, depth):
+    intensity_ratio = float(beer_lambert_atten(LAC, depth))
+    return {"LAC cm^-1": LAC, "transmitted fraction": intensity_ratio, "thick enough": intensity_ratio < context.threshold,
+            "10 um transmitted fraction": float(beer_lambert_atten(LAC, 0.01)),
+            "required depth mm": float(beer_lambert_layer(LAC, context.threshold) * 10)}
+
+# Function to evaluate one footprint scenario as a JSON-serializable dictionary {"mode", "curve", "beam fits", "attenuation"}
+def evaluate_scenario(context, radius, optics, sample, min_2theta, max_2theta, step_size_deg=1):
+    graphable_data_set = beam_curve_for_optics(radius, optics, min_2theta, max_2theta, step_size_deg)
+    return {"mode": optics.mode, "curve": [[theta, value] for theta, value in graphable_data_set.items()],
+            "beam fits": bool(beam_fit_checker(optics, sample, graphable_data_set)),
+            "attenuation": attenuation_summary(context, sample.LAC, sample.depth) if sample.z_check else None}
+
+# ---------- Thread Safety Check ----------
+
+# Function to run the same MAC and scenario calculations serially and in a thread pool and compare the results
+# Returns (whether every result matched, serial seconds, threaded seconds)
+def check_thread_safety(context=None, workers=8, repeats=50):
+    context = context if context is not None else load_footprint_context()
+    formulas = ["Fe2O3", "SiO2", "CaCO3", "Ca5(PO4)3OH", "CuSO4·5H2O", "LaB6", "Al2O3", "ZnO"]
+    energies = list(context.anode_energies.values()) + [10.0, 12.4] # Tube energies and interpolated energies
+    holder = DiffractionSample("Custom", "Circle", True, diameter=20, LAC=100, depth=0.5)
+    tasks = [("MAC", formula, energy) for formula in formulas for energy in energies] * repeats
+    tasks += [("scenario", radius, slit) for radius in (185, 217.5, 240, 300) for slit in (0.25, 0.5, 1.0)] * repeats
+
+    def run(task):
+        if task[0] == "MAC":
+            return formula_MAC(context, task[1], task[2])
+        return evaluate_scenario(context, task[1], Optics("FDS", 10, i_slit=task[2]), holder, 5, 90)
+
+    start = time.perf_counter()
+    serial_results = [run(task) for task in tasks]
+    serial_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        threaded_results = list(executor.map(run, tasks))
+    threaded_seconds = time.perf_counter() - start
+    return serial_results == threaded_results, serial_seconds, threaded_seconds
+
+
+# ---------- Begin User-Facing Code ----------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that the core calculations give the same results from many threads.")
+    parser.add_argument("--workers", type=int, default=8, help="Threads to run the calculations on")
+    parser.add_argument("--repeats", type=int, default=50, help="Times each calculation is repeated")
+    arguments = parser.parse_args()
+    matched, serial_time, threaded_time = check_thread_safety(workers=arguments.workers, repeats=arguments.repeats)
+    print("Threaded results {} the serial results ({:.2f} s serial, {:.2f} s on {} threads).".format(
+        "match" if matched else "DO NOT match", serial_time, threaded_time, arguments.workers))
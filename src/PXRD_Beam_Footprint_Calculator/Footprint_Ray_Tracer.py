@@ -0,0 +1,221 @@
+# Developed by Mitch S-A
+# Updated on October 19, 2026
+
+# A Monte Carlo ray tracer for the beam footprint. Where Beam_Profile_Calculator.py treats the beam as a hard rectangle
+# of l_short + l_long by the beam mask, this script follows individual rays from the tube's line focus through the
+# divergence slit (equatorial divergence), the Soller slit (axial divergence) and the beam mask onto the sample plane.
+# The result is an intensity-weighted footprint map and the fraction of the beam spilling off the holder at each angle.
+# Angles are passed the same way as FDS_length, so with no axial divergence and a point focus the traced beam edges
+# land exactly on l_short and l_long.
+#
+# Geometry (all lengths in mm): the goniometer axis is the origin, x runs along the beam direction on the sample surface,
+# y is the equitorial direction (across the beam, limited by the beam mask) and z is the sample normal.
+# From the command line it prints the spill-over fraction at each angle with its standard error, updated after every
+# chunk of rays, so convergence can be watched (Ctrl-C stops the run; --tolerance stops each angle once it is reached).
+# --compare traces a point focus with shrinking Soller slits: the traced length always matches FDS_length, and the width
+# narrows to the beam mask as the axial divergence goes to zero.
+# Run from the repository root with, e.g.:
+#   python -m src.PXRD_Beam_Footprint_Calculator.Footprint_Ray_Tracer --radius 240 --slit 0.5 --mask 10 --diameter 20 --tolerance 0.0005
+#   python -m src.PXRD_Beam_Footprint_Calculator.Footprint_Ray_Tracer --radius 240 --slit 0.5 --mask 10 --diameter 20 --compare
+
+# ---------- Necessary imports ----------
+
+# Library for the command line
+import argparse
+# Libraries to allow for array calculations and root solving
+import numpy as np
+from scipy.optimize import fsolve
+
+# Import the classes and geometry functions from the parent script
+from src.PXRD_Beam_Footprint_Calculator.Beam_Profile_Calculator import (ADS_equation_for_phi, DiffractionSample, Optics,
+    l_short, l_long)
+
+# ---------- Ray Sampling and Tracing Functions ----------
+
+# Function to find the ADS divergence angle (degrees) at a single angle, as phi_solver does for each step
+def ADS_phi_at(length_mm, radius_mm, theta_degrees):
+    phi_solution = fsolve(ADS_equation_for_phi, np.deg2rad(0.005), args=(length_mm, radius_mm, np.deg2rad(theta_degrees)))
+    return float(np.rad2deg(phi_solution[0]))
+
+# Function to return the equatorial divergence (degrees) of the optics at one angle
+def divergence_at(radius, optics, theta_degrees):
+    if optics.mode == "FDS":
+        return optics.i_slit
+    return ADS_phi_at(optics.i_length, radius, theta_degrees)
+
+# Function to trace one batch of rays and return their (x, y) positions on the sample plane
+# Rays which never reach the sample plane or are stopped by the beam mask are returned as NaN and flagged as blocked
+def trace_ray_batch(rng, n_rays, radius, phi_degrees, theta_degrees, mask, soller_degrees, focus_width, focus_length, mask_distance):
+    theta = np.deg2rad(theta_degrees)
+    # Equatorial divergence: uniform over the divergence slit opening
+    delta = np.deg2rad(phi_degrees) * (rng.random(n_rays) - 0.5)
+    # Axial divergence: parallel-plate Soller slits transmit a triangular distribution of angles
+    psi = np.deg2rad(soller_degrees) / 2 * (rng.random(n_rays) + rng.random(n_rays) - 1)
+    # Starting point on the line focus: across its apparent width (in the diffraction plane) and along its length
+    focus_offset = focus_width * (rng.random(n_rays) - 0.5)
+    focus_axial = focus_length * (rng.random(n_rays) - 0.5)
+    source_x = -radius * np.cos(theta) + focus_offset * np.sin(theta)
+    source_z = radius * np.sin(theta) + focus_offset * np.cos(theta)
+    alpha = theta + delta # Angle of each ray below the sample plane
+    reaches_sample = alpha > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        path_length = np.where(reaches_sample, source_z / np.sin(alpha), np.nan) # In-plane distance to the sample
+        x = source_x + path_length * np.cos(alpha)
+        y = focus_axial + path_length * np.tan(psi)
+    # Beam mask: its engraved width is projected at the sample, so central rays are clipped to +-mask/2 there and
+    # axially divergent rays spread beyond it by the distance left to travel after the mask
+    y_at_mask = y - mask_distance * np.tan(psi)
+    passes_mask = np.abs(y_at_mask) <= mask / 2
+    blocked = ~(reaches_sample & passes_mask)
+    x[blocked] = np.nan
+    y[blocked] = np.nan
+    return x, y, blocked
+
+# Function to flag which (x, y) sample-plane positions fall outside the holder
+def outside_holder(sample, x, y):
+    if sample.shape == "Circle":
+        return x ** 2 + y ** 2 > (sample.diameter / 2) ** 2
+    return (np.abs(x) > sample.axi / 2) | (np.abs(y) > sample.equi / 2)
+
+# ---------- Footprint Simulation ----------
+
+# Function to ray trace the footprint at every angle in theta_values
+# n_rays is the most rays traced per angle; rays are generated chunk_size at a time so memory stays bounded.
+# If tolerance is given, an angle stops early once the standard error of its spill-over fraction falls below it.
+# If progress is given, it is called after every chunk as progress(angle index, rays traced, spill fraction so far,
+# standard error) so a caller can show convergence.
+# Returns a dictionary of arrays indexed by angle, including intensity maps on a grid spanning the holder plus a margin.
+def trace_footprint(radius, optics, sample, theta_values, n_rays=1000000, chunk_size=200000, soller_degrees=2.5,
+                    focus_width=0.04, focus_length=12, mask_distance=None, seed=0, tolerance=None, map_bins=(120, 120), margin=5,
+                    progress=None):
+    theta_values = np.atleast_1d(np.asarray(theta_values, dtype=float))
+    if mask_distance is None: # Typical beam masks sit roughly halfway between the tube and the sample
+        mask_distance = radius / 2
+    if sample.shape == "Circle":
+        half_x = half_y = sample.diameter / 2 + margin
+    else:
+        half_x, half_y = sample.axi / 2 + margin, sample.equi / 2 + margin
+    x_edges = np.linspace(-half_x, half_x, map_bins[0] + 1)
+    y_edges = np.linspace(-half_y, half_y, map_bins[1] + 1)
+    # One independent, reproducible random stream per angle so results do not depend on chunking or early stopping
+    streams = [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(len(theta_values))]
+    footprint_maps = np.zeros((len(theta_values), map_bins[0], map_bins[1]))
+    spill_fraction = np.zeros(len(theta_values))
+    standard_error = np.zeros(len(theta_values))
+    blocked_fraction = np.zeros(len(theta_values))
+    rays_traced = np.zeros(len(theta_values), dtype=np.int64)
+    for i, theta_degrees in enumerate(theta_values):
+        phi_degrees = divergence_at(radius, optics, theta_degrees)
+        delivered = 0 # Rays that reach the sample plane
+        spilled = 0 # Of those, rays landing outside the holder
+        blocked = 0
+        while rays_traced[i] < n_rays:
+            batch = int(min(chunk_size, n_rays - rays_traced[i]))
+            x, y, batch_blocked = trace_ray_batch(streams[i], batch, radius, phi_degrees, theta_degrees, optics.mask,
+                                                  soller_degrees, focus_width, focus_length, mask_distance)
+            rays_traced[i] += batch
+            blocked += int(batch_blocked.sum())
+            x, y = x[~batch_blocked], y[~batch_blocked]
+            delivered += x.size
+            spilled += int(outside_holder(sample, x, y).sum())
+            footprint_maps[i] += np.histogram2d(x, y, bins=(x_edges, y_edges))[0]
+            if delivered:
+                p = spilled / delivered
+                standard_error[i] = np.sqrt(max(p * (1 - p), 1 / delivered) / delivered) # Floor avoids a zero error at p = 0
+                if progress is not None:
+                    progress(i, int(rays_traced[i]), p, float(standard_error[i]))
+            if tolerance is not None and delivered and standard_error[i] < tolerance:
+                break # Converged: stop tracing this angle early
+        spill_fraction[i] = spilled / delivered if delivered else np.nan
+        blocked_fraction[i] = blocked / rays_traced[i]
+        if delivered: # Normalize each map to the fraction of delivered intensity per bin
+            footprint_maps[i] /= delivered
+    return {"theta": theta_values, "spill fraction": spill_fraction, "standard error": standard_error,
+            "blocked fraction": blocked_fraction, "rays traced": rays_traced, "maps": footprint_maps,
+            "x edges": x_edges, "y edges": y_edges}
+
+# ---------- Comparison with the Rectangle Model ----------
+
+# Function to trace a point focus at one angle and return the extent of the beam on the sample plane:
+# (incident-side edge, diffracted-side edge, equitorial half-width), all in mm. The rectangle model of
+# Beam_Profile_Calculator.py has edges -l_short and +l_long and a half-width of mask / 2; the traced edges match it for
+# any Soller slit, and the traced half-width approaches mask / 2 as the axial divergence goes to zero
+def traced_beam_extent(radius, optics, theta_degrees, soller_degrees, n_rays=200000, focus_length=12, mask_distance=None,
+                       seed=0):
+    mask_distance = radius / 2 if mask_distance is None else mask_distance
+    x, y, blocked = trace_ray_batch(np.random.default_rng(seed), n_rays, radius, divergence_at(radius, optics, theta_degrees),
+                                    theta_degrees, optics.mask, soller_degrees, 0, focus_length, mask_distance)
+    x, y = x[~blocked], y[~blocked]
+    return float(x.min()), float(x.max()), float(np.abs(y).max())
+
+
+# ---------- Begin User-Facing Code ----------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo spill-over of the beam footprint across a 2theta range.")
+    parser.add_argument("--radius", type=float, required=True, help="Goniometer radius in mm")
+    beam_group = parser.add_mutually_exclusive_group(required=True)
+    beam_group.add_argument("--slit", type=float, help="FDS divergence slit in degrees")
+    beam_group.add_argument("--length", type=float, help="ADS irradiated length in mm")
+    parser.add_argument("--mask", type=float, required=True, help="Beam mask in mm")
+    holder_group = parser.add_mutually_exclusive_group(required=True)
+    holder_group.add_argument("--diameter", type=float, help="Circular well diameter in mm")
+    holder_group.add_argument("--axi", type=float, help="Rectangular well axial length in mm (requires --equi)")
+    parser.add_argument("--equi", type=float, help="Rectangular well equitorial width in mm")
+    parser.add_argument("--min-2theta", type=float, default=5)
+    parser.add_argument("--max-2theta", type=float, default=90)
+    parser.add_argument("--step", type=float, default=5)
+    parser.add_argument("--rays", type=int, default=1000000, help="Most rays traced at each angle")
+    parser.add_argument("--chunk", type=int, default=200000, help="Rays traced between convergence updates")
+    parser.add_argument("--tolerance", type=float, help="Stop an angle once the spill-over standard error is below this")
+    parser.add_argument("--soller", type=float, default=2.5, help="Soller slit (axial divergence) in degrees")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", action="store_true",
+                        help="Compare a point-focus trace with the l_short + l_long by mask rectangle as the Soller slit shrinks")
+    arguments = parser.parse_args()
+    if arguments.axi is not None and arguments.equi is None:
+        parser.error("--axi requires --equi")
+    if arguments.rays < 1 or arguments.chunk < 1:
+        parser.error("--rays and --chunk must be at least 1")
+    if arguments.slit is not None:
+        trace_optics = Optics("FDS", arguments.mask, i_slit=arguments.slit)
+    else:
+        trace_optics = Optics("ADS", arguments.mask, i_length=arguments.length)
+    if arguments.diameter is not None:
+        trace_sample = DiffractionSample("Custom", "Circle", False, diameter=arguments.diameter)
+    else:
+        trace_sample = DiffractionSample("Custom", "Rectangle", False, axi=arguments.axi, equi=arguments.equi)
+    theta_grid = np.arange(arguments.min_2theta, arguments.max_2theta + arguments.step / 2, arguments.step)
+
+    if arguments.compare:
+        for theta_degrees in theta_grid:
+            phi_degrees = divergence_at(arguments.radius, trace_optics, theta_degrees)
+            near_edge, far_edge = -l_short(arguments.radius, phi_degrees, theta_degrees), l_long(arguments.radius,
+                                                                                                  phi_degrees, theta_degrees)
+            # In FDS mode the rectangle's length is FDS_length at this angle
+            print("{:5.1f} deg: rectangle model {:8.3f} to {:8.3f} mm (length {:.3f} mm), half-width {:.3f} mm".format(
+                theta_degrees, near_edge, far_edge, far_edge - near_edge, arguments.mask / 2))
+            for soller_degrees in (arguments.soller, arguments.soller / 4, arguments.soller / 16, 0):
+                near_edge, far_edge, half_width = traced_beam_extent(arguments.radius, trace_optics, theta_degrees,
+                                                                     soller_degrees, seed=arguments.seed)
+                print("    Soller {:6.3f} deg: traced {:8.3f} to {:8.3f} mm (length {:.3f} mm), half-width {:.3f} mm".format(
+                    soller_degrees, near_edge, far_edge, far_edge - near_edge, half_width))
+    else:
+        # Function to print each chunk's running estimate, overwriting the line until the next angle starts
+        shown = [None] # Index of the angle on the current line
+        def show_progress(index, rays, spill, error):
+            if shown[0] is not None and shown[0] != index:
+                print()
+            shown[0] = index
+            print("\r{:5.1f} deg: spill-over {:7.3%} +- {:.3%} after {:,} rays".format(theta_grid[index], spill, error, rays),
+                  end="", flush=True)
+        try:
+            result = trace_footprint(arguments.radius, trace_optics, trace_sample, theta_grid, n_rays=arguments.rays,
+                                     chunk_size=arguments.chunk, soller_degrees=arguments.soller, seed=arguments.seed,
+                                     tolerance=arguments.tolerance, progress=show_progress)
+        except KeyboardInterrupt: # Stopping early keeps the estimates already printed
+            print("\nStopped.")
+            raise SystemExit(1)
+        print()
+        print("{:,} rays traced; {:.1%} of them were stopped by the beam mask".format(int(result["rays traced"].sum()),
+            float((result["blocked fraction"] * result["rays traced"]).sum() / result["rays traced"].sum())))
@@ -0,0 +1,55 @@
+# Developed by Mitch S-A
+# Updated on October 19, 2026
+
+# Builds MAC_JSONs/Anode_MAC_Table.json: the MAC of every element (Z = 1 to 92) at each common anode energy in
+# CCMC_Tubes and at each of its characteristic lines in Anode_Lines. get_sample_MAC_library reads this table for
+# standard tubes instead of re-interpolating Atomic_MACs.json. Re-run it whenever Atomic_MACs.json is rebuilt:
+#   python -m src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.Anode_MAC_Table_Builder
+
+# ---------- Necessary imports ----------
+
+# Library to read and write JSON files
+import json
+import os
+
+# Import the interpolation and reference values from MAC_Calculator.py
+from src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.MAC_Calculator import (CCMC_Tubes, Anode_Lines,
+    MAC_JSON_directory, load_MAC_JSON, interpolate_elemental_MAC)
+
+# ---------- Table Building Functions ----------
+
+# Function to list the table's columns as ["Cu", "Cu Ka1", "Cu Ka2", "Cu Kb", "Co", ...] with matching energies
+def anode_table_columns():
+    columns = []
+    energies = []
+    for anode, energy in CCMC_Tubes.items():
+        columns.append(anode) # The default energy used by MAC_Calculator.py
+        energies.append(energy)
+        for line, line_energy in Anode_Lines.get(anode, {}).items():
+            columns.append("{anode} {line}".format(anode=anode, line=line))
+            energies.append(line_energy)
+    return columns, energies
+
+# Function to build the table dictionary from an Atomic_MACs.json style dictionary
+def build_anode_MAC_table(full_LAC_dict):
+    columns, energies = anode_table_columns()
+    MAC_rows = [] # One row per Z from 1 to 92, one column per energy
+    for proton in range(1, 93):
+        energy_dependent_MAC_dict = full_LAC_dict[str(proton)]
+        MAC_rows.append([interpolate_elemental_MAC(energy_dependent_MAC_dict, energy) for energy in energies])
+    return {"columns": columns, "energies keV": energies, "MACs": MAC_rows}
+
+# Function to write the table next to the other MAC_JSONs
+def write_anode_MAC_table(table_dict, filename=os.path.join(MAC_JSON_directory, "Anode_MAC_Table.json")):
+    try:
+        with open(filename, "w") as jsonfile:
+            json.dump(table_dict, jsonfile)
+        print("Anode MAC table written to {}".format(filename))
+    except Exception as e:
+        print("Error writing anode MAC table: {}".format(e))
+
+
+# ---------- Begin User-Facing Code ----------
+
+if __name__ == "__main__":
+    write_anode_MAC_table(build_anode_MAC_table(load_MAC_JSON("Atomic_MACs.json")))
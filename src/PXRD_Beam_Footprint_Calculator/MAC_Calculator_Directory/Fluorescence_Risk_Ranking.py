@@ -0,0 +1,224 @@
+# Developed by Mitch S-A
+# Updated on October 19, 2026
+
+# Fluorescence risk scores for a whole phase library under every anode at once, ranked so that samples which will
+# fluoresce on the booked tube can be moved to another instrument before the booking. beam_and_sample_interference only
+# prints the edges within 1 keV of the incident energy for one sample; here every absorption edge below the incident
+# energy contributes, weighted by how likely it is to turn absorbed beam into fluorescence:
+#     risk(edge, anode) = J * omega * (E_edge / E_incident)^3          for E_edge < E_incident (0 otherwise)
+#   - J = (r - 1) / r is the absorption jump factor, the share of the element's absorption just above the edge that
+#     belongs to that shell; r is the jump ratio (Poehn et al. empirical fits for K and L-III, typical values for L-I/L-II)
+#   - omega = Z^4 / (A + Z^4) is the fluorescence yield of the shell (A = 1.12e6 for K, 8.9e7 for L)
+#   - (E_edge / E_incident)^3 is the proximity weight: photoabsorption falls off roughly as E^-3 above an edge, so an
+#     edge just below the beam energy (Fe K under Cu) absorbs far more than one well below it (Fe K under Mo)
+# Edge risks are summed into an element x anode matrix R once, and a library's scores are the mass fractions (the
+# vectorized get_relative_abundance, W, one row per phase) times R: score = W @ R. M edges are left out, as their yields
+# are negligible and their lines are absorbed by air. The score is a relative index for ranking, not a measured quantity:
+# Fe2O3 scores about 0.12 under Cu, 0 under Co and 0.01 under Mo.
+# Run from the repository root with, e.g.:
+#   python -m src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.Fluorescence_Risk_Ranking --formula Fe2O3 --formula SrCO3 --formula CaCO3 --booked Cu
+#   python -m src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.Fluorescence_Risk_Ranking --phase-db --top 50 --output risk.csv
+
+# ---------- Necessary imports ----------
+
+# Libraries to allow code to interface with the file system and the command line
+import os
+import argparse
+import csv
+import time
+# Library to allow for array calculations
+import numpy as np
+
+# Import the parser's count vectors and the MAC calculator's tables and tube energies
+from src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.Formula_Parser import (formula_vectors, element_symbols,
+    symbol_to_Z, vector_length)
+from src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.MAC_Calculator import (CCMC_Tubes, MAC_JSON_directory,
+    load_MAC_JSON)
+from src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.Phase_Density_Database import (phase_density_directory,
+    load_phase_density_database)
+
+# ---------- Short Reference Dictionaries and Lists ----------
+
+# Edges which can fluoresce into the detector, and the constant A of each shell's fluorescence yield Z^4 / (A + Z^4)
+fluorescence_yield_constants = {"K": 1.12e6, "L-I": 8.9e7, "L-II": 8.9e7, "L-III": 8.9e7}
+
+# Jump ratios without a Z-dependent fit
+fixed_jump_ratios = {"L-I": 1.16, "L-II": 1.41}
+
+# Scores at or above this are flagged as likely to fluoresce
+default_flag_score = 0.02
+
+# Phases scored per block, so the (phases, 119) mass fraction matrix stays small for libraries of any size
+default_chunk_rows = 65536
+
+# ---------- Edge Risk Matrix ----------
+
+# Function to return (Z, edge label, edge keV) arrays for every edge, from Reference_Tables.npz or the edge JSON
+def load_edge_arrays():
+    try:
+        with np.load(os.path.join(MAC_JSON_directory, "Reference_Tables.npz")) as tables:
+            symbols = tables["edge_symbols"]
+            return (np.array([symbol_to_Z[str(symbol)] for symbol in symbols])[tables["edge_element"]],
+                    tables["edge_label"].astype(str), tables["edge_keV"].astype(float))
+    except (OSError, KeyError): # No compact tables: read the JSON instead
+        edge_dict = load_MAC_JSON("X-ray_Absorption_Edges.json")
+        rows = [(symbol_to_Z[symbol], label, float(keV)) for symbol, edges in edge_dict.items() for label, keV, angstrom in edges]
+        return np.array([row[0] for row in rows]), np.array([row[1] for row in rows]), np.array([row[2] for row in rows])
+
+# Function to return the jump factor (r - 1) / r and fluorescence yield of each edge (both 0 for edges left out)
+def edge_jump_and_yield(proton_numbers, labels):
+    Z = np.asarray(proton_numbers, dtype=float)
+    jump_ratio = np.ones(Z.shape)
+    jump_ratio = np.where(labels == "K", 125 / Z + 3.5, jump_ratio)
+    jump_ratio = np.where(labels == "L-III", 80 / Z + 1.5, jump_ratio)
+    for label, ratio in fixed_jump_ratios.items():
+        jump_ratio = np.where(labels == label, ratio, jump_ratio)
+    yield_constant = np.array([fluorescence_yield_constants.get(label, np.inf) for label in labels])
+    return (jump_ratio - 1) / jump_ratio, Z ** 4 / (yield_constant + Z ** 4)
+
+# Function to return the element x energy risk matrix R (119, energies) and the row of the riskiest edge of each element
+# at each energy (-1 where an element has no edge below it)
+def element_risk_matrix(incident_energies, edge_arrays=None):
+    proton_numbers, labels, edge_keV = edge_arrays if edge_arrays is not None else load_edge_arrays()
+    energies = np.asarray(incident_energies, dtype=float)
+    jump_factor, fluorescence_yield = edge_jump_and_yield(proton_numbers, labels)
+    proximity = np.where(edge_keV[:, None] < energies, (edge_keV[:, None] / energies) ** 3, 0.0)
+    edge_risk = (jump_factor * fluorescence_yield)[:, None] * proximity # (edges, energies)
+    risk = np.zeros((vector_length, len(energies)))
+    np.add.at(risk, proton_numbers, edge_risk)
+    # Riskiest edge per element: sort edges by risk within each element and keep the last of each element
+    riskiest_edge = np.full((vector_length, len(energies)), -1)
+    for column in range(len(energies)):
+        order = np.lexsort((edge_risk[:, column], proton_numbers))
+        last = np.r_[proton_numbers[order][1:] != proton_numbers[order][:-1], True]
+        kept = order[last]
+        riskiest_edge[proton_numbers[kept], column] = np.where(edge_risk[kept, column] > 0, kept, -1)
+    return risk, riskiest_edge
+
+# ---------- Library Scores ----------
+
+# Function to return the Z-indexed atomic weight vector (0 for elements without data, i.e. above Z = 92)
+def atomic_weight_vector(element_data_dict=None):
+    element_data_dict = element_data_dict if element_data_dict is not None else load_MAC_JSON("Element_Information_Dict.json")
+    weights = np.zeros(vector_length)
+    for symbol, info in element_data_dict.items():
+        if symbol in symbol_to_Z:
+            weights[symbol_to_Z[symbol]] = float(info[5])
+    return weights
+
+# Function to return the (phases, 119) mass fraction matrix W of a list of formulas and a mask of usable rows
+# Each row is get_relative_abundance for that formula; formulas which do not parse or contain Z > 92 are not usable
+def mass_fraction_matrix(formulas, atomic_weights):
+    counts, valid = formula_vectors(formulas)
+    valid &= ~((counts > 0) & (atomic_weights == 0)).any(axis=1)
+    gram_amounts = counts * atomic_weights
+    totals = gram_amounts.sum(axis=1, keepdims=True)
+    return np.divide(gram_amounts, totals, out=np.zeros_like(gram_amounts), where=totals > 0), valid
+
+# Function to score every formula under every anode
+#   anodes: {name: keV}, by default the CCMC_Tubes
+# Returns {"anodes", "score" (phases, anodes; NaN if unusable), "driver" (phases, anodes: "Fe K" style label of the largest
+# contribution, "" if none), "valid"}
+def fluorescence_risk(formulas, anodes=None, edge_arrays=None, element_data_dict=None, chunk_rows=default_chunk_rows):
+    anodes = dict(anodes if anodes is not None else CCMC_Tubes)
+    edge_arrays = edge_arrays if edge_arrays is not None else load_edge_arrays()
+    risk, riskiest_edge = element_risk_matrix(list(anodes.values()), edge_arrays)
+    atomic_weights = atomic_weight_vector(element_data_dict)
+    edge_names = np.array(["{} {}".format(element_symbols[Z], label) for Z, label in zip(edge_arrays[0], edge_arrays[1])] + [""])
+    score = np.full((len(formulas), len(anodes)), np.nan)
+    driver = np.full((len(formulas), len(anodes)), "", dtype=edge_names.dtype)
+    valid = np.zeros(len(formulas), dtype=bool)
+    for start in range(0, len(formulas), chunk_rows):
+        rows = slice(start, start + chunk_rows)
+        W, valid[rows] = mass_fraction_matrix(formulas[rows], atomic_weights)
+        score[rows] = np.where(valid[rows, None], W @ risk, np.nan)
+        for column in range(len(anodes)): # Element with the largest share of each phase's score, and its riskiest edge
+            contribution = W * risk[:, column]
+            top_Z = contribution.argmax(axis=1)
+            top_edge = np.where(contribution[np.arange(len(top_Z)), top_Z] > 0, riskiest_edge[top_Z, column], -1)
+            driver[rows, column] = edge_names[top_edge] # Row -1 is the trailing ""
+    return {"anodes": list(anodes), "score": score, "driver": driver, "valid": valid}
+
+# Function to rank scored phases by their risk on the booked anode and recommend an anode for each
+#   candidates: anodes a sample may be moved to (by default all scored anodes); a sample stays on the booked anode unless
+#   it is flagged there, and otherwise moves to the candidate with the lowest score
+# Returns (row order, highest risk first with unusable phases last; recommended anode per phase; flagged mask)
+def rank_fluorescence_risk(results, booked="Cu", candidates=None, flag_score=default_flag_score):
+    anodes = results["anodes"]
+    if booked not in anodes:
+        raise ValueError("Booked anode '{}' was not scored. Choose from {}.".format(booked, anodes))
+    booked_score = results["score"][:, anodes.index(booked)]
+    candidate_columns = [anodes.index(anode) for anode in (candidates or anodes)]
+    flagged = booked_score >= flag_score
+    best = np.array(candidate_columns)[np.argmin(np.nan_to_num(results["score"][:, candidate_columns], nan=np.inf), axis=1)]
+    recommended = np.where(flagged, np.array(anodes)[best], booked)
+    recommended[~results["valid"]] = ""
+    order = np.argsort(-np.nan_to_num(booked_score, nan=-np.inf), kind="stable")
+    return order, recommended, flagged
+
+# ---------- Phase Lists ----------
+
+# Function to read (formula, label) rows from a CSV with a "formula" column and an optional "name" or "phase" column
+def read_formula_csv(path):
+    with open(path, "r", newline="", encoding="utf-8-sig") as csvfile:
+        reader = csv.DictReader(csvfile)
+        columns = {name.strip().lower(): name for name in reader.fieldnames or []}
+        if "formula" not in columns:
+            raise ValueError("{} needs a 'formula' column.".format(path))
+        label_column = columns.get("name", columns.get("phase"))
+        return [((row[columns["formula"]] or "").strip(), (row[label_column] or "").strip() if label_column else "")
+                for row in reader]
+
+# Function to read (reduced formula, labels) for every formula in the phase density database
+def read_phase_database_formulas(directory=phase_density_directory):
+    database = load_phase_density_database(directory)
+    if database is None:
+        raise FileNotFoundError("No phase density database at {}; build one with Phase_Density_Database.py.".format(directory))
+    labels = database.entries["label"]
+    return [(key.decode("utf-8"), "; ".join(label.decode("utf-8") for label in labels[start:start + count]))
+            for key, start, count in database.keys]
+
+
+# ---------- Begin User-Facing Code ----------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank a phase library by fluorescence risk on each anode.")
+    parser.add_argument("--formula", action="append", default=[], help="Formula to score, repeat for each phase")
+    parser.add_argument("--csv", action="append", default=[], help="CSV with a formula column and optional name column")
+    parser.add_argument("--phase-db", action="store_true", help="Score every formula in the phase density database")
+    parser.add_argument("--booked", default="Cu", choices=list(CCMC_Tubes.keys()), help="Anode the samples are booked on")
+    parser.add_argument("--candidates", nargs="+", choices=list(CCMC_Tubes.keys()), help="Anodes samples may be moved to")
+    parser.add_argument("--flag-score", type=float, default=default_flag_score, help="Score at which a sample is flagged")
+    parser.add_argument("--top", type=int, default=20, help="Rows to print")
+    parser.add_argument("--output", help="Write the full ranked table to this CSV")
+    arguments = parser.parse_args()
+    phases = [(formula, "") for formula in arguments.formula]
+    phases += [phase for path in arguments.csv for phase in read_formula_csv(path)]
+    if arguments.phase_db:
+        try:
+            phases += read_phase_database_formulas()
+        except FileNotFoundError as e:
+            parser.error(str(e))
+    if not phases:
+        parser.error("Give phases with --formula, --csv or --phase-db.")
+    start_time = time.perf_counter()
+    risk_results = fluorescence_risk([formula for formula, label in phases])
+    ranking, recommendations, flags = rank_fluorescence_risk(risk_results, arguments.booked, arguments.candidates,
+                                                              arguments.flag_score)
+    elapsed_ms = (time.perf_counter() - start_time) * 1000
+    booked_column = risk_results["anodes"].index(arguments.booked)
+    header = ["rank", "formula", "name"] + ["{} score".format(anode) for anode in risk_results["anodes"]] + [
+        "{} driver".format(arguments.booked), "flagged", "recommended anode"]
+    table_rows = [[rank, phases[row][0], phases[row][1]] + ["{:.4f}".format(value) for value in risk_results["score"][row]] + [
+        risk_results["driver"][row, booked_column], bool(flags[row]), recommendations[row] or "no valid score"]
+        for rank, row in enumerate(ranking, start=1)]
+    print("Scored {:,} phases in {:.1f} ms; {:,} flagged on {}.".format(len(phases), elapsed_ms, int(flags.sum()), arguments.booked))
+    print(" | ".join(header))
+    for table_row in table_rows[:arguments.top]:
+        print(" | ".join(str(value) for value in table_row))
+    if arguments.output:
+        with open(arguments.output, "w", newline="") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(header)
+            writer.writerows(table_rows)
+        print("Ranked table written to {}.".format(arguments.output))
@@ -0,0 +1,387 @@
+# Developed by Mitch S-A
+# Updated on October 19, 2026
+
+# A built-in chemical formula parser used by chem_form_parser in MAC_Calculator.py. One precompiled regular expression
+# splits a formula into tokens, and a single loop with a stack of brackets (a small recursive-descent grammar written
+# without recursion) accumulates the element counts. It understands:
+#   - parentheses, square brackets and braces, nested to any depth: K4[Fe(CN)6], Ca5(PO4)3(OH)
+#   - hydrate/adduct dots "·", "•", "∙", "*" and "." with a leading multiplier per part: 3CaO·Al2O3·CaCO3·11H2O
+#   - fractional occupancies: Fe0.5Mn0.5O, Li0.9Ni1.1O2
+#   - subscript digits: Al₂O₃
+# Whitespace is rejected rather than skipped, so a typo such as "CO 2" is reported instead of being read as CO2.
+# A "." between two digits is always a decimal point, so write CuSO4·5H2O, CuSO4*5H2O or CuSO4.(5H2O) rather than
+# CuSO4.5H2O. Anywhere else (CuSO4.H2O, CaO.Al2O3) it is a hydrate dot.
+# Two faster paths cover most real formulas: those made only of elements and counts (Bi2Sr2CaCu2O8), and those which
+# also have brackets but no dots or leading multipliers (Ca5(PO4)3(OH)), which are read right to left with a stack of
+# bracket multipliers.
+# The most recent 4096 distinct formulas are remembered, since sweeps and manifests repeat the same few phases many times;
+# every call still returns a fresh dictionary.
+# formula_vectors reads long lists (a phase database, a manifest) without any per-formula parsing: all of the formulas are
+# joined into one byte array, and numpy classifies every character, reads every count and pairs every bracket at once.
+# Only formulas with dots, leading multipliers or subscripts (or mistakes) go through the parser above.
+# Running python -m src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.Formula_Parser: on the benchmark phases a
+# first parse is about 4x faster than chemparse and remembered formulas about 25x; on 20,000 distinct formulas (nothing
+# remembered) formula_vectors is 16-20x faster than chemparse.
+# Elements are identified by proton number directly, so results are available as Z-indexed count vectors (index 0 is
+# unused, index 26 is Fe) without any lookup through Element_Information_Dict.json.
+
+# ---------- Necessary imports ----------
+
+# Libraries for the tokenizer, timing the benchmark and building count vectors
+import re
+import time
+from functools import lru_cache
+import numpy as np
+
+# ---------- Short Reference Dictionaries and Lists ----------
+
+# Element symbols in order of proton number, with index 0 left empty so element_symbols[Z] is the symbol for Z
+element_symbols = ["",
+    "H", "He", "Li", "Be", "B", "C", "N", "O", "F", "Ne", "Na", "Mg", "Al", "Si", "P", "S", "Cl", "Ar", "K", "Ca",
+    "Sc", "Ti", "V", "Cr", "Mn", "Fe", "Co", "Ni", "Cu", "Zn", "Ga", "Ge", "As", "Se", "Br", "Kr", "Rb", "Sr", "Y", "Zr",
+    "Nb", "Mo", "Tc", "Ru", "Rh", "Pd", "Ag", "Cd", "In", "Sn", "Sb", "Te", "I", "Xe", "Cs", "Ba", "La", "Ce", "Pr", "Nd",
+    "Pm", "Sm", "Eu", "Gd", "Tb", "Dy", "Ho", "Er", "Tm", "Yb", "Lu", "Hf", "Ta", "W", "Re", "Os", "Ir", "Pt", "Au", "Hg",
+    "Tl", "Pb", "Bi", "Po", "At", "Rn", "Fr", "Ra", "Ac", "Th", "Pa", "U", "Np", "Pu", "Am", "Cm", "Bk", "Cf", "Es", "Fm",
+    "Md", "No", "Lr", "Rf", "Db", "Sg", "Bh", "Hs", "Mt", "Ds", "Rg", "Cn", "Nh", "Fl", "Mc", "Lv", "Ts", "Og"]
+symbol_to_Z = {symbol: Z for Z, symbol in enumerate(element_symbols) if symbol}
+
+# Length of a count vector (Z = 0 to 118)
+vector_length = len(element_symbols)
+
+# One alternative per token type: element, number, opening bracket, closing bracket, dot, whitespace, anything else
+_token_pattern = re.compile(r"([A-Z][a-z]?)|(\d+(?:\.\d+)?)|([(\[{])|([)\]}])|([·•∙⋅*.])|(\s+)|(.)")
+# Formulas with no brackets, dots or leading multiplier, and the (element, count) pairs within them
+_simple_formula_pattern = re.compile(r"(?:[A-Z][a-z]?(?:\d+(?:\.\d+)?)?)+")
+_element_count_pattern = re.compile(r"([A-Z][a-z]?)(\d+(?:\.\d+)?)?")
+# Formulas which also have brackets (but no dots, leading multipliers or empty brackets), and their (symbol, count) pairs
+_bracket_formula_pattern = re.compile(r"(?:[A-Z][a-z]?(?:\d+(?:\.\d+)?)?|[(\[{](?=[A-Z(\[{])|[)\]}](?:\d+(?:\.\d+)?)?)+")
+_bracket_count_pattern = re.compile(r"([A-Z][a-z]?|[(\[{)\]}])(\d+(?:\.\d+)?)?")
+_matching_bracket = {"(": ")", "[": "]", "{": "}"}
+_closing_brackets = {")", "]", "}"}
+_subscript_digits = str.maketrans("₀₁₂₃₄₅₆₇₈₉", "0123456789")
+# Tables for _scan_formulas: proton number by the two bytes of a symbol (0 if not an element), closing bracket by opening
+_Z_by_symbol_code = np.zeros(256 * 256, dtype=np.int64)
+for _Z, _symbol in enumerate(element_symbols[1:], start=1):
+    _Z_by_symbol_code[ord(_symbol[0]) * 256 + (ord(_symbol[1]) if len(_symbol) > 1 else 0)] = _Z
+_closing_byte = np.zeros(256, dtype=np.uint8)
+_closing_byte[[40, 91, 123]] = [41, 93, 125]
+_powers_of_ten = 10.0 ** np.arange(23) # Exact as doubles
+# Kind of every byte for _scan_formulas, and which (previous kind, kind) pairs it leaves to the general parser
+_other, _newline, _upper, _lower, _digit, _point, _opening, _closing = range(8)
+_character_kind = np.zeros(256, dtype=np.uint8)
+_character_kind[10] = _newline
+_character_kind[65:91], _character_kind[97:123], _character_kind[48:58] = _upper, _lower, _digit
+_character_kind[46] = _point
+_character_kind[[40, 91, 123]], _character_kind[[41, 93, 125]] = _opening, _closing
+_depth_step = np.zeros(8, dtype=np.int32)
+_depth_step[[_opening, _closing]] = [1, -1]
+_unread_pair = np.zeros(64, dtype=bool)
+for _previous in range(8):
+    _unread_pair[_previous * 8 + _other] = True # Whitespace, "·", "*", "+" and so on
+    _unread_pair[_previous * 8 + _lower] = _previous != _upper # E.g. "Xyz" or "(a"
+    _unread_pair[_previous * 8 + _point] = _previous != _digit # A hydrate dot
+    _unread_pair[_point * 8 + _previous] = _previous != _digit
+_unread_pair[[_newline * 8 + _digit, _opening * 8 + _digit]] = True # A leading multiplier
+_unread_pair[_opening * 8 + _closing] = True # An empty group
+_unread_pair[_newline * 8 + _newline] = True # An empty formula
+
+# Lists of at least this many formulas are read by _scan_formulas
+scan_minimum_formulas = 64
+
+# Common phases used by benchmark_formula_parsers (each is parsed the same way by chemparse)
+benchmark_phases = ["SiO2", "Al2O3", "Fe2O3", "Fe3O4", "TiO2", "ZnO", "CaCO3", "MgO", "NaCl", "KCl", "CeO2", "LaB6",
+                    "Ca5(PO4)3(OH)", "CaSO4(H2O)2", "KAl2(AlSi3O10)(OH)2", "Mg3Si4O10(OH)2", "K4[Fe(CN)6]",
+                    "Ca2Al2SiO7", "Y3Al5O12", "Li(Ni0.8Co0.15Al0.05)O2", "LiFePO4", "BaTiO3", "PbZr0.52Ti0.48O3",
+                    "Cu(NO3)2", "(NH4)2SO4", "Ca3Al2(SiO4)3", "Mg0.9Fe0.1SiO3", "NaAlSi3O8", "Zr0.84Y0.16O1.92",
+                    "Bi2Sr2CaCu2O8"]
+
+# ---------- Class Definitions ----------
+
+# Raised for any formula which cannot be parsed; a ValueError so existing "except ValueError" handling still applies
+class FormulaError(ValueError):
+    pass
+
+# ---------- Parsing Functions ----------
+
+# Function to parse a formula into {Z: count}
+def parse_formula_counts(formula):
+    return dict(_remembered_counts(formula))
+
+# Remembers ((Z, count), ...) for recently parsed formulas (formulas which raise FormulaError are not remembered)
+@lru_cache(maxsize=4096)
+def _remembered_counts(formula):
+    return tuple(_parse_counts(formula).items())
+
+def _parse_counts(formula):
+    if not formula or not formula.strip():
+        raise FormulaError("Empty formula.")
+    if _simple_formula_pattern.fullmatch(formula):
+        counts = {}
+        for element, number in _element_count_pattern.findall(formula):
+            Z = symbol_to_Z.get(element)
+            if Z is None:
+                raise FormulaError("Unknown element '{}' in '{}'.".format(element, formula))
+            counts[Z] = counts.get(Z, 0.0) + (float(number) if number else 1.0)
+        return counts
+    if _bracket_formula_pattern.fullmatch(formula):
+        return _parse_bracket_formula(formula)
+    return _parse_general_formula(formula)
+
+# Function to parse a formula of elements, counts and brackets right to left: each closing bracket multiplies everything
+# inside it by its count, so every element's count is its own count times the product of the enclosing bracket counts
+def _parse_bracket_formula(formula):
+    counts = {}
+    multipliers = [1.0]
+    closers = []
+    for symbol, number in reversed(_bracket_count_pattern.findall(formula)):
+        if symbol in _closing_brackets:
+            multipliers.append(multipliers[-1] * (float(number) if number else 1.0))
+            closers.append(symbol)
+        elif symbol in _matching_bracket:
+            if not closers or _matching_bracket[symbol] != closers.pop():
+                raise FormulaError("Unmatched '{}' in '{}'.".format(symbol, formula))
+            multipliers.pop()
+        else:
+            Z = symbol_to_Z.get(symbol)
+            if Z is None:
+                raise FormulaError("Unknown element '{}' in '{}'.".format(symbol, formula))
+            counts[Z] = counts.get(Z, 0.0) + (float(number) if number else 1.0) * multipliers[-1]
+    if closers:
+        raise FormulaError("Unmatched '{}' in '{}'.".format(closers[-1], formula))
+    return counts
+
+# Function to parse any other formula (dots, leading multipliers or subscripts) left to right
+def _parse_general_formula(formula):
+    # Each level is [finished parts, current part, current part's leading multiplier, its opening bracket]
+    levels = [[{}, {}, 1.0, ""]]
+    pending = None # Element Z (int) or closed group ({Z: count}) waiting to see whether a count follows it
+    part_start = True # True where a number would be a leading multiplier (start of formula, after a dot or bracket)
+    for element, number, opening, closing, dot, space, other in _token_pattern.findall(formula.translate(_subscript_digits)):
+        if space:
+            raise FormulaError("Unexpected whitespace in '{}'.".format(formula))
+        if number:
+            if pending is not None: # A count for the preceding element or group
+                _add(levels[-1][1], pending, float(number))
+                pending = None
+            elif part_start: # A leading multiplier such as the 11 in ·11H2O
+                levels[-1][2] = float(number)
+            else:
+                raise FormulaError("Unexpected number '{}' in '{}'.".format(number, formula))
+            part_start = False
+            continue
+        if pending is not None:
+            _add(levels[-1][1], pending, 1.0)
+            pending = None
+        if element:
+            pending = symbol_to_Z.get(element)
+            if pending is None:
+                raise FormulaError("Unknown element '{}' in '{}'.".format(element, formula))
+            part_start = False
+        elif opening:
+            levels.append([{}, {}, 1.0, opening])
+            part_start = True
+        elif closing:
+            finished, part, multiplier, bracket = levels.pop() if len(levels) > 1 else (None, None, None, "")
+            if _matching_bracket.get(bracket) != closing:
+                raise FormulaError("Unmatched '{}' in '{}'.".format(closing, formula))
+            _finish_part(finished, part, multiplier, formula)
+            pending = finished # The group's count (if any) comes next
+            part_start = False
+        elif dot:
+            level = levels[-1]
+            _finish_part(level[0], level[1], level[2], formula)
+            level[1], level[2] = {}, 1.0
+            part_start = True
+        else:
+            raise FormulaError("Unexpected character '{}' in '{}'.".format(other, formula))
+    if pending is not None:
+        _add(levels[-1][1], pending, 1.0)
+    if len(levels) > 1:
+        raise FormulaError("Unclosed '{}' in '{}'.".format(levels[-1][3], formula))
+    finished, part, multiplier, _ = levels[0]
+    _finish_part(finished, part, multiplier, formula)
+    return finished
+
+# Function to add an element or a whole group to a part, multiplied by count
+def _add(part, item, count):
+    if item.__class__ is int:
+        part[item] = part.get(item, 0.0) + count
+    else:
+        for Z, group_count in item.items():
+            part[Z] = part.get(Z, 0.0) + group_count * count
+
+# Function to fold a finished part (between dots or brackets) into its level with the part's leading multiplier
+def _finish_part(finished, part, multiplier, formula):
+    if not part:
+        raise FormulaError("Empty group or hydrate part in '{}'.".format(formula))
+    for Z, count in part.items():
+        finished[Z] = finished.get(Z, 0.0) + count * multiplier
+
+# Function to parse a formula into {"symbol": count}, the same form chemparse.parse_formula returns
+def parse_formula(formula):
+    return {element_symbols[Z]: count for Z, count in parse_formula_counts(formula).items()}
+
+# Function to parse a formula into a Z-indexed count vector of length 119
+def formula_vector(formula):
+    counts = parse_formula_counts(formula)
+    vector = np.zeros(vector_length)
+    vector[list(counts.keys())] = list(counts.values())
+    return vector
+
+# Function to parse many formulas into an (n, 119) count matrix and a mask of which formulas parsed
+# Rows for formulas which could not be parsed are left as zeros. Short lists go through parse_formula_counts, which
+# remembers each formula; longer lists are read all at once by _scan_formulas, and only the rows it cannot read (dots,
+# leading multipliers, subscripts or mistakes) are passed to parse_formula_counts.
+def formula_vectors(formulas):
+    formulas = list(formulas)
+    matrix = np.zeros((len(formulas), vector_length))
+    valid = np.zeros(len(formulas), dtype=bool)
+    rows = range(len(formulas))
+    if len(formulas) >= scan_minimum_formulas:
+        # Anything which is not a one-line ASCII string is left to parse_formula_counts
+        readable = [formula if formula.__class__ is str and formula.isascii() and "\n" not in formula else ""
+                    for formula in formulas]
+        matrix, unread = _scan_formulas(readable)
+        valid = ~unread
+        rows = np.flatnonzero(unread).tolist()
+    for row in rows:
+        matrix[row] = 0.0
+        try:
+            counts = parse_formula_counts(formulas[row])
+        except FormulaError:
+            continue
+        matrix[row, list(counts.keys())] = list(counts.values())
+        valid[row] = True
+    return matrix, valid
+
+# Function to read a list of ASCII formulas (no newlines) into an (n, 119) count matrix in one pass over all of their
+# characters, with no per-formula Python work. Covers elements, counts and nested brackets, the same formulas as the
+# two faster paths of _parse_counts, and gives the same counts (up to the order in which repeated elements are added).
+# Returns (matrix, unread): unread marks rows which use anything else, or are not valid formulas; those rows are zeros.
+def _scan_formulas(formulas):
+    text = np.frombuffer(("\n".join(formulas) + "\n").encode("ascii"), dtype=np.uint8)
+    kind = _character_kind[text]
+    previous_kind = np.concatenate(([_newline], kind[:-1]))
+    row = np.cumsum(previous_kind == _newline, dtype=np.int32) - 1 # Each newline belongs to the formula before it
+    unread_positions = [np.flatnonzero(_unread_pair[previous_kind * 8 + kind])]
+    # Element symbols, looked up in a table indexed by the symbol's two bytes
+    element_positions = np.flatnonzero(kind == _upper)
+    two_letters = kind[element_positions + 1] == _lower
+    element_Z = _Z_by_symbol_code[text[element_positions].astype(np.int32) * 256
+                                  + np.where(two_letters, text[element_positions + 1], 0)]
+    unread_positions.append(element_positions[element_Z == 0])
+    # Counts: each run of digits (with at most one decimal point) is read as an integer, then divided by 10^decimals,
+    # which rounds exactly as float() does
+    digit = kind == _digit
+    point_positions = np.flatnonzero(kind == _point)
+    point_positions = point_positions[digit[point_positions - 1] & digit[point_positions + 1]] # Decimal points only
+    run_start = digit & (previous_kind != _digit)
+    run_start[point_positions + 1] = False # Digits after a decimal point carry on the same number
+    run = np.cumsum(run_start, dtype=np.int32) - 1
+    run_starts = np.flatnonzero(run_start)
+    digit_positions = np.flatnonzero(digit)
+    digit_run = run[digit_positions]
+    first_digits = np.flatnonzero(run_start[digit_positions])
+    run_digits = np.diff(np.append(first_digits, len(digit_positions)))
+    last_digits = first_digits + run_digits - 1
+    place = np.minimum(last_digits[digit_run] - np.arange(len(digit_positions)), 22) # Power of ten of each digit
+    mantissas = np.bincount(digit_run, weights=(text[digit_positions] - 48) * _powers_of_ten[place],
+                            minlength=len(run_starts))
+    point_runs = run[point_positions]
+    run_points = np.bincount(point_runs, minlength=len(run_starts))
+    decimals = np.zeros(len(run_starts), dtype=np.int64)
+    decimals[point_runs] = run_starts[point_runs] + run_digits[point_runs] - point_positions
+    values = mantissas / _powers_of_ten[np.minimum(decimals, 22)]
+    unread_positions.append(run_starts[(run_points > 1) | (run_digits > 15)]) # 15 digits are held exactly
+    # Function to return the count which starts at each position (1 if none does)
+    def count_at(positions):
+        return np.where(run_start[positions], values[run[positions]], 1.0)
+    # Depth after every character within its own formula; every formula must close each bracket it opens
+    depth = np.cumsum(_depth_step[kind], dtype=np.int32)
+    newline_positions = np.flatnonzero(kind == _newline)
+    row_start_depth = np.concatenate(([0], depth[newline_positions[:-1]]))
+    bracket_positions = np.flatnonzero(kind >= _opening)
+    bracket_rows = row[bracket_positions]
+    bracket_depth = depth[bracket_positions] - row_start_depth[bracket_rows]
+    unread_positions.append(bracket_positions[bracket_depth < 0])
+    unread_rows = depth[newline_positions] != row_start_depth
+    unread_rows[row[np.concatenate(unread_positions)]] = True
+    # Pair each bracket with its partner: within a balanced formula the k-th opening bracket at a depth closes at the
+    # k-th closing bracket at that depth
+    paired = ~unread_rows[bracket_rows]
+    opens = kind[bracket_positions] == _opening
+    open_positions, open_depth = bracket_positions[paired & opens], bracket_depth[paired & opens]
+    close_positions, close_depth = bracket_positions[paired & ~opens], bracket_depth[paired & ~opens] + 1
+    open_order, close_order = np.lexsort((open_positions, open_depth)), np.lexsort((close_positions, close_depth))
+    open_positions, open_depth = open_positions[open_order], open_depth[open_order]
+    close_positions = close_positions[close_order]
+    mismatched = _closing_byte[text[open_positions]] != text[close_positions]
+    unread_rows[row[open_positions[mismatched]]] = True
+    # Each element's multiplier is the product of its enclosing groups' counts, outermost first
+    element_rows = row[element_positions]
+    read = ~unread_rows[element_rows]
+    element_positions, element_rows, element_Z = element_positions[read], element_rows[read], element_Z[read]
+    element_depth = depth[element_positions] - row_start_depth[element_rows]
+    multipliers = np.ones(len(element_positions))
+    for level in range(1, int(element_depth.max(initial=0)) + 1):
+        at_level = open_depth == level # Sorted by position, as are their partners
+        level_openings, level_counts = open_positions[at_level], count_at(close_positions[at_level] + 1)
+        inside = np.flatnonzero(element_depth >= level) # The latest opening bracket at this depth encloses these
+        multipliers[inside] *= level_counts[np.searchsorted(level_openings, element_positions[inside]) - 1]
+    counts = count_at(element_positions + two_letters[read] + 1) * multipliers
+    matrix = np.bincount(element_rows.astype(np.int64) * vector_length + element_Z, weights=counts,
+                         minlength=len(formulas) * vector_length).reshape(len(formulas), vector_length)
+    return matrix, unread_rows
+
+# ---------- Benchmark ----------
+
+# Function to make count distinct formulas from the benchmark phases by appending an element with a changing count, so
+# that nothing is remembered between them (each is parsed the same way by chemparse)
+def distinct_benchmark_formulas(count):
+    return ["{}{}{}".format(benchmark_phases[index % len(benchmark_phases)], ("H", "Na", "Cl")[index % 3],
+                            index // len(benchmark_phases) + 2) for index in range(count)]
+
+# Function to time this parser against chemparse and confirm both give the same counts
+# "First parse" clears the remembered formulas before every pass; "repeated" is the usual case in a sweep or manifest;
+# "distinct" reads a list of formulas which are all different (none remembered) with formula_vectors
+# Returns (formulas parsed per second by chemparse, by this parser on first parse, repeated, distinct with chemparse's
+# rate on the same list, whether every result matched)
+def benchmark_formula_parsers(formulas=None, repeats=200, distinct_count=20000):
+    import chemparse # Only needed for the comparison
+    formulas = formulas if formulas is not None else benchmark_phases
+    matched = all(chemparse.parse_formula(formula) == parse_formula(formula) for formula in formulas)
+    rates = []
+    for parser, forget in ((chemparse.parse_formula, False), (parse_formula, True), (parse_formula, False)):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            if forget:
+                _remembered_counts.cache_clear()
+            for formula in formulas:
+                parser(formula)
+        rates.append(repeats * len(formulas) / (time.perf_counter() - start))
+    distinct = distinct_benchmark_formulas(distinct_count)
+    start = time.perf_counter()
+    chemparse_counts = [chemparse.parse_formula(formula) for formula in distinct]
+    distinct_rates = [len(distinct) / (time.perf_counter() - start)]
+    _remembered_counts.cache_clear()
+    start = time.perf_counter()
+    matrix, valid = formula_vectors(distinct)
+    distinct_rates.append(len(distinct) / (time.perf_counter() - start))
+    for row, counts in enumerate(chemparse_counts):
+        expected = np.zeros(vector_length)
+        for symbol, count in counts.items():
+            expected[symbol_to_Z[symbol]] += count
+        matched = matched and bool(valid[row]) and np.allclose(matrix[row], expected, rtol=1e-12, atol=0)
+    return rates[0], rates[1], rates[2], tuple(distinct_rates), matched
+
+
+# ---------- Begin User-Facing Code ----------
+
+if __name__ == "__main__":
+    chemparse_rate, first_rate, repeated_rate, (distinct_chemparse_rate, distinct_rate), matched = benchmark_formula_parsers()
+    print("chemparse: {:,.0f} formulas/s".format(chemparse_rate))
+    print("Formula_Parser, first parse: {:,.0f} formulas/s ({:.1f}x)".format(first_rate, first_rate / chemparse_rate))
+    print("Formula_Parser, repeated: {:,.0f} formulas/s ({:.1f}x)".format(repeated_rate, repeated_rate / chemparse_rate))
+    print("formula_vectors, distinct formulas: {:,.0f} formulas/s ({:.1f}x chemparse's {:,.0f})".format(
+        distinct_rate, distinct_rate / distinct_chemparse_rate, distinct_chemparse_rate))
+    print("Identical counts: {}".format(matched))
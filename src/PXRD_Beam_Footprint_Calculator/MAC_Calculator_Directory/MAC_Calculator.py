@@ -5,18 +5,41 @@
 
 # Import simplifier logic functions from parent Beam_Profile_Calculator.py
 from src.PXRD_Beam_Footprint_Calculator.Beam_Profile_Calculator import y_or_n_confirmation, get_user_float, user_pick_from
-# Library to create stoichiometric dictionaries from chemical formula:
-import chemparse
+# Built-in parser to create stoichiometric dictionaries from chemical formula:
+from src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.Formula_Parser import parse_formula, FormulaError
+# Local phase density database, offered before the weighted average density when the user has no density
+from src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.Phase_Density_Database import load_phase_density_database
 # Library to read and write JSON files:
 import json
 # Libraries to enable passing variables between Python scripts
 import sys
+import os
+# Library to guard the one-time load of the anode table when called from several threads
+import threading
+# Library to allow for array lookups in the precomputed anode table
+import numpy as np
 
 # ---------- Short Reference Dictionaries and Lists ----------
 
 # Convert Cu, Co, Mo, and Cr shorthand to usable keV number:
 CCMC_Tubes = {"Cu": 8.04, "Co": 6.93, "Mo": 17.479, "Cr": 5.414}
 
+# Characteristic lines of each common anode in keV, used to build the precomputed Anode_MAC_Table.json
+Anode_Lines = {"Cu": {"Ka1": 8.04778, "Ka2": 8.02783, "Kb": 8.90529},
+               "Co": {"Ka1": 6.93032, "Ka2": 6.91530, "Kb": 7.64943},
+               "Mo": {"Ka1": 17.47934, "Ka2": 17.37429, "Kb": 19.60830},
+               "Cr": {"Ka1": 5.41472, "Ka2": 5.40551, "Kb": 5.94671}}
+
+# Absolute path to the MAC_JSONs directory for use when this script is imported from elsewhere
+MAC_JSON_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "MAC_JSONs")
+
+# Where end_of_script_protocol writes the ACs for Beam_Profile_Calculator.py (next to this script, whatever the cwd)
+MAC_Calculator_Output_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "MAC_Calculator_Output.json")
+
+# Precomputed anode table, loaded once on first use by load_anode_MAC_table() and read-only afterwards
+_anode_MAC_table = None
+_anode_MAC_table_lock = threading.Lock()
+
 # ---------- Class Definitions ----------
 
 class SampleChemistry:
@@ -32,7 +55,7 @@ class SampleChemistry:
 
     def molecular_weight(self, atomic_info): # Returns molecular weight float given an atomic info dictionary
         # Note: atomic_info dictionary must be generated outside class definition because /
-        #   chemparse will not fail above Z = 92 but atomic_info will fail
+        #   the formula parser will not fail above Z = 92 but atomic_info will fail
         molecular_weight_sum = 0  # Establish the desired variable with zero value
         for element in self.stoich.keys():  # Recall the keys of both passed dictionaries match
             # atomic_info[element] yields the list of str values for that element of the form /
@@ -85,109 +108,183 @@ class SampleChemistry:
 
 # ---------- Simplifying functions ----------
 
-# Exception-handling version of chemparse's formula parsing function:
-def chem_form_parser(formula):
+# Function to load one of the MAC_JSONs files by name regardless of the current working directory
+def load_MAC_JSON(filename):
+    with open(os.path.join(MAC_JSON_directory, filename), "r") as jsonfile:
+        return json.load(jsonfile)
+
+# Exception-handling version of Formula_Parser's formula parsing function:
+# quiet=True skips the messages (e.g. in batch checks, which record their own errors)
+def chem_form_parser(formula, quiet=False):
     try:
-        # chemparse.parse_formula returns a dictionary with element counts
-        element_counts = chemparse.parse_formula(formula)
-        # However, chemparse can't handle non-standard formulas (e.g. 3CaO·Al2O3·CaCO3·11H2O)
-        if len(element_counts) == 0: # If there are no atoms in the dictionary
-            print("Could not recognize formula '{}'".format(formula))
-            print("""Please ensure your formula is free of the following: \n>> * \n>> ·\n>> sub/superscript formating"
->> unorthodox chemical notation (e.g. use \"Ca4Al2C3O20H22\" for 3CaO·Al₂O₃·CaCO₃·11H₂O)\n""")
-            return {} # Dictionary stays empty if error is encountered
-        return element_counts
-    except Exception as e: # Default error handling in case an faulty input is not caught by chemparse
-        print(f"Error parsing formula: {e}")
+        # parse_formula returns a dictionary with element counts, including brackets and hydrates (e.g. 3CaO·Al2O3·CaCO3·11H2O)
+        return parse_formula(formula)
+    except FormulaError as e: # Unknown elements, unmatched brackets, stray characters, etc.
+        if quiet:
+            return {}
+        print("Could not recognize formula '{}': {}".format(formula, e))
+        print("""Please write hydrate dots between parts (e.g. CuSO4·5H2O or CuSO4*5H2O rather than CuSO4.5H2O)
+check element symbols are capitalized (e.g. Co rather than CO or co) and leave out any spaces\n""")
+        return {} # Dictionary stays empty if error is encountered
+    except Exception as e: # Default error handling in case an faulty input is not caught by the parser
+        if not quiet:
+            print(f"Error parsing formula: {e}")
         return {}
 
 
 # Generates dictionary of relevant atomic information based on a stoich dictionary from chem_form_parser
-def get_atomic_info(stoich_dict):
+# An already loaded Element_Information_Dict.json may be passed to avoid re-reading the file (e.g. in a long-running service)
+# quiet=True skips the messages about elements above Z = 92
+def get_atomic_info(stoich_dict, element_data_dict=None, quiet=False):
     atomic_info_dictionary = {}  # Establish desired dictionary as empty
     validated_MAC = True # Create a boolean flag if an unrecognized element is discovered
-    with open("MAC_JSONs/Element_Information_Dict.json", 'r') as jsonfile:  # Read in .json with necessary information
-        element_data_dict = json.load(jsonfile)
-        for element in stoich_dict.keys():  # Pull each unique element from input stoich_dict (e.g "Ca")
-            # element_data_dict[element] yields the list of values for that element of the form /
-            # ['Z', 'Element', 'Z/A', 'I (eV)', 'Density (g/cm3)', 'Molecular Weight (g/mol)']
-            try: # For elements with Z <= 92
-                atomic_info_dictionary[element] = element_data_dict[element]  # Note this is a list of strings still!
-            except KeyError: # Bypass elements which are above Uranium that would throw an error
+    if element_data_dict is None:
+        element_data_dict = load_MAC_JSON("Element_Information_Dict.json") # Read in .json with necessary information
+    for element in stoich_dict.keys():  # Pull each unique element from input stoich_dict (e.g "Ca")
+        # element_data_dict[element] yields the list of values for that element of the form /
+        # ['Z', 'Element', 'Z/A', 'I (eV)', 'Density (g/cm3)', 'Molecular Weight (g/mol)']
+        try: # For elements with Z <= 92
+            atomic_info_dictionary[element] = element_data_dict[element]  # Note this is a list of strings still!
+        except KeyError: # Bypass elements which are above Uranium that would throw an error
+            if not quiet:
                 print("Could not find element '{}'.".format(element)) # Notify user
-                validated_MAC = False # Raise flag that unrecognized element was encountered
-                continue # Continue to parse the remainder of the elements
-    if not validated_MAC: # Tell user that MAC calculation is not available
+            validated_MAC = False # Raise flag that unrecognized element was encountered
+            continue # Continue to parse the remainder of the elements
+    if not validated_MAC and not quiet: # Tell user that MAC calculation is not available
         print("""Because of flagged elements above with Z > 92, MAC calculation for your sample is unavailable. However,
 this calculator can still flag potential beam and sample interferences for 10 < Z <= 92.""")
     # Return an abridged atomic info dictionary containing information for known elements contained within the sample
     return atomic_info_dictionary, validated_MAC
 
+# Interpolate a single element's MAC at an incident energy from its {"keV": MAC} sub-dictionary of Atomic_MACs.json
+def interpolate_elemental_MAC(energy_dependent_MAC_dict, incident_energy_num):
+    keV_MAC_bounds = [] # Empty list to store floats for MAC calculation
+    # After for loop, contains [lower keV bound, upper MAC value, upper keV bound, lower MAC value]
+    # Keep in mind that lower energy has higher MAC!
+    for keV in energy_dependent_MAC_dict.keys(): # Iterate through every keV in the elements keV/MAC list
+        keV_num = float(keV) # Type conversion to allow proper </> comparisons
+        if keV_num <= incident_energy_num: # Update the keV and MAC values if a closer value is found
+            keV_MAC_bounds.clear()
+            keV_MAC_bounds.append(keV_num)
+            keV_MAC_bounds.append(energy_dependent_MAC_dict[keV])
+        elif keV_num > incident_energy_num: # Assign the current keV and MAC values as the first value above the input
+            keV_MAC_bounds.append(keV_num)
+            keV_MAC_bounds.append(energy_dependent_MAC_dict[keV])
+            break # break the loop as soon as this value is found
+    # Assume linearity between the two energies and calculate a fudge factor
+    # Calculated as a percentage closeness to lower keV (e.g. 0.98 for Cu/8.04 keV compared to 8 and 10 keV)
+    linearity_bias = (keV_MAC_bounds[2] - incident_energy_num) / (keV_MAC_bounds[2] - keV_MAC_bounds[0])
+    # Applied linearity fudge factor to pull MACs to yield single representative elemental MAC
+    return keV_MAC_bounds[1] - ((1 - linearity_bias) * (keV_MAC_bounds[1] - keV_MAC_bounds[3]))
+
+# Load Anode_MAC_Table.json (built by Anode_MAC_Table_Builder.py) as a list of column names and a Z-indexed array
+def load_anode_MAC_table():
+    global _anode_MAC_table
+    if _anode_MAC_table is None:
+        with _anode_MAC_table_lock: # Only the first caller loads the table; the others wait and then share it
+            if _anode_MAC_table is None:
+                try:
+                    table_dict = load_MAC_JSON("Anode_MAC_Table.json")
+                    # Row 0 is left as zeros so the array can be indexed directly by Z
+                    MAC_array = np.zeros((len(table_dict["MACs"]) + 1, len(table_dict["columns"])))
+                    MAC_array[1:] = np.array(table_dict["MACs"], dtype=float)
+                    energies = np.array(table_dict["energies keV"], dtype=float)
+                    columns = tuple(table_dict["columns"])
+                except (OSError, KeyError, ValueError): # No table shipped: every energy uses the interpolation path
+                    columns, energies, MAC_array = (), np.zeros(0), np.zeros((93, 0))
+                MAC_array.setflags(write=False) # Shared by every caller, so never modified in place
+                energies.setflags(write=False)
+                _anode_MAC_table = (columns, energies, MAC_array)
+    return _anode_MAC_table
+
+# Return the Anode_MAC_Table.json column index for an incident energy, or None for a custom energy
+def anode_MAC_column(incident_energy):
+    columns, energies, MAC_array = load_anode_MAC_table()
+    matches = np.flatnonzero(np.abs(energies - float(incident_energy)) < 1e-9)
+    return int(matches[0]) if matches.size else None
+
+# Sample MAC at a standard tube energy as one gather and one dot product over arrays of Z and mass fractions
+def anode_sample_MAC(proton_numbers, mass_fractions, column):
+    MAC_array = load_anode_MAC_table()[2]
+    return float(np.dot(np.asarray(mass_fractions, dtype=float), MAC_array[np.asarray(proton_numbers, dtype=int), column]))
+
 # Generates dictionary of elemental MAC values for all elements in a given sample with given energy
-def get_sample_MAC_library(atomic_info, incident_energy):
+# Standard anode energies are read from the precomputed Anode_MAC_Table.json; other energies are interpolated
+# An already loaded Atomic_MACs.json may be passed to avoid re-reading the file (e.g. in a long-running service)
+def get_sample_MAC_library(atomic_info, incident_energy, full_LAC_dict=None):
     sample_MAC_library = {} # Establish empty dictionary to be populated and returned by the function
     incident_energy_num = float(incident_energy) # Make sure function input is a float for math/comparisons later
-    with open("MAC_JSONs/Atomic_MACs.json", "r") as jsonfile: # Read in .json with necessary information
-        full_LAC_dict = json.load(jsonfile) # Contents of "Atomic_MACs.json" is now callable with Full_LAC_dict variable
-        proton_numbers = [] # Establish an empty list to hold Z values of sample elements, used to iterate through .json
-        returnable_key_list =[] # Establish an empty list to hold chemical symbol "keys" for final dict
-        for element in atomic_info.keys(): # Iterate through "Symbol" (e.g. "Ca") in atomic_info
-            returnable_key_list.append(element) # Populate final "keys" list
-            proton_numbers.append(atomic_info[element][0]) # Populate list with Z of each element
+    proton_numbers = [] # Establish an empty list to hold Z values of sample elements, used to iterate through .json
+    returnable_key_list =[] # Establish an empty list to hold chemical symbol "keys" for final dict
+    for element in atomic_info.keys(): # Iterate through "Symbol" (e.g. "Ca") in atomic_info
+        returnable_key_list.append(element) # Populate final "keys" list
+        proton_numbers.append(atomic_info[element][0]) # Populate list with Z of each element
+    anode_column = anode_MAC_column(incident_energy_num)
+    if anode_column is not None: # Standard tube: gather the precomputed values
+        MAC_array = load_anode_MAC_table()[2]
+        calculated_elemental_MACs = MAC_array[[int(proton) for proton in proton_numbers], anode_column].tolist()
+    else: # Custom energy: interpolate from the full NIST table
+        if full_LAC_dict is None: # Contents of "Atomic_MACs.json" is now callable with Full_LAC_dict variable
+            full_LAC_dict = load_MAC_JSON("Atomic_MACs.json")
         calculated_elemental_MACs = [] # Establish an empty list to hold each Z's calculated MAC
         for proton in proton_numbers:
             energy_dependent_MAC_dict = full_LAC_dict.get(str(proton))  # Navigate to the sub-dictionary of all MACs for the element
-            keV_MAC_bounds = [] # Empty list to store floats for MAC calculation
-            # After for loop, contains [lower keV bound, upper MAC value, upper keV bound, lower MAC value]
-            # Keep in mind that lower energy has higher MAC!
-            for keV in energy_dependent_MAC_dict.keys(): # Iterate through every keV in the elements keV/MAC list
-                keV_num = float(keV) # Type conversion to allow proper </> comparisons
-                if keV_num <= incident_energy_num: # Update the keV and MAC values if a closer value is found
-                    keV_MAC_bounds.clear()
-                    keV_MAC_bounds.append(keV_num)
-                    keV_MAC_bounds.append(energy_dependent_MAC_dict[keV])
-                elif keV_num > incident_energy_num: # Assign the current keV and MAC values as the first value above the input
-                    keV_MAC_bounds.append(keV_num)
-                    keV_MAC_bounds.append(energy_dependent_MAC_dict[keV])
-                    break # break the loop as soon as this value is found
-            # Assume linearity between the two energies and calculate a fudge factor
-            # Calculated as a percentage closeness to lower keV (e.g. 0.98 for Cu/8.04 keV compared to 8 and 10 keV)
-            linearity_bias = (keV_MAC_bounds[2] - incident_energy_num) / (keV_MAC_bounds[2] - keV_MAC_bounds[0])
-            # Applied linearity fudge factor to pull MACs to yield single representative elemental MAC
-            biased_MAC = keV_MAC_bounds[1] - ((1 - linearity_bias) * (keV_MAC_bounds[1] - keV_MAC_bounds[3]))
-            calculated_elemental_MACs.append(biased_MAC)
-        for i in range(0, len(returnable_key_list)):
-            sample_MAC_library[returnable_key_list[i]] = calculated_elemental_MACs[i]
+            calculated_elemental_MACs.append(interpolate_elemental_MAC(energy_dependent_MAC_dict, incident_energy_num))
+    for i in range(0, len(returnable_key_list)):
+        sample_MAC_library[returnable_key_list[i]] = calculated_elemental_MACs[i]
     return sample_MAC_library
 
+# Non-interactive version of the MAC steps in main(): returns (valid MAC boolean, MAC in cm^2/g or None) for a formula
+def calculate_formula_MAC(formula, incident_energy, element_data_dict=None, full_LAC_dict=None, quiet=False):
+    stoich = chem_form_parser(formula, quiet)
+    if not stoich: # Formula could not be parsed
+        return False, None
+    atomic_info, valid_MAC = get_atomic_info(stoich, element_data_dict, quiet)
+    if not valid_MAC: # Contains elements with Z > 92
+        return False, None
+    sample = SampleChemistry(stoich, valid_MAC)
+    sample.molecular_weight(atomic_info)
+    sample.get_relative_abundance(atomic_info, sample.molecular_weight_value)
+    sample.calculate_sample_MAC(sample.relative_abundance, get_sample_MAC_library(atomic_info, incident_energy, full_LAC_dict))
+    return True, sample.mass_atten_coefficient
+
 # Generate a dictionary of all x-ray edges for the atoms in the user's sample
-def get_edge_info(stoich_dict):
+# An already loaded X-ray_Absorption_Edges.json may be passed to avoid re-reading the file
+def get_edge_info(stoich_dict, master_x_ray_energy_dict=None):
     sample_x_ray_energy_dictionary ={} # Established desired dictionary as empty
-    with open("MAC_JSONs/X-ray_Absorption_Edges.json", "r") as jsonfile: # Read in .json with necessary information
-        master_x_ray_energy_dict = json.load(jsonfile) # Make JSON file accessible as dictionary
-        for element in stoich_dict.keys(): # Iterate through the elements in the user's sample
-            try: # Append edge information for elements 11 <= Z <= 92
-                sample_x_ray_energy_dictionary[element] = master_x_ray_energy_dict[element]
-            except KeyError: # Ignore elements 1 <= Z < 11 (no pertinent edges) or Z > 92
-                continue
+    if master_x_ray_energy_dict is None: # Make JSON file accessible as dictionary
+        master_x_ray_energy_dict = load_MAC_JSON("X-ray_Absorption_Edges.json")
+    for element in stoich_dict.keys(): # Iterate through the elements in the user's sample
+        try: # Append edge information for elements 11 <= Z <= 92
+            sample_x_ray_energy_dictionary[element] = master_x_ray_energy_dict[element]
+        except KeyError: # Ignore elements 1 <= Z < 11 (no pertinent edges) or Z > 92
+            continue
     # return an abridged x-ray edge info dictionary containing data only for relevant elements
     # Avoids reading in the same large .json file multiple times
     return sample_x_ray_energy_dictionary
 
-# Flag if the incident energy is close to any known sample edges
-def beam_and_sample_interference(atoms_and_x_ray_energies, incident_energy, warning_counter=0):
+# Return a list of [element, edge, keV] for every edge lying within 1 keV of the incident energy
+def find_beam_and_sample_interferences(atoms_and_x_ray_energies, incident_energy):
     incident_energy_num = float(incident_energy)
-    print("Referencing the atoms in your sample against the incident energy...")
+    interferences = [] # Establish an empty list to hold each flagged edge
     for element in atoms_and_x_ray_energies: # Iterate through elements in the sample
         for edge in atoms_and_x_ray_energies[element]: # Iterate through edges for the element
-            # Raise warning if the edge is within 1 keV of the incident energy
             if abs(incident_energy_num - float(edge[1])) <= 1:
-                print("Potential interference: {edge} edge of {element} atom lies at {energy}.".format(edge=edge[0], element=element, energy=edge[1]))
-                warning_counter += 1 # Adds one to the interference counter
+                interferences.append([element, edge[0], edge[1]])
+    return interferences
+
+# Flag if the incident energy is close to any known sample edges
+def beam_and_sample_interference(atoms_and_x_ray_energies, incident_energy, warning_counter=0):
+    print("Referencing the atoms in your sample against the incident energy...")
+    # Raise warning if the edge is within 1 keV of the incident energy
+    for element, edge, energy in find_beam_and_sample_interferences(atoms_and_x_ray_energies, incident_energy):
+        print("Potential interference: {edge} edge of {element} atom lies at {energy}.".format(edge=edge, element=element, energy=energy))
+        warning_counter += 1 # Adds one to the interference counter
     print("{} warning(s) raised.".format(warning_counter))
 
 # Prompt user to either exit the program or pass values back to Beam_Profile_Calculator
-def end_of_script_protocol(value1, value2, value3):
+# The ACs are written to output_path (by default MAC_Calculator_Output.json next to this script)
+def end_of_script_protocol(value1, value2, value3, output_path=MAC_Calculator_Output_path):
     user_confirmation_loop = False
     while not user_confirmation_loop:
         end_decision = user_pick_from("You have reached the end of the MAC Calculator. Please select an option from below.", ["Quit program without saving ACs", "Save ACs and close calculator"])
@@ -203,7 +300,7 @@ def end_of_script_protocol(value1, value2, value3):
             user_confirmation_loop = True
             print("Writing JSON files with ACs...")
             try:
-                with open("MAC_Calculator_Output.json", "w") as jsonfile: # Writes a JSON file with values passed to constant name
+                with open(output_path, "w") as jsonfile: # Writes a JSON file with values passed to constant name
                     json.dump({"check thickness": value1, "MAC cm^2/g": value2, "LAC cm^-1": value3}, jsonfile)
                 print("JSON file written.")
             except Exception as e:
@@ -220,7 +317,7 @@ def main():
     # Get chemical formula from user. Code below will repeat until a satisfactory element dictionary is generated.
     element_dict = {}
     while not element_dict: # While the dictionary is empty
-        chemical_formula = input("Please enter your sample's known or approximate chemical formula: ")
+        chemical_formula = input("Please enter your sample's known or approximate chemical formula: ").strip()
         element_dict = chem_form_parser(chemical_formula) # Try users input in chem_form_parser function
         if element_dict != {}:
             user_confirmed = False # Establish user confirmation boolean
@@ -309,6 +406,18 @@ we must multiply the MAC by your sample's density to obtain the linear attenuati
                 sample_density = get_user_float("Please enter your sample density in g/cm^3:", 0.0001)
                 density_confirmation = True
             elif density_choice == "I do not have my sample density":
+                # Offer any densities stored for this formula in the local phase density database first
+                density_database = load_phase_density_database()
+                known_densities = density_database.lookup(element_dict) if density_database is not None else []
+                if known_densities:
+                    database_options = ["{} ({:.3f} g/cm^3)".format(label, density) for label, density in known_densities]
+                    database_choice = user_pick_from("The following densities are stored for this formula:",
+                                                     database_options + ["None of these"])
+                    if database_choice != "None of these":
+                        sample_density = known_densities[database_options.index(database_choice)][1]
+                        print("Your sample's density is set at {:.3f} g/cm^3.".format(sample_density))
+                        density_confirmation = True
+                        continue
                 print("""If you cannot obtain your sample's density, you may ask the software to use a relative weighted average
 of atomic densities for the time being; however, owing to densities reliance on volume and the non-additive qualities of 
 volume as a property, this will be a highly erroneous calculation.""")
@@ -0,0 +1,225 @@
+# Developed by Mitch S-A
+# Updated on October 19, 2026
+
+# Batch version of MAC_Calculator.py for sample manifests (CSV or Parquet) with one sample per row.
+# The manifest is read in fixed-size chunks and results are written as each chunk finishes, so memory use depends
+# on the chunk size and not on the size of the file. Expected columns (case-insensitive):
+#   formula (required), density (g/cm^3), well_depth (mm) and/or holder (a name from manufacturers_and_sample_holders.json),
+#   and optionally sample (an identifier copied to the output).
+# Results are written as CSV, or through Arrow_Result_Export.py as Parquet (one row group per chunk) or an Arrow IPC
+# file or stream when the output file ends in .parquet, .arrow or .arrows; text columns are plain strings and missing
+# values are nulls.
+# Run from the repository root with, e.g.:
+#   python -m src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.Manifest_Batch_Checker manifest.csv results.csv --anode Cu
+
+# ---------- Necessary imports ----------
+
+# Libraries to allow code to interface with the file system and the command line
+import os
+import argparse
+# Library to read and write CSV files
+import csv
+from collections import OrderedDict
+# Library to build the result columns for Parquet and Arrow output
+import numpy as np
+
+# Import calculation functions from the parent script and the re-entrant core
+from src.PXRD_Beam_Footprint_Calculator.Beam_Profile_Calculator import (load_preconfiguration, beer_lambert_atten,
+    beer_lambert_layer, attenuation_threshold)
+from src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.MAC_Calculator import CCMC_Tubes
+from src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.Formula_Parser import parse_formula
+from src.PXRD_Beam_Footprint_Calculator.Footprint_Core import load_footprint_context, formula_MAC
+from src.PXRD_Beam_Footprint_Calculator.Arrow_Result_Export import ResultStreamWriter, export_formats
+
+# ---------- Reference File Paths and Lists ----------
+
+MAC_Calc_directory = os.path.dirname(os.path.abspath(__file__))
+manu_samphold_path = os.path.join(os.path.dirname(MAC_Calc_directory), "Beam_Calc_JSONs", "manufacturers_and_sample_holders.json")
+
+# Columns written for every manifest row, in order
+result_columns = ["sample", "formula", "density", "holder", "well_depth", "valid_MAC", "MAC", "LAC",
+                  "transmitted_fraction", "thick_enough", "required_depth_mm", "error"]
+# Result columns written as text and as True/False (the rest are numbers)
+text_result_columns = {"sample", "formula", "holder", "error"}
+flag_result_columns = {"valid_MAC", "thick_enough"}
+
+# ---------- Manifest Reading ----------
+
+# Generator which yields lists of row dictionaries (with lower-case keys) from a CSV manifest
+def read_csv_chunks(filepath, chunk_size):
+    with open(filepath, "r", newline="") as csvfile:
+        reader = csv.DictReader(csvfile)
+        chunk = []
+        for row in reader:
+            chunk.append({key.strip().lower(): value for key, value in row.items() if key is not None})
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+# Generator which yields lists of row dictionaries from a Parquet manifest using pyarrow record batches
+def read_parquet_chunks(filepath, chunk_size):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading Parquet manifests requires pyarrow (pip install pyarrow).")
+    parquet_file = pq.ParquetFile(filepath)
+    for record_batch in parquet_file.iter_batches(batch_size=chunk_size):
+        columns = {name.strip().lower(): record_batch.column(i).to_pylist() for i, name in enumerate(record_batch.schema.names)}
+        yield [dict(zip(columns.keys(), values)) for values in zip(*columns.values())]
+
+# Function to pick the chunk reader from the file extension
+def read_manifest_chunks(filepath, chunk_size=10000):
+    if filepath.lower().endswith((".parquet", ".pq")):
+        return read_parquet_chunks(filepath, chunk_size)
+    return read_csv_chunks(filepath, chunk_size)
+
+# ---------- Per-Chunk Calculations ----------
+
+# Function to build {holder name: depth in mm} from manufacturers_and_sample_holders.json
+def holder_depth_lookup(filepath=manu_samphold_path):
+    depths = {}
+    holders_by_manufacturer = load_preconfiguration(filepath) or {}
+    for holders in holders_by_manufacturer.values():
+        for holder in holders:
+            # Depth is the second-to-last entry for both "Circle" and "Rectangle" holders
+            depths[holder[0]] = float(holder[-2])
+    return depths
+
+# Function to turn an empty cell, None or text into a float (or None)
+def _optional_float(value):
+    if value is None or str(value).strip() == "":
+        return None
+    return float(value)
+
+# Function to check every row in one chunk, reusing MACs of formulas that were already calculated
+# The threshold is the context's (see Footprint_Core.py). Nothing is printed per row: a formula which cannot be parsed
+# is recorded in the "error" column, and one with elements above Z = 92 as valid_MAC False
+def check_manifest_chunk(rows, incident_energy, context, MAC_cache, holder_depths, MAC_cache_size=100000):
+    threshold = context.threshold
+    results = []
+    for row in rows:
+        result = dict.fromkeys(result_columns)
+        result.update({"sample": row.get("sample"), "formula": row.get("formula"), "holder": row.get("holder")})
+        try:
+            formula = str(row.get("formula") or "").strip()
+            density = _optional_float(row.get("density"))
+            depth = _optional_float(row.get("well_depth"))
+            if depth is None and row.get("holder") in holder_depths: # Fall back to the saved holder's depth
+                depth = holder_depths[row.get("holder")]
+            result["density"], result["well_depth"] = density, depth
+            if formula in MAC_cache: # Manifests repeat formulas, so each unique one is calculated once
+                MAC_cache.move_to_end(formula)
+                valid_MAC, sample_MAC = MAC_cache[formula]
+            else:
+                valid_MAC, sample_MAC = formula_MAC(context, formula, incident_energy, quiet=True)
+                MAC_cache[formula] = (valid_MAC, sample_MAC)
+                if len(MAC_cache) > MAC_cache_size: # Keep the formula cache bounded as well
+                    MAC_cache.popitem(last=False)
+            result["valid_MAC"], result["MAC"] = valid_MAC, sample_MAC
+            if not valid_MAC:
+                parse_formula(formula) # Raises the parser's message if the formula itself is the problem
+            if valid_MAC and density is not None:
+                result["LAC"] = sample_MAC * density # cm^-1 = cm^2/g * g/cm^3
+                result["required_depth_mm"] = float(beer_lambert_layer(result["LAC"], threshold) * 10) # cm to mm
+                if depth is not None:
+                    result["transmitted_fraction"] = float(beer_lambert_atten(result["LAC"], depth))
+                    result["thick_enough"] = result["transmitted_fraction"] < threshold
+        except (ValueError, TypeError, KeyError, IndexError) as e: # Record the problem and move on to the next row
+            result["error"] = str(e)
+        results.append(result)
+    return results
+
+# ---------- Result Writing ----------
+
+class CSVResultWriter:
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.csvfile = open(filepath, "w", newline="")
+        self.writer = csv.DictWriter(self.csvfile, fieldnames=result_columns)
+        self.writer.writeheader()
+
+    def __repr__(self):
+        return "A CSV result writer for {}".format(self.filepath)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_rows(self, results):
+        self.writer.writerows(results)
+        self.csvfile.flush() # Results reach the disk after every chunk
+
+    def close(self):
+        self.csvfile.close()
+
+class ColumnarResultWriter(ResultStreamWriter):
+    # Function to write one chunk of results as one record batch (a Parquet row group or a batch of an Arrow file)
+    def write_rows(self, results):
+        self.write(result_arrays(results))
+
+# Function to turn one chunk of result dictionaries into {column: array} for Arrow_Result_Export.py
+# Numeric and True/False columns are masked arrays, so missing values are written as nulls; text columns
+# (sample, formula, holder, error) are written as plain strings
+def result_arrays(results):
+    columns = {}
+    for column in result_columns:
+        if column in text_result_columns: # Identifiers may be read as numbers, so everything is written as text
+            columns[column] = np.array([None if result[column] is None else str(result[column]) for result in results],
+                                       dtype=object)
+            continue
+        dtype = bool if column in flag_result_columns else float
+        missing = np.fromiter((result[column] is None for result in results), dtype=bool, count=len(results))
+        values = np.fromiter((result[column] or 0 for result in results), dtype=dtype, count=len(results))
+        columns[column] = np.ma.MaskedArray(values, mask=missing)
+    return columns
+
+# Function to pick the result writer from the file extension (.parquet/.pq, .arrow or .arrows, otherwise CSV)
+def open_result_writer(filepath):
+    if os.path.splitext(filepath)[1].lower() in export_formats:
+        return ColumnarResultWriter(filepath)
+    return CSVResultWriter(filepath)
+
+# ---------- Pipeline ----------
+
+# Function to stream a manifest through the MAC/LAC/thickness checks and write results chunk by chunk
+def run_manifest_check(input_path, output_path, incident_energy, chunk_size=10000, threshold=attenuation_threshold):
+    context = load_footprint_context(threshold) # The MAC tables, loaded once for the whole manifest
+    holder_depths = holder_depth_lookup()
+    MAC_cache = OrderedDict()
+    summary = {"rows": 0, "errors": 0, "invalid MAC": 0, "thick enough": 0, "too thin": 0}
+    with open_result_writer(output_path) as writer:
+        for rows in read_manifest_chunks(input_path, chunk_size):
+            results = check_manifest_chunk(rows, incident_energy, context, MAC_cache, holder_depths)
+            writer.write_rows(results)
+            for result in results: # Only counters are kept between chunks
+                summary["rows"] += 1
+                summary["errors"] += result["error"] is not None
+                summary["invalid MAC"] += result["valid_MAC"] is False
+                summary["thick enough"] += result["thick_enough"] is True
+                summary["too thin"] += result["thick_enough"] is False
+    return summary
+
+
+# ---------- Begin User-Facing Code ----------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the attenuation of every sample in a CSV or Parquet manifest.")
+    parser.add_argument("manifest", help="CSV or Parquet manifest with formula, density, holder and/or well_depth columns")
+    parser.add_argument("output", help="CSV, Parquet (.parquet) or Arrow (.arrow, .arrows) file to write the results to")
+    energy_group = parser.add_mutually_exclusive_group(required=True)
+    energy_group.add_argument("--anode", choices=list(CCMC_Tubes.keys()))
+    energy_group.add_argument("--energy", type=float, help="Incident energy in keV")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Rows held in memory at once")
+    parser.add_argument("--threshold", type=float, default=attenuation_threshold,
+                        help="Transmitted fraction below which a sample is thick enough")
+    arguments = parser.parse_args()
+    manifest_energy = CCMC_Tubes[arguments.anode] if arguments.anode else arguments.energy
+    manifest_summary = run_manifest_check(arguments.manifest, arguments.output, manifest_energy, arguments.chunk_size,
+                                          arguments.threshold)
+    print("Checked {rows} samples: {thick} thick enough, {thin} too thin, {invalid} without a valid MAC and {errors} with errors.".format(
+        rows=manifest_summary["rows"], thick=manifest_summary["thick enough"], thin=manifest_summary["too thin"],
+        invalid=manifest_summary["invalid MAC"], errors=manifest_summary["errors"]))
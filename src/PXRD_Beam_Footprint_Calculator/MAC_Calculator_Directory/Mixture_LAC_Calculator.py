@@ -0,0 +1,180 @@
+# Developed by Mitch S-A
+# Updated on October 19, 2026
+
+# Effective MAC and LAC for packed powder mixtures. SampleChemistry handles one formula at one bulk density, but a real
+# sample is usually several phases (plus perhaps a binder) packed loosely into the holder, so the LAC of the solid
+# overestimates how strongly the powder attenuates. Here:
+#   - each phase has a formula and a crystal density, and is parsed once into a row of the composition matrix C
+#     (mass fraction of every element, Z = 0 to 118); each element's MAC at the incident energy forms the vector mu
+#   - recipes are rows of a weight fraction matrix W (volume fractions are converted with the phase densities)
+#   - the mixture MAC of every recipe at once is W @ C @ mu ("simple additivity ... by weight", as in calculate_sample_MAC)
+#   - the solid density follows from 1/rho = sum(w_i/rho_i), and the effective density and LAC are scaled by the
+#     packing fraction (the share of the holder volume filled by solid); air in the pores is ignored
+# A binder is a phase like any other, added to every recipe at a fixed weight fraction.
+# Run from the repository root with, e.g. (screening every 5 wt% mixture of three phases):
+#   python -m src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.Mixture_LAC_Calculator --phase Fe2O3:5.24 --phase SiO2:2.65 --phase CaCO3:2.71 --anode Cu --packing 0.55 --depth 0.5 --step 0.05
+
+# ---------- Necessary imports ----------
+
+# Libraries for the command line, timing and recipe grids
+import argparse
+import itertools
+import time
+# Library to allow for array calculations
+import numpy as np
+
+# Import the array Beer-Lambert function and the parsers and MAC functions from the MAC calculator
+from src.PXRD_Beam_Footprint_Calculator.Beer_Lambert_Arrays import beer_lambert_arrays
+from src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.Formula_Parser import (formula_vectors, element_symbols,
+    vector_length)
+from src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.MAC_Calculator import (CCMC_Tubes, get_sample_MAC_library,
+    load_MAC_JSON)
+
+# ---------- Class Definitions ----------
+
+class PhaseLibrary:
+    def __init__(self, formulas, densities, incident_energy, element_data_dict=None, full_LAC_dict=None):
+        self.formulas = list(formulas) # E.g. ["Fe2O3", "SiO2"]
+        self.densities = np.asarray(densities, dtype=float) # g/cm^3, one per phase
+        self.incident_energy = float(incident_energy) # keV
+        if len(self.formulas) != len(self.densities):
+            raise ValueError("Every phase needs exactly one density.")
+        counts, valid = formula_vectors(self.formulas)
+        if not valid.all():
+            raise ValueError("Could not parse phase formula(s): {}".format(
+                ", ".join(formula for formula, ok in zip(self.formulas, valid) if not ok)))
+        element_data_dict = element_data_dict if element_data_dict is not None else load_MAC_JSON("Element_Information_Dict.json")
+        self.atomic_weights, self.elemental_MACs = elemental_vectors(np.flatnonzero(counts.any(axis=0)), incident_energy,
+                                                                     element_data_dict, full_LAC_dict)
+        # Phases with elements above Z = 92 have no MAC, and their composition and MAC rows are left as NaN
+        self.valid = ~(counts[:, np.isnan(self.elemental_MACs)] > 0).any(axis=1)
+        gram_amounts = counts * self.atomic_weights
+        with np.errstate(invalid="ignore"):
+            self.composition = gram_amounts / gram_amounts.sum(axis=1, keepdims=True) # C: mass fraction of each element
+        self.composition[~self.valid] = np.nan
+        self.phase_MACs = self.composition @ np.nan_to_num(self.elemental_MACs, nan=0.0) # C @ mu, cm^2/g per phase
+
+    def __repr__(self):
+        return "A library of {n} phases at {energy} keV: {formulas}".format(n=len(self.formulas), energy=self.incident_energy,
+                                                                           formulas=", ".join(self.formulas))
+
+    def __len__(self):
+        return len(self.formulas)
+
+    # Function to find a phase's row by index or formula
+    def phase_index(self, phase):
+        return phase if isinstance(phase, (int, np.integer)) else self.formulas.index(phase)
+
+# ---------- Elemental Vectors ----------
+
+# Function to return Z-indexed (atomic weights, MACs at the incident energy) vectors of length 119
+# Only the proton numbers given are filled in; the rest are 0, except that requested elements above Z = 92 have a NaN MAC
+def elemental_vectors(proton_numbers, incident_energy, element_data_dict, full_LAC_dict=None):
+    atomic_weights = np.zeros(vector_length)
+    elemental_MACs = np.zeros(vector_length)
+    atomic_info = {}
+    for Z in proton_numbers:
+        if element_symbols[Z] in element_data_dict:
+            atomic_info[element_symbols[Z]] = element_data_dict[element_symbols[Z]]
+        else:
+            elemental_MACs[Z] = np.nan
+    if atomic_info:
+        MAC_library = get_sample_MAC_library(atomic_info, incident_energy, full_LAC_dict if full_LAC_dict is not None
+                                             else load_MAC_JSON("Atomic_MACs.json"))
+        for element, info in atomic_info.items():
+            atomic_weights[int(info[0])] = float(info[5])
+            elemental_MACs[int(info[0])] = MAC_library[element]
+    return atomic_weights, elemental_MACs
+
+# ---------- Recipes ----------
+
+# Function to list every recipe of n_phases whose fractions are multiples of step and sum to 1, as an (m, n_phases) array
+def recipe_grid(n_phases, step=0.1):
+    divisions = int(round(1 / step))
+    recipes = [np.diff(np.concatenate([[0], bars, [divisions]])) # Stars and bars: each split of the divisions is a recipe
+               for bars in itertools.combinations_with_replacement(range(divisions + 1), n_phases - 1)]
+    return np.array(recipes, dtype=float).reshape(-1, n_phases) / divisions
+
+# Function to convert recipes to weight fractions (rows sum to 1); basis is "weight" or "volume"
+def weight_fractions(fractions, densities, basis="weight"):
+    fractions = np.atleast_2d(np.asarray(fractions, dtype=float))
+    if basis == "volume":
+        fractions = fractions * densities # Grams per unit volume of each phase
+    elif basis != "weight":
+        raise ValueError("Fraction basis must be 'weight' or 'volume', not '{}'.".format(basis))
+    return fractions / fractions.sum(axis=1, keepdims=True)
+
+# ---------- Mixture Calculation ----------
+
+# Function to calculate the effective attenuation of many recipes in one call
+#   fractions: (m, phases) weight or volume fractions over the library's phases (the binder's column may be left at 0)
+#   packing_fraction: share of the holder volume filled by solid, one value or one per recipe
+#   binder: a phase (index or formula) added to every recipe at binder_fraction of the total weight
+#   depth: holder depth in mm, to also return the thickness check
+# Returns {"MAC", "solid density", "effective density", "solid LAC", "LAC"} (and, with a depth, "transmitted fraction",
+# "thick enough" and "required depth mm") as arrays with one value per recipe
+def mixture_attenuation(library, fractions, basis="weight", packing_fraction=1.0, binder=None, binder_fraction=0.0,
+                        depth=None, threshold=None):
+    W = weight_fractions(fractions, library.densities, basis)
+    if binder is not None:
+        binder_column = library.phase_index(binder)
+        W = W * (1 - binder_fraction)
+        W[:, binder_column] += binder_fraction
+    MAC = W[:, library.valid] @ library.phase_MACs[library.valid] # W @ C @ mu, with C @ mu computed once per library
+    MAC[(W[:, ~library.valid] > 0).any(axis=1)] = np.nan # Recipes using a phase without a MAC
+    solid_density = 1 / (W @ (1 / library.densities))
+    effective_density = solid_density * np.asarray(packing_fraction, dtype=float)
+    results = {"MAC": MAC, "solid density": solid_density, "effective density": effective_density,
+               "solid LAC": MAC * solid_density, "LAC": MAC * effective_density}
+    if depth is not None:
+        intensity_ratio, thick_enough, required_depth = beer_lambert_arrays(results["LAC"], depth, threshold)
+        results.update({"transmitted fraction": intensity_ratio, "thick enough": thick_enough,
+                        "required depth mm": required_depth})
+    return results
+
+# Function to return the elemental mass fractions (m, 119) of every recipe (e.g. for edge or fluorescence checks)
+def mixture_composition(library, fractions, basis="weight"):
+    return weight_fractions(fractions, library.densities, basis) @ np.nan_to_num(library.composition, nan=0.0)
+
+
+# ---------- Begin User-Facing Code ----------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Screen the effective LAC of packed powder mixtures.")
+    parser.add_argument("--phase", action="append", required=True, help="FORMULA:DENSITY (g/cm^3), repeat for each phase")
+    energy_group = parser.add_mutually_exclusive_group(required=True)
+    energy_group.add_argument("--anode", choices=list(CCMC_Tubes.keys()))
+    energy_group.add_argument("--energy", type=float, help="Incident energy in keV")
+    recipe_group = parser.add_mutually_exclusive_group()
+    recipe_group.add_argument("--fractions", type=float, nargs="+", help="One recipe, one fraction per phase")
+    recipe_group.add_argument("--step", type=float, default=0.1, help="Screen every recipe in steps of this fraction")
+    parser.add_argument("--volume", action="store_true", help="Fractions are by volume rather than weight")
+    parser.add_argument("--packing", type=float, default=1.0, help="Packing fraction of the powder in the holder")
+    parser.add_argument("--binder", help="FORMULA:DENSITY of a binder added to every recipe")
+    parser.add_argument("--binder-fraction", type=float, default=0.0, help="Weight fraction of binder")
+    parser.add_argument("--depth", type=float, help="Holder depth in mm")
+    arguments = parser.parse_args()
+    if arguments.fractions:
+        if len(arguments.fractions) != len(arguments.phase):
+            parser.error("--fractions needs one fraction per --phase ({} given for {} phases)".format(
+                len(arguments.fractions), len(arguments.phase)))
+        if abs(sum(arguments.fractions) - 1) > 1e-6:
+            print("Warning: fractions sum to {:g}, so they have been rescaled to sum to 1.".format(sum(arguments.fractions)))
+    phases = [phase.rsplit(":", 1) for phase in arguments.phase + ([arguments.binder] if arguments.binder else [])]
+    phase_library = PhaseLibrary([formula for formula, density in phases], [float(density) for formula, density in phases],
+                                 CCMC_Tubes[arguments.anode] if arguments.anode else arguments.energy)
+    n_powder = len(arguments.phase)
+    recipes = np.array([arguments.fractions]) if arguments.fractions else recipe_grid(n_powder, arguments.step)
+    recipes = np.hstack([recipes, np.zeros((len(recipes), len(phase_library) - n_powder))]) # Binder column
+    start = time.perf_counter()
+    mixture_results = mixture_attenuation(phase_library, recipes, "volume" if arguments.volume else "weight", arguments.packing,
+                                          n_powder if arguments.binder else None, arguments.binder_fraction, arguments.depth)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if len(recipes) == 1:
+        for quantity, values in mixture_results.items():
+            print("{}: {}".format(quantity, values[0]))
+    else:
+        print("{:,} recipes in {:.2f} ms; effective LAC from {:.2f} to {:.2f} cm^-1".format(
+            len(recipes), elapsed_ms, mixture_results["LAC"].min(), mixture_results["LAC"].max()))
+        if arguments.depth is not None:
+            print("{:,} recipes are thick enough at {} mm".format(int(mixture_results["thick enough"].sum()), arguments.depth))
@@ -0,0 +1,319 @@
+# Developed by Mitch S-A
+# Updated on October 19, 2026
+
+# A local, offline database of phase densities, so MAC_Calculator.py can offer a measured or crystallographic density
+# before falling back on calculate_bad_density. The database is built once from a CSV of phases (columns "formula" and
+# "density", plus an optional "name") and/or a directory of CIF files (density from _exptl_crystal_density_diffrn, or
+# from the cell volume, Z and formula weight), and is keyed by the reduced formula of chem_form_parser's dictionary:
+# counts are made whole, divided by their common factor and written in Hill order, so Fe4O6, O3Fe2 and Fe2O3 share one
+# key. Polymorphs (e.g. quartz and cristobalite for SiO2) are kept as separate entries under the same key.
+# The database is three .npy files which are memory-mapped rather than read on load:
+#   - entries.npy: (density, label) for every phase, grouped by key
+#   - keys.npy: (key, first entry, number of entries) for every reduced formula
+#   - table.npy: an open-addressing hash table (64-bit key hash, key row or -1), at most half full, probed linearly
+# so a lookup hashes the key, reads one or two slots and one key row, however many phases there are.
+# Each build writes its three files into a new version directory and then replaces the CURRENT file naming it, so a
+# reader always opens three files from the same build, even while a rebuild is running.
+# Build and query from the repository root with, e.g.:
+#   python -m src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.Phase_Density_Database --csv phases.csv --cif-dir cifs
+#   python -m src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.Phase_Density_Database --lookup Fe2O3
+
+# ---------- Necessary imports ----------
+
+# Libraries to allow code to interface with the file system and the command line
+import os
+import argparse
+import shutil
+import time
+# Libraries for reading phase lists, hashing keys and reducing formulas
+import csv
+import hashlib
+import json
+import math
+import re
+from fractions import Fraction
+# Library to allow for array storage and memory mapping
+import numpy as np
+
+# Built-in parser (the same one chem_form_parser uses), imported directly as MAC_Calculator.py imports this script
+from src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.Formula_Parser import parse_formula, FormulaError
+
+# ---------- Reference File Paths ----------
+
+MAC_JSON_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "MAC_JSONs")
+phase_density_directory = os.path.join(MAC_JSON_directory, "Phase_Density_Database")
+# File in the database directory naming the version directory of the current build
+current_version_file = "CURRENT"
+
+# ---------- Short Reference Dictionaries and Lists ----------
+
+# Fixed widths of the stored strings (longer keys or labels are rejected or truncated)
+key_width = 64
+label_width = 64
+# Record layouts of the three files
+entry_dtype = np.dtype([("density", "<f8"), ("label", "S{}".format(label_width))])
+key_dtype = np.dtype([("key", "S{}".format(key_width)), ("start", "<i8"), ("count", "<i8")])
+slot_dtype = np.dtype([("hash", "<u8"), ("row", "<i8")])
+
+# Avogadro's number, for densities from the unit cell (g/cm^3 = Z * g/mol / (N_A * A^3 * 1e-24))
+avogadro = 6.02214076e23
+
+# CIF values may carry an uncertainty in brackets, e.g. 5.275(3)
+_cif_number_pattern = re.compile(r"^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?")
+
+# ---------- Class Definitions ----------
+
+class PhaseDensityDatabase:
+    def __init__(self, directory=phase_density_directory):
+        self.directory = directory
+        self.version = current_version(directory)
+        version_directory = os.path.join(directory, self.version)
+        # Memory-mapped, so opening costs the same for ten phases or a million
+        self.entries = np.load(os.path.join(version_directory, "entries.npy"), mmap_mode="r")
+        self.keys = np.load(os.path.join(version_directory, "keys.npy"), mmap_mode="r")
+        self.table = np.load(os.path.join(version_directory, "table.npy"), mmap_mode="r")
+        self.mask = len(self.table) - 1 # The table size is a power of two
+
+    def __repr__(self):
+        return "A phase density database of {n} phases under {k} formulas at {path}".format(
+            n=len(self.entries), k=len(self.keys), path=self.directory)
+
+    def __len__(self):
+        return len(self.entries)
+
+    # Function to return [(label, density)] for a reduced formula key, or [] if it is not in the database
+    def lookup_key(self, key):
+        encoded = key.encode("utf-8")
+        key_hash = key_hash_value(key)
+        slot = key_hash & self.mask
+        while True:
+            stored_hash, row = int(self.table[slot]["hash"]), int(self.table[slot]["row"])
+            if row < 0: # Reached an empty slot: the key was never inserted
+                return []
+            if stored_hash == key_hash and self.keys[row]["key"] == encoded:
+                start, count = int(self.keys[row]["start"]), int(self.keys[row]["count"])
+                return [(entry["label"].decode("utf-8", errors="replace"), float(entry["density"]))
+                        for entry in self.entries[start:start + count]]
+            slot = (slot + 1) & self.mask
+
+    # Function to return [(label, density)] for a formula string or a chem_form_parser dictionary
+    def lookup(self, formula):
+        try:
+            key = reduced_formula(formula)
+        except (FormulaError, ValueError): # Unreadable, empty or over-long formulas cannot be in the database
+            return []
+        return self.lookup_key(key)
+
+# ---------- Formula Keys ----------
+
+# Function to return the normalized reduced formula of a formula string or {"symbol": count} dictionary, e.g. "Fe2O3"
+# Fractional counts are made whole first (Fe0.95O becomes Fe19O20), and elements are written in Hill order
+def reduced_formula(formula):
+    counts = parse_formula(formula) if isinstance(formula, str) else formula
+    if not counts:
+        raise ValueError("An empty formula has no key.")
+    if all(float(count).is_integer() for count in counts.values()): # The usual case, without the cost of Fraction
+        whole = {element: int(count) for element, count in counts.items() if count > 0}
+    else:
+        fractions = {element: Fraction(str(count)).limit_denominator(1000) for element, count in counts.items() if count > 0}
+        common_denominator = math.lcm(*(fraction.denominator for fraction in fractions.values()))
+        whole = {element: int(fraction * common_denominator) for element, fraction in fractions.items()}
+    common_factor = math.gcd(*whole.values())
+    # Hill order: C then H first when there is carbon, everything else alphabetical
+    order = sorted(whole, key=lambda element: (0 if element == "C" else 1 if element == "H" else 2, element)) \
+        if "C" in whole else sorted(whole)
+    key = "".join(element + (str(whole[element] // common_factor) if whole[element] != common_factor else "") for element in order)
+    if len(key.encode("utf-8")) > key_width:
+        raise ValueError("Formula key '{}' is longer than {} characters.".format(key, key_width))
+    return key
+
+# Function to return the 64-bit hash of a key (stable between runs, unlike Python's hash()); 0 is never returned
+def key_hash_value(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") or 1
+
+# ---------- Reading Phase Sources ----------
+
+# Function to read (formula, density, label) rows from a CSV with "formula" and "density" columns (any capitalization)
+def read_phase_csv(path):
+    phases = []
+    with open(path, "r", newline="", encoding="utf-8-sig") as csvfile:
+        reader = csv.DictReader(csvfile)
+        columns = {name.strip().lower(): name for name in reader.fieldnames or []}
+        if "formula" not in columns or "density" not in columns:
+            raise ValueError("{} needs 'formula' and 'density' columns.".format(path))
+        label_column = columns.get("name", columns.get("phase"))
+        for line_number, row in enumerate(reader, start=2):
+            try:
+                density = float(row[columns["density"]])
+            except (TypeError, ValueError):
+                print("Skipping {} line {}: density '{}' is not a number.".format(path, line_number, row[columns["density"]]))
+                continue
+            formula = (row[columns["formula"]] or "").strip()
+            label = (row[label_column] or "").strip() if label_column else ""
+            phases.append((formula, density, label or "{}:{}".format(os.path.basename(path), line_number)))
+    return phases
+
+# Function to return a CIF number without its uncertainty, or None
+def _cif_number(value):
+    match = _cif_number_pattern.match(value.strip().strip("'\"")) if value else None
+    return float(match.group(0)) if match else None
+
+# Function to read the single-valued tags of each data block in a CIF as [(block name, {tag: value})]
+# Loops are skipped, as the formula, density and cell tags are never looped
+def _cif_blocks(text):
+    blocks = []
+    lines = text.splitlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        if line.lower().startswith("data_"):
+            blocks.append((line[5:], {}))
+        elif line.startswith("_") and blocks:
+            tag, _, value = line.partition(" ")
+            value = value.strip()
+            if not value: # The value is on the following line, or is a ;-delimited text field
+                i += 1
+                if i < len(lines) and lines[i].startswith(";"):
+                    text_field = [lines[i][1:]]
+                    i += 1
+                    while i < len(lines) and not lines[i].startswith(";"):
+                        text_field.append(lines[i])
+                        i += 1
+                    value = " ".join(text_field).strip()
+                elif i < len(lines):
+                    value = lines[i].strip()
+            blocks[-1][1][tag.lower()] = value.strip("'\"")
+        i += 1
+    return blocks
+
+# Function to read (formula, density, label) rows from every .cif file in a directory
+# The atomic weights are those of Element_Information_Dict.json, for densities calculated from the unit cell
+def read_phase_cifs(directory, element_data_dict=None):
+    if element_data_dict is None:
+        with open(os.path.join(MAC_JSON_directory, "Element_Information_Dict.json"), "r") as jsonfile:
+            element_data_dict = json.load(jsonfile)
+    phases = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.lower().endswith(".cif"):
+            continue
+        with open(os.path.join(directory, filename), "r", encoding="utf-8", errors="replace") as ciffile:
+            blocks = _cif_blocks(ciffile.read())
+        for block_name, tags in blocks:
+            # _chemical_formula_sum is written with spaces between elements, e.g. 'Fe2 O3'
+            formula = tags.get("_chemical_formula_sum", "").replace(" ", "")
+            if not formula:
+                continue
+            density = _cif_number(tags.get("_exptl_crystal_density_diffrn"))
+            if density is None:
+                volume = _cif_number(tags.get("_cell_volume"))
+                formula_units = _cif_number(tags.get("_cell_formula_units_z"))
+                try:
+                    counts = parse_formula(formula)
+                    formula_weight = sum(count * float(element_data_dict[element][5]) for element, count in counts.items())
+                except (FormulaError, KeyError): # Unparseable, or an element without an atomic weight (Z > 92)
+                    formula_weight = None
+                if volume and formula_units and formula_weight:
+                    density = formula_units * formula_weight / (avogadro * volume * 1e-24)
+            if density is None:
+                print("Skipping {} block {}: no density or unit cell.".format(filename, block_name))
+                continue
+            label = tags.get("_chemical_name_mineral") or tags.get("_chemical_name_common") or block_name
+            phases.append((formula, density, "{} ({})".format(label, filename)))
+    return phases
+
+# ---------- Building the Database ----------
+
+# Function to build the database files from (formula, density, label) rows, replacing any existing database
+# Returns {"phases": entries stored, "formulas": distinct keys, "skipped": rows whose formula could not be read}
+def build_phase_density_database(phases, directory=phase_density_directory):
+    grouped = {}
+    skipped = 0
+    for formula, density, label in phases:
+        try:
+            key = reduced_formula(formula)
+        except (FormulaError, ValueError) as e:
+            print("Skipping '{}' ({}): {}".format(formula, label, e))
+            skipped += 1
+            continue
+        if not density > 0:
+            skipped += 1
+            continue
+        # Labels are cut to label_width bytes on a character boundary, so a multi-byte character is never split
+        stored_label = label.encode("utf-8")[:label_width].decode("utf-8", errors="ignore").encode("utf-8")
+        grouped.setdefault(key, []).append((density, stored_label))
+    # Entries grouped by key, each key pointing at its run of entries
+    counts = np.array([len(rows) for rows in grouped.values()], dtype=np.int64)
+    entries = np.array([row for rows in grouped.values() for row in rows], dtype=entry_dtype).reshape(-1)
+    keys = np.zeros(len(grouped), dtype=key_dtype)
+    keys["key"] = [key.encode("utf-8") for key in grouped]
+    keys["start"] = np.cumsum(counts) - counts
+    keys["count"] = counts
+    # Open-addressing table at most half full, so probes stay short (filled as lists, then copied in once)
+    size = max(8, 1 << (2 * len(keys) - 1).bit_length())
+    slot_hashes, slot_rows = [0] * size, [-1] * size
+    mask = size - 1
+    for row, key in enumerate(grouped):
+        key_hash = key_hash_value(key)
+        slot = key_hash & mask
+        while slot_rows[slot] >= 0:
+            slot = (slot + 1) & mask
+        slot_hashes[slot], slot_rows[slot] = key_hash, row
+    table = np.zeros(size, dtype=slot_dtype)
+    table["hash"] = np.array(slot_hashes, dtype=np.uint64)
+    table["row"] = slot_rows
+    # The three files go into a new version directory, which replacing CURRENT then makes live in one step
+    os.makedirs(directory, exist_ok=True)
+    version = "v{}-{}".format(time.time_ns(), os.getpid())
+    os.makedirs(os.path.join(directory, version))
+    for name, array in (("entries", entries), ("keys", keys), ("table", table)):
+        np.save(os.path.join(directory, version, name + ".npy"), array)
+    temporary_path = os.path.join(directory, current_version_file + ".tmp")
+    with open(temporary_path, "w") as version_file:
+        version_file.write(version)
+    os.replace(temporary_path, os.path.join(directory, current_version_file))
+    # Older builds are removed; any still open elsewhere (e.g. mapped on Windows) are left for the next build to remove
+    for name in os.listdir(directory):
+        if name != version and name.startswith("v") and os.path.isdir(os.path.join(directory, name)):
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return {"phases": len(entries), "formulas": len(keys), "skipped": skipped}
+
+# Function to return the version directory name of the current build, or None if the database has not been built
+def current_version(directory=phase_density_directory):
+    try:
+        with open(os.path.join(directory, current_version_file), "r") as version_file:
+            return version_file.read().strip()
+    except FileNotFoundError:
+        return None
+
+# Function to open the database, or return None if it has not been built
+def load_phase_density_database(directory=phase_density_directory):
+    if current_version(directory) is None:
+        return None
+    return PhaseDensityDatabase(directory)
+
+
+# ---------- Begin User-Facing Code ----------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the local phase density database.")
+    parser.add_argument("--csv", action="append", default=[], help="CSV with formula, density and optional name columns")
+    parser.add_argument("--cif-dir", action="append", default=[], help="Directory of .cif files")
+    parser.add_argument("--directory", default=phase_density_directory, help="Where the database is stored")
+    parser.add_argument("--lookup", nargs="+", help="Formula(s) to look up")
+    arguments = parser.parse_args()
+    if arguments.csv or arguments.cif_dir:
+        start = time.perf_counter()
+        source_phases = [phase for path in arguments.csv for phase in read_phase_csv(path)]
+        source_phases += [phase for path in arguments.cif_dir for phase in read_phase_cifs(path)]
+        summary = build_phase_density_database(source_phases, arguments.directory)
+        print("Stored {phases:,} phases under {formulas:,} formulas ({skipped} skipped) in {s:.2f} s.".format(
+            s=time.perf_counter() - start, **summary))
+    if arguments.lookup:
+        database = load_phase_density_database(arguments.directory)
+        if database is None:
+            print("No phase density database at {}; build one with --csv or --cif-dir.".format(arguments.directory))
+        else:
+            for lookup_formula in arguments.lookup:
+                matches = database.lookup(lookup_formula)
+                print("{}: {}".format(lookup_formula, ", ".join("{} {:.3f} g/cm^3".format(label, density)
+                                                                 for label, density in matches) or "not found"))
@@ -0,0 +1,192 @@
+# Developed by Mitch S-A
+# Updated on October 19, 2026
+
+# A columnar container for large numbers of instrument/optics/holder scenarios. Rather than one DiffractionSample and one
+# Optics object per scenario (each with attributes that only exist for one shape or one mode), a ScenarioTable keeps every
+# field in a NumPy structured array: shape and mode are stored as enum codes (their index in holder_shapes and
+# optical_modes), unused fields are filled with NaN, and names are dictionary-encoded into short lists of unique strings.
+# Every column is a plain 1D array, so the table converts directly to Arrow/pandas columns with to_columns().
+# The kernels at the bottom of this file evaluate the fit, spill-over onset and attenuation checks for a whole table at
+# once. row() turns any single scenario back into the familiar (radius, Optics, DiffractionSample) objects.
+
+# ---------- Necessary imports ----------
+
+# Libraries to allow for array calculations and loading the preconfiguration JSONs
+import os
+import numpy as np
+
+# Import the classes, reference lists and geometry functions from the parent script
+from src.PXRD_Beam_Footprint_Calculator.Beam_Profile_Calculator import (DiffractionSample, Optics, holder_shapes,
+    optical_modes, load_preconfiguration, load_saved_sample_holders, l_short, l_long)
+# Import the array versions of the attenuation and spill-over calculations
+from src.PXRD_Beam_Footprint_Calculator.Beer_Lambert_Arrays import beer_lambert_arrays
+from src.PXRD_Beam_Footprint_Calculator.Spill_Over_Solver import allowed_beam_length, FDS_fit_onset
+
+# ---------- Short Reference Dictionaries and Lists ----------
+
+# Enum codes, taken from the parent script's lists so the two never disagree
+CIRCLE, RECTANGLE = holder_shapes.index("Circle"), holder_shapes.index("Rectangle")
+FDS, ADS = optical_modes.index("FDS"), optical_modes.index("ADS")
+
+# One row per scenario; lengths in mm, angles in degrees, MAC in cm^2/g and LAC in cm^-1
+scenario_dtype = np.dtype([("radius", np.float64),
+                           ("mode", np.int8), ("mask", np.float64), ("i_slit", np.float64), ("i_length", np.float64),
+                           ("shape", np.int8), ("diameter", np.float64), ("axi", np.float64), ("equi", np.float64),
+                           ("depth", np.float64), ("min_2theta", np.float64),
+                           ("z_check", np.bool_), ("MAC", np.float64), ("LAC", np.float64),
+                           ("optics_name", np.int32), ("sample_name", np.int32)]) # Indices into the name lists
+
+# Absolute path to the preconfiguration JSONs
+Beam_Calc_J_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Beam_Calc_JSONs")
+
+# ---------- Scenario Table ----------
+
+class ScenarioTable:
+    def __init__(self, records, optics_names=None, sample_names=None):
+        self.records = records # Structured array of scenario_dtype
+        self.optics_names = optics_names if optics_names is not None else ["Temp"]
+        self.sample_names = sample_names if sample_names is not None else ["Custom"]
+
+    def __len__(self):
+        return len(self.records)
+
+    def __repr__(self):
+        return "A scenario table of {n} scenarios across {o} optical configurations and {s} sample holders.".format(
+            n=len(self), o=len(self.optics_names), s=len(self.sample_names))
+
+    # Column access, e.g. table["radius"]
+    def __getitem__(self, field):
+        return self.records[field]
+
+    # Build a table from matching lists (or a single value) of radii, Optics objects and DiffractionSample objects
+    @classmethod
+    def from_objects(cls, radii, optics_list, samples):
+        optics_list = [optics_list] if isinstance(optics_list, Optics) else list(optics_list)
+        samples = [samples] if isinstance(samples, DiffractionSample) else list(samples)
+        optics_records, optics_names = _optics_records(optics_list)
+        sample_records, sample_names = _sample_records(samples)
+        radii, optics_index, sample_index = np.broadcast_arrays(np.asarray(radii, dtype=float),
+                                                                np.arange(len(optics_list)) if len(optics_list) > 1 else 0,
+                                                                np.arange(len(samples)) if len(samples) > 1 else 0)
+        return cls(_combine(radii.ravel(), optics_records[optics_index.ravel()], sample_records[sample_index.ravel()]),
+                   optics_names, sample_names)
+
+    # Build a table of every combination of radii x optics x samples (the order of the rows follows that nesting)
+    @classmethod
+    def from_product(cls, radii, optics_list, samples):
+        optics_records, optics_names = _optics_records(list(optics_list))
+        sample_records, sample_names = _sample_records(list(samples))
+        radius_index, optics_index, sample_index = np.meshgrid(np.arange(len(radii)), np.arange(len(optics_records)),
+                                                               np.arange(len(sample_records)), indexing="ij")
+        return cls(_combine(np.asarray(radii, dtype=float)[radius_index.ravel()], optics_records[optics_index.ravel()],
+                            sample_records[sample_index.ravel()]), optics_names, sample_names)
+
+    # Build a table of every saved instrument x saved optics x saved holder (of the same manufacturer, if requested)
+    @classmethod
+    def from_preconfigurations(cls, manufacturer=None, directory=Beam_Calc_J_directory):
+        radii = load_preconfiguration(os.path.join(directory, "instruments_and_radii.json"))
+        optics_dict = load_preconfiguration(os.path.join(directory, "preconfig_optics.json"))
+        optics_list = [Optics(saved[0][1], saved[0][2], saved[0][0], saved[0][3], saved[0][3])
+                       for saved in optics_dict.values() if saved] # Skip the empty "Exempt" entry
+        samples = load_saved_sample_holders(os.path.join(directory, "manufacturers_and_sample_holders.json"), manufacturer)
+        return cls.from_product(list(radii.values()), optics_list, samples)
+
+    # Function to return scenario i as (radius, Optics, DiffractionSample)
+    def row(self, i):
+        record = self.records[i]
+        return (float(record["radius"]), Optics.from_record(record, self.optics_names[record["optics_name"]]),
+                DiffractionSample.from_record(record, self.sample_names[record["sample_name"]]))
+
+    # Function to return a dictionary of 1D columns with names and enum codes decoded, ready for pyarrow/pandas
+    def to_columns(self, decode=True):
+        columns = {field: self.records[field] for field in scenario_dtype.names}
+        if decode:
+            columns["mode"] = np.asarray(optical_modes)[self.records["mode"]]
+            columns["shape"] = np.asarray(holder_shapes)[self.records["shape"]]
+            columns["optics_name"] = np.asarray(self.optics_names)[self.records["optics_name"]]
+            columns["sample_name"] = np.asarray(self.sample_names)[self.records["sample_name"]]
+        return columns
+
+# Function to convert Optics objects to (structured array of optics fields, list of names)
+def _optics_records(optics_list):
+    records = np.zeros(len(optics_list), dtype=scenario_dtype)
+    names = []
+    for i, optics in enumerate(optics_list):
+        records[i]["mode"] = optical_modes.index(optics.mode)
+        records[i]["mask"] = optics.mask
+        records[i]["i_slit"] = getattr(optics, "i_slit", np.nan)
+        records[i]["i_length"] = getattr(optics, "i_length", np.nan)
+        records[i]["optics_name"] = _name_code(names, optics.name)
+    return records, names
+
+# Function to convert DiffractionSample objects to (structured array of sample fields, list of names)
+def _sample_records(samples):
+    records = np.zeros(len(samples), dtype=scenario_dtype)
+    names = []
+    for i, sample in enumerate(samples):
+        records[i]["shape"] = holder_shapes.index(sample.shape)
+        records[i]["diameter"] = getattr(sample, "diameter", np.nan)
+        records[i]["axi"] = getattr(sample, "axi", np.nan)
+        records[i]["equi"] = getattr(sample, "equi", np.nan)
+        records[i]["depth"] = sample.depth
+        records[i]["min_2theta"] = sample.min_2theta
+        records[i]["z_check"] = sample.z_check
+        MAC = getattr(sample, "MAC", None)
+        records[i]["MAC"] = np.nan if MAC is None else MAC
+        records[i]["LAC"] = getattr(sample, "LAC", np.nan)
+        records[i]["sample_name"] = _name_code(names, sample.name)
+    return records, names
+
+# Function to return the index of name in names, adding it if it is new
+def _name_code(names, name):
+    if name not in names:
+        names.append(name)
+    return names.index(name)
+
+# Function to merge radii, optics fields and sample fields into one structured array
+def _combine(radii, optics_records, sample_records):
+    records = np.zeros(len(radii), dtype=scenario_dtype)
+    records["radius"] = radii
+    for field in ("mode", "mask", "i_slit", "i_length", "optics_name"):
+        records[field] = optics_records[field]
+    for field in ("shape", "diameter", "axi", "equi", "depth", "min_2theta", "z_check", "MAC", "LAC", "sample_name"):
+        records[field] = sample_records[field]
+    return records
+
+# ---------- Scenario Kernels ----------
+
+# Function to return the largest beam length (mm) of every scenario in a scan starting at min_2theta
+# FDS beams are longest at the lowest angle (as in beam_fit_checker), so the upper end of the scan never matters;
+# ADS beams are fixed at i_length
+def scenario_max_length(table, min_2theta):
+    records = table.records
+    with np.errstate(invalid="ignore", divide="ignore"):
+        FDS_length = l_short(records["radius"], records["i_slit"], min_2theta) + l_long(records["radius"], records["i_slit"], min_2theta)
+    return np.where(records["mode"] == FDS, FDS_length, records["i_length"])
+
+# Function to return whether the largest beam of every scenario fits within its holder
+# Uses the same rules as circ_beam_overlap_checker and rect_beam_overlap_checker
+def scenario_fits(table, min_2theta):
+    records = table.records
+    beam_length = scenario_max_length(table, min_2theta)
+    with np.errstate(invalid="ignore"):
+        circle_fit = np.sqrt((beam_length / 2) ** 2 + (records["mask"] / 2) ** 2) <= records["diameter"] / 2
+        rectangle_fit = (beam_length <= records["axi"]) & (records["mask"] <= records["equi"])
+    return np.where(records["shape"] == CIRCLE, circle_fit, rectangle_fit)
+
+# Function to return the angle above which every FDS scenario's beam fits within its holder (NaN for ADS or never)
+def scenario_onset(table):
+    records = table.records
+    allowed = allowed_beam_length(np.asarray(holder_shapes)[records["shape"]], records["mask"], records["diameter"],
+                                  records["axi"], records["equi"])
+    onset = FDS_fit_onset(records["radius"], records["i_slit"], allowed)
+    return np.where(records["mode"] == FDS, onset, np.nan)
+
+# Function to return (transmitted fraction, thick enough, required depth in mm) of every scenario at its holder depth
+# Scenarios without a z_check have no LAC and return NaN and False
+def scenario_attenuation(table, threshold=None):
+    records = table.records
+    with np.errstate(invalid="ignore"):
+        intensity_ratio, thick_enough, required_depth = beer_lambert_arrays(records["LAC"], records["depth"], threshold)
+    checked = records["z_check"]
+    return (np.where(checked, intensity_ratio, np.nan), thick_enough & checked, np.where(checked, required_depth, np.nan))
@@ -0,0 +1,228 @@
+# Developed by Mitch S-A
+# Updated on October 19, 2026
+
+# A content-addressed cache for complete footprint scenarios (curve, fit verdict, attenuation numbers and,
+# optionally, the rendered figure). Scenarios are keyed on a canonical hash of only the inputs which affect
+# the result, so resubmitting the same instrument/holder/optics under a different sample name is a cache hit.
+# Scenarios are evaluated by Footprint_Core.evaluate_scenario with the caller's FootprintContext (whose threshold is part
+# of the key), and one ScenarioCache may be shared between threads. get() returns a copy of the stored result, so a
+# caller may change what it receives without changing what later callers get.
+
+# ---------- Necessary imports ----------
+
+# Libraries to allow code to interface with the file system
+import os
+import base64
+import copy
+import io
+# Libraries to allow for canonical hashing and JSON storage of results
+import hashlib
+import json
+from collections import OrderedDict
+# Library to let threads share one cache
+import threading
+
+# Import the default threshold from the parent script and the scenario evaluation from the core
+from src.PXRD_Beam_Footprint_Calculator.Beam_Profile_Calculator import attenuation_threshold
+from src.PXRD_Beam_Footprint_Calculator.Footprint_Core import evaluate_scenario
+
+# ---------- Reference File Paths ----------
+
+Beam_Profile_directory = os.path.dirname(os.path.abspath(__file__))
+MAC_JSON_directory = os.path.join(Beam_Profile_directory, "MAC_Calculator_Directory", "MAC_JSONs")
+
+# The reference tables whose contents make up the data-table version
+data_table_files = ["Atomic_MACs.json", "Element_Information_Dict.json", "X-ray_Absorption_Edges.json"]
+
+# Memoized data-table version so the tables are hashed only once per process
+_data_table_version = None
+
+# ---------- Canonical Hashing ----------
+
+# Function to return a short hash of the attenuation tables, so cached results expire when the tables are rebuilt
+def data_table_version():
+    global _data_table_version
+    if _data_table_version is None:
+        table_hash = hashlib.sha256()
+        for filename in data_table_files:
+            with open(os.path.join(MAC_JSON_directory, filename), "rb") as table_file:
+                table_hash.update(table_file.read())
+        _data_table_version = table_hash.hexdigest()[:16]
+    return _data_table_version
+
+# Function to round numbers so 10, 10.0 and 1e1 (or float noise in the last bits) give the same key
+def _canonical_number(value):
+    return float("{:.10g}".format(float(value)))
+
+# Function to reduce an Optics object to the fields that affect a scenario (the configuration name does not)
+def canonical_optics(optics):
+    if optics.mode == "FDS":
+        return {"mode": "FDS", "mask": _canonical_number(optics.mask), "i_slit": _canonical_number(optics.i_slit)}
+    return {"mode": "ADS", "mask": _canonical_number(optics.mask), "i_length": _canonical_number(optics.i_length)}
+
+# Function to reduce a DiffractionSample object to its geometry and LAC (the holder name does not matter)
+def canonical_sample(sample):
+    if sample.shape == "Circle":
+        geometry = {"shape": "Circle", "diameter": _canonical_number(sample.diameter)}
+    else:
+        geometry = {"shape": "Rectangle", "axi": _canonical_number(sample.axi), "equi": _canonical_number(sample.equi)}
+    geometry["depth"] = _canonical_number(sample.depth)
+    geometry["LAC"] = _canonical_number(sample.LAC) if sample.z_check else None
+    return geometry
+
+# Function to build the content-addressed key for a scenario
+def scenario_cache_key(radius, optics, sample, min_2theta, max_2theta, threshold=None, render_figure=False):
+    if threshold is None:
+        threshold = attenuation_threshold
+    description = {"radius": _canonical_number(radius), "optics": canonical_optics(optics), "sample": canonical_sample(sample),
+                   "two_theta": [_canonical_number(min_2theta), _canonical_number(max_2theta)],
+                   "threshold": _canonical_number(threshold), "tables": data_table_version(), "figure": bool(render_figure)}
+    canonical_string = json.dumps(description, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical_string.encode("utf-8")).hexdigest()
+
+# ---------- Scenario Evaluation ----------
+
+# Function to render the beam curve against the sample's axial limit to PNG bytes without opening a window
+# The figure is drawn on its own Agg canvas rather than through pyplot, so the process-wide backend (and any interactive
+# figure already open) is left alone
+def render_scenario_figure(optics, sample, graphable_data_set):
+    from matplotlib.figure import Figure # Only imported when a figure is requested
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=(6, 4))
+    FigureCanvasAgg(fig)
+    two_theta = fig.add_subplot()
+    two_theta.plot(list(graphable_data_set.keys()), list(graphable_data_set.values()), label=optics.mode,
+                   color="blue" if optics.mode == "FDS" else "red")
+    if optics.mode == "FDS": # Horizontal line at the longest axial dimension of the sample well
+        two_theta.axhline(sample.diameter if sample.shape == "Circle" else sample.axi, color="black", linewidth=1)
+        two_theta.set_ylabel("Beam Length (mm)")
+    else:
+        two_theta.axhline(1, color="black", linewidth=1)
+        two_theta.set_ylabel("Aperature Width (mm)")
+    two_theta.set_xlabel(r"$2\theta$ (°)")
+    two_theta.legend(loc="upper right")
+    image_buffer = io.BytesIO()
+    fig.savefig(image_buffer, format="png", dpi=100)
+    return image_buffer.getvalue()
+
+# Function to evaluate a complete scenario as a JSON-serializable dictionary, with the context's threshold
+def evaluate_footprint_scenario(context, radius, optics, sample, min_2theta, max_2theta, render_figure=False):
+    result = evaluate_scenario(context, radius, optics, sample, min_2theta, max_2theta)
+    result["figure png"] = None
+    if render_figure: # Drawn from the scenario's own [[theta, value]] curve and stored as base64 text to stay JSON serializable
+        result["figure png"] = base64.b64encode(render_scenario_figure(optics, sample, dict(result["curve"]))).decode("ascii")
+    return result
+
+# ---------- Class Definitions ----------
+
+class ScenarioCache:
+    def __init__(self, max_memory_entries=256, disk_directory=None, max_disk_bytes=256 * 1024 ** 2):
+        self.max_memory_entries = max_memory_entries
+        self.memory = OrderedDict() # Least recently used entries sit at the front
+        self.disk_directory = disk_directory # None keeps the cache in memory only
+        self.max_disk_bytes = max_disk_bytes
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_bytes = 0
+        self.lock = threading.RLock() # Held while the entries or counters change
+        if self.disk_directory is not None:
+            os.makedirs(self.disk_directory, exist_ok=True)
+            self.disk_bytes = sum(entry.stat().st_size for entry in os.scandir(self.disk_directory) if entry.name.endswith(".json"))
+
+    def __repr__(self):
+        return "A scenario cache with {m} entries in memory and {d} bytes on disk (hit rate {r:.1%}).".format(
+            m=len(self.memory), d=self.disk_bytes, r=self.hit_rate())
+
+    def print_all_information(self):
+        print(self.metrics())
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_directory, key + ".json")
+
+    def hit_rate(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+    def metrics(self):
+        return {"memory hits": self.memory_hits, "disk hits": self.disk_hits, "misses": self.misses,
+                "hit rate": self.hit_rate(), "memory entries": len(self.memory), "disk bytes": self.disk_bytes}
+
+    def _remember(self, key, result):
+        self.memory[key] = result
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    # Look in memory first, then on disk (promoting disk hits back into memory)
+    def get(self, key):
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                return copy.deepcopy(self.memory[key])
+            if self.disk_directory is not None and os.path.exists(self._disk_path(key)):
+                try:
+                    with open(self._disk_path(key), "r") as jsonfile:
+                        result = json.load(jsonfile)
+                    os.utime(self._disk_path(key)) # Refresh the modification time so eviction is least-recently-used
+                    self.disk_hits += 1
+                    self._remember(key, result)
+                    return copy.deepcopy(result)
+                except (OSError, ValueError): # A partially written or removed file counts as a miss
+                    pass
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        with self.lock:
+            self._remember(key, copy.deepcopy(result)) # Later changes to the caller's result do not reach the cache
+            if self.disk_directory is None:
+                return
+            try:
+                temporary_path = self._disk_path(key) + ".tmp"
+                with open(temporary_path, "w") as jsonfile:
+                    json.dump(result, jsonfile)
+                previous_size = os.path.getsize(self._disk_path(key)) if os.path.exists(self._disk_path(key)) else 0
+                os.replace(temporary_path, self._disk_path(key)) # Atomic so readers never see half a file
+                self.disk_bytes += os.path.getsize(self._disk_path(key)) - previous_size
+            except OSError as e:
+                print("Error writing scenario to the disk cache: {}".format(e))
+                return
+            if self.disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    # Remove the least recently used files until the disk tier is back under its size limit
+    def _evict_disk(self):
+        entries = sorted((entry for entry in os.scandir(self.disk_directory) if entry.name.endswith(".json")),
+                         key=lambda entry: entry.stat().st_mtime)
+        for entry in entries:
+            if self.disk_bytes <= self.max_disk_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self.disk_bytes -= size
+            except OSError:
+                continue
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            if self.disk_directory is not None:
+                for entry in os.scandir(self.disk_directory):
+                    if entry.name.endswith(".json"):
+                        os.remove(entry.path)
+                self.disk_bytes = 0
+
+# ---------- Cached Scenario Function ----------
+
+# Function to return a complete scenario result, computing it only if no equivalent scenario is cached
+# context is a FootprintContext from load_footprint_context(), loaded once and shared by every call
+def cached_footprint_scenario(cache, context, radius, optics, sample, min_2theta, max_2theta, render_figure=False):
+    key = scenario_cache_key(radius, optics, sample, min_2theta, max_2theta, context.threshold, render_figure)
+    result = cache.get(key)
+    if result is None:
+        result = evaluate_footprint_scenario(context, radius, optics, sample, min_2theta, max_2theta, render_figure)
+        cache.put(key, result)
+    return result
@@ -0,0 +1,59 @@
+# Developed by Mitch S-A
+# Updated on October 19, 2026
+
+# Exact spill-over onset for fixed divergence slit (FDS) mode. Instead of scanning the FDS curve for the point where it
+# drops below the holder's axial length, the angle at which the beam first fits inside the holder is solved directly from
+# the analytic l_short + l_long expression. The beam length
+#     L = R sin(phi/2) [1/sin(theta + phi/2) + 1/sin(theta - phi/2)] = R sin(phi) sin(theta) / (sin^2(theta) - sin^2(phi/2))
+# equals an allowed length L_max where L_max sin^2(theta) - R sin(phi) sin(theta) - L_max sin^2(phi/2) = 0, a quadratic in
+# sin(theta) whose positive root gives the onset angle. Every function broadcasts over NumPy arrays, so tables of
+# "minimum safe angle" for many radius/slit/mask/holder combinations are a single array expression.
+# Angles are returned the same way FDS_length takes them, and NaN means the beam never fits (e.g. the mask is too wide).
+
+# ---------- Necessary imports ----------
+
+# Library to allow for array calculations
+import numpy as np
+
+# ---------- Allowed Beam Length ----------
+
+# Function to return the longest beam (mm) that fits in the holder given the beam mask width, following the same
+# centered-rectangle rules as circ_beam_overlap_checker and rect_beam_overlap_checker
+def allowed_beam_length(shape, mask, diameter=0, axi=0, equi=0):
+    is_circle = np.asarray(shape) == "Circle"
+    mask, diameter, axi, equi = (np.asarray(value, dtype=float) for value in (mask, diameter, axi, equi))
+    with np.errstate(invalid="ignore"):
+        # Circle: the corners of the beam must lie within the radius
+        circle_length = 2 * np.sqrt((diameter / 2) ** 2 - (mask / 2) ** 2)
+        circle_length = np.where(mask < diameter, circle_length, np.nan)
+        # Rectangle: the beam must fit along both the axial and equitorial dimensions
+        rectangle_length = np.where(mask <= equi, axi, np.nan)
+    return np.where(is_circle, circle_length, rectangle_length)
+
+# ---------- Onset Angle Solvers ----------
+
+# Function to return the angle (degrees) above which an FDS beam is no longer than allowed_length_mm
+def FDS_fit_onset(radius, phi_degrees, allowed_length_mm):
+    radius, phi, allowed = np.broadcast_arrays(np.asarray(radius, dtype=float), np.deg2rad(np.asarray(phi_degrees, dtype=float)),
+                                               np.asarray(allowed_length_mm, dtype=float))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Positive root of the quadratic in sin(theta)
+        sin_theta = (radius * np.sin(phi) + np.sqrt((radius * np.sin(phi)) ** 2 + 4 * allowed ** 2 * np.sin(phi / 2) ** 2)) / (2 * allowed)
+        # A root above 1 means the beam is longer than allowed even at 90 degrees
+        onset = np.where((sin_theta <= 1) & (allowed > 0), np.rad2deg(np.arcsin(np.minimum(sin_theta, 1))), np.nan)
+    return onset
+
+# Function to return the spill-over onset angle for FDS beams on circular or rectangular holders
+def spill_over_onset(radius, phi_degrees, mask, shape, diameter=0, axi=0, equi=0):
+    return FDS_fit_onset(radius, phi_degrees, allowed_beam_length(shape, mask, diameter, axi, equi))
+
+# Function to build a "minimum safe angle" table of shape (radii, slits, masks, holders)
+# holders is a list of DiffractionSample objects (or anything with .shape and .diameter or .axi/.equi attributes)
+def minimum_safe_angle_table(radii, slits_degrees, masks, holders):
+    shapes = np.array([holder.shape for holder in holders])
+    diameters = np.array([getattr(holder, "diameter", 0) for holder in holders], dtype=float)
+    axials = np.array([getattr(holder, "axi", 0) for holder in holders], dtype=float)
+    equitorials = np.array([getattr(holder, "equi", 0) for holder in holders], dtype=float)
+    allowed = allowed_beam_length(shapes[None, :], np.asarray(masks, dtype=float)[:, None], diameters, axials, equitorials)
+    return FDS_fit_onset(np.asarray(radii, dtype=float)[:, None, None, None], np.asarray(slits_degrees, dtype=float)[None, :, None, None],
+                         allowed[None, None, :, :])
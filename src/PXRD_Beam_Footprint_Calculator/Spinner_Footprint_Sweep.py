@@ -0,0 +1,136 @@
+# Developed by Mitch S-A
+# Updated on October 19, 2026
+
+# Beam footprint coverage for samples on a spinner. circ_beam_overlap_checker and rect_beam_overlap_checker compare the
+# beam with the holder in one fixed orientation, but a spinning rectangular well turns underneath the beam, so the
+# beam's corners reach out of the well at some rotation angles and not others. This script finds the fraction of the
+# beam footprint inside the well for every (rotation angle, 2theta) pair in one array operation:
+#   - the footprint is the rectangle x from -l_short to +l_long (as in Footprint_Ray_Tracer.py) by the beam mask in y
+#   - the footprint is cut into thin stripes along the beam; each stripe is a line segment, clipped exactly against the
+#     rotated well (Liang-Barsky clipping against its two pairs of parallel edges, or the chord of a circular well)
+#   - coverage is the mean clipped length over the stripes, so only the mask direction is discretized
+# Reported per angle: the worst-case spill-over over a full turn, the rotation at which it occurs and the time-averaged
+# illuminated area. A beam fits at every orientation exactly when its farthest corner from the spinner axis lies within
+# min(axi, equi)/2 (for a centred beam, its half-diagonal), which fits_all_orientations() checks in closed form.
+# The default 90 rotations x 86 angles x 32 stripes take about 10 ms. Run from the repository root with, e.g.:
+#   python -m src.PXRD_Beam_Footprint_Calculator.Spinner_Footprint_Sweep --radius 240 --slit 0.5 --mask 10 --axi 20 --equi 15
+
+# ---------- Necessary imports ----------
+
+# Libraries for the command line and timing
+import argparse
+import time
+# Library to allow for array calculations
+import numpy as np
+
+# Import the classes and geometry functions from the parent script and its helpers
+from src.PXRD_Beam_Footprint_Calculator.Beam_Profile_Calculator import DiffractionSample, Optics, l_short, l_long
+from src.PXRD_Beam_Footprint_Calculator.Adaptive_Theta_Grid import ADS_phi_array
+
+# ---------- Short Reference Dictionaries and Lists ----------
+
+# Default rotation grid: a well is unchanged by a half turn, so [0, 180) degrees covers a full revolution
+default_rotations = np.arange(0, 180, 2.0)
+# Number of stripes the beam is cut into across the mask
+default_stripes = 32
+
+# ---------- Footprint Geometry ----------
+
+# Function to return the (incident-side, diffracted-side) edges of the footprint along the beam, in mm, for each angle
+# FDS beams use the divergence slit; ADS beams use the divergence angle which gives the fixed irradiated length
+def beam_extents(radius, optics, theta_values):
+    theta_values = np.asarray(theta_values, dtype=float)
+    if optics.mode == "FDS":
+        phi = np.full(theta_values.shape, float(optics.i_slit))
+    else:
+        phi = ADS_phi_array(optics.i_length, radius, theta_values)
+    return -l_short(radius, phi, theta_values), l_long(radius, phi, theta_values)
+
+# Function to return whether the footprint fits inside a rectangular well at every rotation (closed form)
+def fits_all_orientations(x_start, x_end, mask, axi, equi):
+    farthest_corner = np.hypot(np.maximum(np.abs(x_start), np.abs(x_end)), mask / 2)
+    return farthest_corner <= min(axi, equi) / 2
+
+# ---------- Coverage ----------
+
+# Function to return the fraction of the footprint inside the holder, shape (rotations, angles)
+# x_start/x_end are arrays over angles; rotations are the well's rotation about the sample normal in degrees
+def footprint_coverage(x_start, x_end, mask, sample, rotation_degrees=default_rotations, n_stripes=default_stripes):
+    x_start = np.asarray(x_start, dtype=float)[None, :, None]
+    x_end = np.asarray(x_end, dtype=float)[None, :, None]
+    y = ((np.arange(n_stripes) + 0.5) / n_stripes - 0.5) * mask # Midpoint of each stripe across the mask
+    length = x_end - x_start
+    if sample.shape == "Circle": # Rotation does not matter: clip each stripe to the circle's chord
+        half_chord = np.sqrt(np.maximum((sample.diameter / 2) ** 2 - y ** 2, 0))[None, None, :]
+        inside = np.clip(np.minimum(x_end, half_chord) - np.maximum(x_start, -half_chord), 0, None)
+        coverage = inside.mean(axis=2) / length[..., 0]
+        return np.broadcast_to(coverage, (len(np.atleast_1d(rotation_degrees)), coverage.shape[1]))
+    rotation = np.deg2rad(np.atleast_1d(np.asarray(rotation_degrees, dtype=float)))[:, None, None]
+    cos_rotation, sin_rotation = np.cos(rotation), np.sin(rotation)
+    # Stripe points x_start + t * length (t from 0 to 1) in the well's frame: u along axi, v along equi
+    t_low, t_high = 0.0, 1.0
+    for start, step, half_width in ((x_start * cos_rotation + y * sin_rotation, length * cos_rotation, sample.axi / 2),
+                                    (y * cos_rotation - x_start * sin_rotation, -length * sin_rotation, sample.equi / 2)):
+        # A stripe parallel to a pair of edges (step of 0) is given a vanishing step instead, which sends its entry and
+        # exit to -/+ infinity when it lies between the edges and both to the same side when it does not
+        inverse_step = 1 / np.where(step == 0, 1e-300, step)
+        enter = (-half_width - start) * inverse_step
+        leave = (half_width - start) * inverse_step
+        t_low = np.maximum(t_low, np.minimum(enter, leave))
+        t_high = np.minimum(t_high, np.maximum(enter, leave))
+    return np.clip(t_high - t_low, 0, None).mean(axis=2)
+
+# Function to sweep a spinning sample over rotation angles and 2theta values
+# Returns {"theta", "rotation", "coverage" (rotations x angles), "worst spill", "worst rotation",
+#          "mean illuminated area mm^2", "beam area mm^2", "fits all orientations"}
+def spinner_sweep(radius, optics, sample, theta_values, rotation_degrees=default_rotations, n_stripes=default_stripes):
+    theta_values = np.asarray(theta_values, dtype=float)
+    rotation_degrees = np.atleast_1d(np.asarray(rotation_degrees, dtype=float))
+    x_start, x_end = beam_extents(radius, optics, theta_values)
+    coverage = footprint_coverage(x_start, x_end, optics.mask, sample, rotation_degrees, n_stripes)
+    beam_area = (x_end - x_start) * optics.mask
+    if sample.shape == "Circle":
+        fits_everywhere = np.hypot(np.maximum(-x_start, x_end), optics.mask / 2) <= sample.diameter / 2
+    else:
+        fits_everywhere = fits_all_orientations(x_start, x_end, optics.mask, sample.axi, sample.equi)
+    return {"theta": theta_values, "rotation": rotation_degrees, "coverage": coverage,
+            "worst spill": 1 - coverage.min(axis=0), "worst rotation": rotation_degrees[coverage.argmin(axis=0)],
+            "mean illuminated area mm^2": coverage.mean(axis=0) * beam_area, "beam area mm^2": beam_area,
+            "fits all orientations": fits_everywhere}
+
+
+# ---------- Begin User-Facing Code ----------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Spill-over and illuminated area of a beam on a spinning sample.")
+    parser.add_argument("--radius", type=float, required=True, help="Goniometer radius in mm")
+    beam_group = parser.add_mutually_exclusive_group(required=True)
+    beam_group.add_argument("--slit", type=float, help="FDS divergence slit in degrees")
+    beam_group.add_argument("--length", type=float, help="ADS irradiated length in mm")
+    parser.add_argument("--mask", type=float, required=True, help="Beam mask in mm")
+    holder_group = parser.add_mutually_exclusive_group(required=True)
+    holder_group.add_argument("--diameter", type=float, help="Circular well diameter in mm")
+    holder_group.add_argument("--axi", type=float, help="Rectangular well axial length in mm (requires --equi)")
+    parser.add_argument("--equi", type=float, help="Rectangular well equitorial width in mm")
+    parser.add_argument("--min-2theta", type=float, default=5)
+    parser.add_argument("--max-2theta", type=float, default=90)
+    arguments = parser.parse_args()
+    if arguments.axi is not None and arguments.equi is None:
+        parser.error("--axi requires --equi")
+    if arguments.slit is not None:
+        sweep_optics = Optics("FDS", arguments.mask, i_slit=arguments.slit)
+    else:
+        sweep_optics = Optics("ADS", arguments.mask, i_length=arguments.length)
+    if arguments.diameter is not None:
+        sweep_sample = DiffractionSample("Custom", "Circle", False, diameter=arguments.diameter)
+    else:
+        sweep_sample = DiffractionSample("Custom", "Rectangle", False, axi=arguments.axi, equi=arguments.equi)
+    theta_grid = np.arange(arguments.min_2theta, arguments.max_2theta + 0.5, 1.0) # Includes max_2theta, never past it
+    start = time.perf_counter()
+    sweep = spinner_sweep(arguments.radius, sweep_optics, sweep_sample, theta_grid)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    for i in range(0, len(theta_grid), 5):
+        print("{:5.1f} deg: worst spill-over {:6.1%} (at {:5.1f} deg rotation), mean illuminated area {:7.2f} of {:7.2f} mm^2{}".format(
+            theta_grid[i], sweep["worst spill"][i], sweep["worst rotation"][i], sweep["mean illuminated area mm^2"][i],
+            sweep["beam area mm^2"][i], ", fits at every rotation" if sweep["fits all orientations"][i] else ""))
+    print("{} rotations x {} angles in {:.1f} ms".format(len(sweep["rotation"]), len(theta_grid), elapsed_ms))
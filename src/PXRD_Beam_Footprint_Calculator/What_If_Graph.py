@@ -0,0 +1,211 @@
+# Developed by Mitch S-A
+# Updated on October 19, 2026
+
+# A small dependency-tracked computation graph for interactive "what if" sessions. Each stage of the calculator is a node
+# that remembers its last result; changing an input only marks the nodes downstream of it as stale, and a stale node is
+# recomputed the next time it (or anything after it) is requested. Changing the divergence slit therefore re-runs the
+# curve and overlap check but not the MAC, and changing the density re-runs only the LAC and attenuation.
+# footprint_what_if_graph() builds the standard graph:
+#     formula -> composition -> atomic info -> MAC -> LAC (with density) -> attenuation (with sample and threshold)
+#     radius/optics/2theta range -> curve -> overlap (with sample) -> figure
+# The reference tables come from a Footprint_Core context (loaded once when the graph is built unless one is passed in),
+# and only requested nodes are ever computed.
+
+# ---------- Necessary imports ----------
+
+# Library to time each node's recomputation
+import time
+# Library to snapshot input values, so inputs changed in place are still noticed
+import copy
+import numpy as np
+
+# Import the geometry functions from the parent script and its helpers, and the context and attenuation summary
+from src.PXRD_Beam_Footprint_Calculator.Beam_Profile_Calculator import beam_fit_checker, slot_values
+from src.PXRD_Beam_Footprint_Calculator.Footprint_Core import FootprintContext, attenuation_summary, load_footprint_context
+from src.PXRD_Beam_Footprint_Calculator.Adaptive_Theta_Grid import FDS_length_array, ADS_phi_array
+from src.PXRD_Beam_Footprint_Calculator.Spill_Over_Solver import spill_over_onset
+from src.PXRD_Beam_Footprint_Calculator.Scenario_Cache import render_scenario_figure
+# Import the chemistry functions from the child script
+from src.PXRD_Beam_Footprint_Calculator.MAC_Calculator_Directory.MAC_Calculator import (SampleChemistry, chem_form_parser,
+    get_atomic_info, get_sample_MAC_library)
+
+# ---------- Class Definitions ----------
+
+class ComputationGraph:
+    def __init__(self):
+        self.functions = {} # {node: function}, or None for inputs
+        self.dependencies = {} # {node: [nodes it reads]}
+        self.dependents = {} # {node: [nodes which read it]}
+        self.values = {} # {node: last computed (or set) value}
+        self.input_states = {} # {input: snapshot of its value when it was last set}
+        self.dirty = set() # Nodes whose stored value is out of date
+        self.compute_counts = {} # {node: number of times computed}
+        self.compute_ms = {} # {node: duration of the last computation in ms}
+        self.last_recomputed = [] # Nodes computed during the most recent get()
+
+    def __repr__(self):
+        return "A computation graph of {inputs} inputs and {nodes} calculated nodes ({dirty} out of date).".format(
+            inputs=sum(function is None for function in self.functions.values()),
+            nodes=sum(function is not None for function in self.functions.values()), dirty=len(self.dirty))
+
+    def print_all_information(self):
+        print({node: {"depends on": self.dependencies[node], "computed": self.compute_counts.get(node, 0),
+                      "out of date": node in self.dirty} for node in self.functions})
+
+    # Function to add an input node with a starting value
+    def add_input(self, name, value=None):
+        self._register(name, None, [])
+        self.values[name] = value
+        self.input_states[name] = _input_state(value)
+
+    # Function to add a calculated node; function is called with the values of dependencies in order
+    def add_node(self, name, function, dependencies):
+        for dependency in dependencies:
+            if dependency not in self.functions:
+                raise KeyError("Node '{}' depends on unknown node '{}'.".format(name, dependency))
+        self._register(name, function, list(dependencies))
+        self.dirty.add(name)
+
+    def _register(self, name, function, dependencies):
+        if name in self.functions:
+            raise KeyError("Node '{}' already exists.".format(name))
+        self.functions[name] = function
+        self.dependencies[name] = dependencies
+        self.dependents[name] = []
+        for dependency in dependencies:
+            self.dependents[dependency].append(name)
+
+    # Function to change an input; everything downstream is marked out of date unless the value is unchanged
+    # The new value is compared with a snapshot taken when the input was last set, so an Optics or DiffractionSample
+    # changed in place and passed back as the same object still invalidates its dependents
+    def set_input(self, name, value):
+        if self.functions.get(name, 0) is not None:
+            raise KeyError("'{}' is not an input of this graph.".format(name))
+        state = _input_state(value)
+        if _same_value(self.input_states.get(name), state):
+            return
+        self.values[name] = value
+        self.input_states[name] = state
+        self._invalidate(name)
+
+    # Function to change several inputs at once
+    def set_inputs(self, **inputs):
+        for name, value in inputs.items():
+            self.set_input(name, value)
+
+    def _invalidate(self, name):
+        stack = list(self.dependents[name])
+        while stack:
+            node = stack.pop()
+            if node not in self.dirty: # Nodes already out of date have out-of-date dependents too
+                self.dirty.add(node)
+                stack.extend(self.dependents[node])
+
+    # Function to return a node's value, recomputing only the out-of-date nodes it depends on
+    def get(self, name):
+        self.last_recomputed = []
+        return self._evaluate(name)
+
+    def _evaluate(self, name):
+        if name not in self.functions:
+            raise KeyError("Unknown node '{}'.".format(name))
+        if name in self.dirty:
+            arguments = [self._evaluate(dependency) for dependency in self.dependencies[name]]
+            start = time.perf_counter()
+            self.values[name] = self.functions[name](*arguments)
+            self.compute_ms[name] = (time.perf_counter() - start) * 1000
+            self.compute_counts[name] = self.compute_counts.get(name, 0) + 1
+            self.dirty.discard(name)
+            self.last_recomputed.append(name)
+        return self.values[name]
+
+# Function to return the state an input is compared by: the set attributes of slotted objects (Optics,
+# DiffractionSample), or a copy of any other value, so later changes to the object itself do not alter the snapshot
+# A FootprintContext cannot change, so it is its own snapshot
+def _input_state(value):
+    if isinstance(value, FootprintContext):
+        return value
+    if hasattr(type(value), "__slots__"):
+        return type(value), copy.deepcopy(slot_values(value))
+    return copy.deepcopy(value)
+
+# Function to decide whether a new input state matches the old one
+def _same_value(old, new):
+    if old is new:
+        return True
+    try:
+        return bool(old == new)
+    except (TypeError, ValueError): # E.g. comparing NumPy arrays of different shapes
+        return False
+
+# ---------- Standard Calculator Nodes ----------
+
+# Function to return the {element: {"Proton Number", "Atomic Weight", ...}} dictionary and validity for a composition
+def _atomic_info_node(composition, context):
+    if not composition: # Formula could not be parsed
+        return {}, False
+    return get_atomic_info(composition, context.element_info)
+
+# Function to calculate the MAC (cm^2/g) as calculate_formula_MAC does, or None if it cannot be calculated
+def _MAC_node(composition, atomic_info_and_valid, incident_energy, context):
+    atomic_info, valid_MAC = atomic_info_and_valid
+    if not composition or not valid_MAC:
+        return None
+    sample = SampleChemistry(composition, valid_MAC)
+    sample.molecular_weight(atomic_info)
+    sample.get_relative_abundance(atomic_info, sample.molecular_weight_value)
+    sample.calculate_sample_MAC(sample.relative_abundance, get_sample_MAC_library(atomic_info, incident_energy, context.atomic_MACs))
+    return sample.mass_atten_coefficient
+
+# Function to calculate the LAC (cm^-1) from the MAC and density, or None if either is missing
+def _LAC_node(MAC, density):
+    if MAC is None or density is None:
+        return None
+    return MAC * density
+
+# Function to summarize the attenuation of the beam through the holder depth with Footprint_Core's attenuation_summary
+# The threshold is its own input (so changing it re-runs only this node) and replaces the context's threshold
+def _attenuation_node(context, LAC, sample, threshold):
+    if LAC is None:
+        return None
+    return attenuation_summary(context._replace(threshold=threshold), LAC, sample.depth)
+
+# Function to build the {theta: value} data set on the same 1 degree grid as beam_curve_for_optics, in one array call
+def _curve_node(radius, optics, min_2theta, max_2theta):
+    theta = np.arange(round(min_2theta), round(max_2theta + 1), 1)
+    if optics.mode == "FDS":
+        values = FDS_length_array(radius, optics.i_slit, theta)
+    else:
+        values = ADS_phi_array(optics.i_length, radius, theta)
+    return dict(zip(theta.tolist(), values.tolist()))
+
+# Function to check whether the beam fits and, in FDS mode, the angle above which it always fits
+def _overlap_node(radius, optics, sample, curve):
+    onset = None
+    if optics.mode == "FDS":
+        onset = float(spill_over_onset(radius, optics.i_slit, optics.mask, sample.shape, getattr(sample, "diameter", 0),
+                                       getattr(sample, "axi", 0), getattr(sample, "equi", 0)))
+    return {"beam fits": bool(beam_fit_checker(optics, sample, curve)), "fit onset": onset}
+
+# Function to build the standard calculator graph
+# Inputs: formula, incident_energy (keV), density (g/cm^3), radius (mm), optics (Optics), sample (DiffractionSample),
+# min_2theta, max_2theta and threshold (the context's threshold unless given). The context (a Footprint_Core
+# FootprintContext) is loaded once here unless passed in.
+def footprint_what_if_graph(context=None, **inputs):
+    context = context if context is not None else load_footprint_context()
+    graph = ComputationGraph()
+    graph.add_input("context", context)
+    for name in ("formula", "incident_energy", "density", "radius", "optics", "sample", "min_2theta", "max_2theta"):
+        graph.add_input(name, inputs.get(name))
+    graph.add_input("threshold", inputs.get("threshold", context.threshold))
+    # Chemistry branch
+    graph.add_node("composition", lambda formula: chem_form_parser(formula) if formula else {}, ["formula"])
+    graph.add_node("atomic info", _atomic_info_node, ["composition", "context"])
+    graph.add_node("MAC", _MAC_node, ["composition", "atomic info", "incident_energy", "context"])
+    graph.add_node("LAC", _LAC_node, ["MAC", "density"])
+    graph.add_node("attenuation", _attenuation_node, ["context", "LAC", "sample", "threshold"])
+    # Geometry branch
+    graph.add_node("curve", _curve_node, ["radius", "optics", "min_2theta", "max_2theta"])
+    graph.add_node("overlap", _overlap_node, ["radius", "optics", "sample", "curve"])
+    graph.add_node("figure", render_scenario_figure, ["optics", "sample", "curve"]) # PNG bytes, only drawn when requested
+    return graph